@@ -0,0 +1,214 @@
+"""Measure crawl throughput, page latency and peak memory against a synthetic local site.
+
+    python -m benchmarks.bench_crawl [--scenario small] [--pages 1000] [--llm-latency 0.2]
+
+Every scenario runs in a fresh process, so its peak RSS is its own. The
+site is served from this process, and LLM extraction is replaced by a
+fake with a fixed latency, so no network or API key is needed. Results
+are appended to a JSON lines file, and compared with the last earlier
+result of the same scenario and settings.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from benchmarks.synthetic_site import SyntheticSite, serve
+
+DEFAULT_RESULTS_FILE = "benchmark-results.jsonl"
+
+# Site and crawl settings of each scenario; command-line options override them
+SCENARIOS = {
+    'small': dict(pages=200, fanout=5, page_kb=20, duplicate_ratio=0.0),
+    'wide': dict(pages=2000, fanout=50, page_kb=10, duplicate_ratio=0.0),
+    'heavy': dict(pages=200, fanout=8, page_kb=300, duplicate_ratio=0.0),
+    'duplicates': dict(pages=500, fanout=10, page_kb=20, duplicate_ratio=0.5),
+}
+DEFAULT_SETTINGS = dict(depth=None, llm_latency=0.05, extractor='llm', concurrency=8, fetch_mode='http',
+                        output_format='markdown', seed=0)
+
+
+class FakeExtractionStrategy:
+    """Stands in for LLMExtractionStrategy: waits `latency` seconds, like an LLM call, and echoes the input."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.provider = 'benchmark'
+
+    def run(self, url, sections):
+        time.sleep(self.latency)
+        return [{"index": index, "tags": [], "content": [section[:200]]} for index, section in enumerate(sections)]
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def crawl(base_url, settings, output_folder):
+    """Crawl the site with WebsiteCrawlingAgent. Runs in the scenario's own process."""
+    from website_crawling_agent.agent import WebsiteCrawlingAgent
+
+    class BenchmarkAgent(WebsiteCrawlingAgent):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.claimed_at = {}
+            self.latencies = []
+
+        def create_extraction_strategy(self, instruction):
+            return FakeExtractionStrategy(settings['llm_latency'])
+
+        async def process_page(self, crawler, url, depth=0):
+            # A retried page's latency runs from its first claim
+            self.claimed_at.setdefault(url, time.perf_counter())
+            return await super().process_page(crawler, url, depth)
+
+        def page_written(self, url, error):
+            super().page_written(url, error)
+            if url in self.claimed_at:
+                self.latencies.append(time.perf_counter() - self.claimed_at.pop(url))
+
+    agent = BenchmarkAgent(
+        base_url, output_format=settings['output_format'], output_folder=output_folder,
+        concurrency=settings['concurrency'], fetch_mode=settings['fetch_mode'], extractor=settings['extractor']
+    )
+    started = time.perf_counter()
+    asyncio.run(agent.crawl())
+    seconds = time.perf_counter() - started
+    return agent, seconds
+
+
+def run_scenario(base_url, settings, results):
+    """Entry point of a scenario process. Puts the measurements on the `results` queue."""
+    with tempfile.TemporaryDirectory() as output_folder, open(os.devnull, 'w') as devnull:
+        with redirect_stdout(devnull):
+            agent, seconds = crawl(base_url, settings, output_folder)
+
+    snapshot = agent.metrics.snapshot()
+    results.put({
+        'pages': agent.pages_crawled,
+        'saved_pages': len(agent.latencies),
+        'seconds': round(seconds, 3),
+        'pages_per_second': round(agent.pages_crawled / seconds, 2) if seconds else 0.0,
+        'latency_p50': round(percentile(agent.latencies, 0.5), 4),
+        'latency_p99': round(percentile(agent.latencies, 0.99), 4),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'llm_requests': agent.extraction_stage.stats['requests'],
+        'cache_hits': agent.extraction_cache.hits,
+        'stages': snapshot['stages'],
+    })
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_result(path, scenario, settings):
+    """The last result in `path` of the same scenario with the same settings, or None."""
+    if not os.path.exists(path):
+        return None
+    previous = None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            result = json.loads(line)
+            if result.get('scenario') == scenario and result.get('settings') == settings:
+                previous = result
+    return previous
+
+
+def change(new, old):
+    return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (can be repeated; default: all)")
+    parser.add_argument("--pages", type=int, help="Number of pages on the site")
+    parser.add_argument("--fanout", type=int, help="Links from each page to its child pages")
+    parser.add_argument("--depth", type=int, help="Levels of pages below the home page")
+    parser.add_argument("--page-kb", type=float, help="Size of the article text on each page, in KB")
+    parser.add_argument("--duplicate-ratio", type=float, help="Share of pages repeating another page's article")
+    parser.add_argument("--llm-latency", type=float, help="Seconds each fake LLM call takes")
+    parser.add_argument("--extractor", choices=("llm", "heuristic", "auto"), help="Extractor to use")
+    parser.add_argument("--concurrency", type=int, help="Pages crawled at the same time")
+    parser.add_argument("--fetch-mode", choices=("http", "browser", "auto"),
+                        help="Fetch mode; browser and auto need crawl4ai and Chromium")
+    parser.add_argument("--format", dest="output_format", choices=("markdown", "json", "txt", "jsonl"),
+                        help="Output format")
+    parser.add_argument("--seed", type=int, help="Seed of the generated site")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_FILE,
+                        help=f"JSON lines file the results are appended to (default: {DEFAULT_RESULTS_FILE})")
+    args = parser.parse_args()
+
+    from website_crawling_agent import __version__
+
+    context = multiprocessing.get_context('spawn')
+    for scenario in args.scenario or sorted(SCENARIOS):
+        settings = dict(DEFAULT_SETTINGS, **SCENARIOS[scenario])
+        for name in settings:
+            if getattr(args, name, None) is not None:
+                settings[name] = getattr(args, name)
+
+        site = SyntheticSite(settings['pages'], settings['fanout'], settings['depth'], settings['page_kb'],
+                             settings['duplicate_ratio'], settings['seed'])
+        server, base_url = serve(site)
+        results = context.Queue()
+        process = context.Process(target=run_scenario, args=(base_url, settings, results))
+        try:
+            process.start()
+            measurements = results.get()
+            process.join()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        # A different count means pages were fetched twice or missed, and the numbers don't compare
+        if measurements['pages'] != site.pages:
+            raise SystemExit(f"{scenario}: crawled {measurements['pages']} pages, but the site has {site.pages}")
+
+        result = {
+            'scenario': scenario,
+            'settings': settings,
+            'version': __version__,
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            **measurements,
+        }
+        previous = previous_result(args.results, scenario, settings)
+        with open(args.results, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(result) + '\n')
+
+        print(f"{scenario}: {result['pages']} pages in {result['seconds']:.1f}s, "
+              f"{result['pages_per_second']:.1f} pages/s, latency p50 {result['latency_p50'] * 1000:.0f} ms, "
+              f"p99 {result['latency_p99'] * 1000:.0f} ms, peak RSS {result['peak_rss_mb']:.0f} MB")
+        if previous is not None:
+            print(f"  since {previous['commit'] or previous['time']}: "
+                  f"pages/s {change(result['pages_per_second'], previous['pages_per_second'])}, "
+                  f"p99 {change(result['latency_p99'], previous['latency_p99'])}, "
+                  f"peak RSS {change(result['peak_rss_mb'], previous['peak_rss_mb'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare the single-pass page parser with the BeautifulSoup path it replaced.
+
+    python -m benchmarks.bench_page_parser [--links 2000] [--repeat 5]
+"""
+import argparse
+import timeit
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from website_crawling_agent.page_parser import parse_page
+
+URL = "https://example.com/docs/page"
+
+
+def make_page(link_count):
+    """A large page with navigation, scripts and many paragraphs of linked text."""
+    nav = "".join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(50))
+    paragraphs = "".join(
+        f'<p class="text">Paragraph {i} with <b>some</b> text and a <a href="/article/{i}?ref=body">link</a>.</p>'
+        for i in range(link_count)
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>Benchmark page</title>"
+        '<link rel="canonical" href="https://example.com/docs/page">'
+        "<script>var data = {};</script><style>p { margin: 0 }</style></head>"
+        f"<body><nav><ul>{nav}</ul></nav><main>{paragraphs}</main></body></html>"
+    )
+
+
+def beautifulsoup_path(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    title = soup.title.string if soup.title else ""
+    links = [urljoin(URL, link['href']) for link in soup.find_all('a', href=True)]
+    return title, links
+
+
+def single_pass_path(html):
+    page = parse_page(html)
+    return page.title, page.links(URL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--links", type=int, default=2000, help="Number of linked paragraphs on the page")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed runs of each path")
+    args = parser.parse_args()
+
+    html = make_page(args.links)
+    assert beautifulsoup_path(html) == single_pass_path(html)
+    print(f"Page size: {len(html) / 1024:.0f} KB, {args.links + 50} links")
+
+    timings = {}
+    for name, func in (("BeautifulSoup", beautifulsoup_path), ("single pass", single_pass_path)):
+        timings[name] = min(timeit.repeat(lambda: func(html), number=1, repeat=args.repeat))
+        print(f"{name:>14}: {timings[name] * 1000:.1f} ms per page")
+    print(f"Speed-up: {timings['BeautifulSoup'] / timings['single pass']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
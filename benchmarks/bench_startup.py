@@ -0,0 +1,72 @@
+"""Measure how long it takes to import the package and create an agent.
+
+    python -m benchmarks.bench_startup [--runs 10]
+
+Every measurement runs in a fresh interpreter, so nothing is imported or
+cached beforehand. Import time is reported on top of the interpreter's own
+start-up time.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+IMPORT_CODE = "import website_crawling_agent.cli"
+
+# Creates an agent in a fresh process and prints how long it took; the import is not counted
+CONSTRUCT_CODE = """
+import contextlib, io, sys, time
+from website_crawling_agent.agent import WebsiteCrawlingAgent
+started = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    WebsiteCrawlingAgent("https://example.com", output_folder=sys.argv[1], **{options})
+print(time.perf_counter() - started)
+"""
+
+CONSTRUCT_CASES = (
+    ('browser check', {}),
+    ('browser check skipped', {'check_browser': False}),
+    ('http fetch mode', {'fetch_mode': 'http'}),
+)
+
+
+def process_seconds(code, runs):
+    """Median wall time of `runs` fresh interpreters running `code`."""
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.check_call([sys.executable, '-c', code])
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def construct_seconds(options, runs):
+    """Median time to create an agent with `options`, each time in a fresh interpreter."""
+    times = []
+    with tempfile.TemporaryDirectory() as output_folder:
+        for _ in range(runs):
+            output = subprocess.check_output(
+                [sys.executable, '-c', CONSTRUCT_CODE.format(options=options), output_folder], text=True
+            )
+            times.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Runs of each measurement (default: 10)")
+    args = parser.parse_args()
+
+    baseline = process_seconds("pass", args.runs)
+    imported = process_seconds(IMPORT_CODE, args.runs)
+    print(f"interpreter start-up: {baseline * 1000:.0f} ms")
+    print(f"import website_crawling_agent.cli: {(imported - baseline) * 1000:.0f} ms")
+    for name, options in CONSTRUCT_CASES:
+        # The first run of the default case leaves the browser check marker for the next ones
+        print(f"create agent ({name}): {construct_seconds(options, args.runs) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
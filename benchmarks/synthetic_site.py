@@ -0,0 +1,132 @@
+"""A generated website served from a local HTTP server, for offline crawl benchmarks."""
+import random
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "crawler page content server browser extraction token latency network article section "
+    "heading paragraph cache queue worker request response budget archive search index"
+).split()
+
+# Links from every page to random other pages, on top of the tree links
+CROSS_LINKS = 3
+
+# Number of pages that duplicate pages are copies of
+DUPLICATE_SOURCES = 10
+
+
+class SyntheticSite:
+    """A site of `pages` pages, the home page at / and the others at /p/1 .. /p/N-1, generated on request.
+
+    The pages form a tree with `fanout` children per page, at most `depth`
+    levels below the home page, and each page also links to a few random
+    pages. Each article has about `page_kb` KB of text between a navigation
+    menu and a footer. A `duplicate_ratio` share of the pages serve exactly
+    the same HTML as one of a few other pages, under their own URL. The same
+    `seed` always gives the same site.
+
+    Every page has exactly one URL: links to the home page go to /, and
+    /p/0 redirects there, so a full crawl fetches exactly `pages` pages.
+    """
+
+    def __init__(self, pages=500, fanout=10, depth=None, page_kb=20, duplicate_ratio=0.0, seed=0):
+        self.fanout = max(1, fanout)
+        self.page_kb = page_kb
+        self.duplicate_ratio = duplicate_ratio
+        self.seed = seed
+        self.pages = pages
+        if depth is not None:
+            # A complete tree of that depth has 1 + f + f^2 + ... + f^depth pages
+            self.pages = min(pages, sum(self.fanout ** level for level in range(depth + 1)))
+        self.page = lru_cache(maxsize=4096)(self.render_page)
+
+    def page_path(self, number):
+        return "/" if number == 0 else f"/p/{number}"
+
+    def children(self, number):
+        first = number * self.fanout + 1
+        return range(first, min(first + self.fanout, self.pages))
+
+    def is_duplicate(self, number):
+        if number < DUPLICATE_SOURCES:
+            return False
+        return random.Random(self.seed * 1000003 + number).random() < self.duplicate_ratio
+
+    def article(self, number):
+        rng = random.Random(self.seed * 7919 + number)
+        paragraphs = []
+        size = 0
+        while size < self.page_kb * 1024:
+            paragraph = " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120)))
+            paragraphs.append(f"<p>{paragraph.capitalize()}.</p>")
+            size += len(paragraph) + 8
+            if len(paragraphs) % 5 == 0:
+                paragraphs.append(f"<h2>Section {len(paragraphs) // 5}</h2>")
+        return "\n".join(paragraphs)
+
+    def render_page(self, number):
+        if self.is_duplicate(number):
+            return self.page(number % DUPLICATE_SOURCES)
+        rng = random.Random(self.seed * 104729 + number)
+        links = list(self.children(number))
+        links += [rng.randrange(self.pages) for _ in range(CROSS_LINKS)]
+        link_html = "".join(f'<li><a href="{self.page_path(link)}">Page {link}</a></li>' for link in links)
+        nav = "".join(f'<a href="{self.page_path(i)}">Top {i}</a> ' for i in range(min(self.pages, 8)))
+        return (
+            f"<!DOCTYPE html><html><head><title>Page {number}</title>"
+            "<style>body { font-family: sans-serif }</style><script>var analytics = {};</script></head>"
+            f"<body><nav class=\"menu\">{nav}</nav>"
+            f"<main><article><h1>Page {number}</h1>{self.article(number)}</article>"
+            f"<ul class=\"related\">{link_html}</ul></main>"
+            "<footer>Synthetic site footer, all rights reserved</footer></body></html>"
+        ).encode('utf-8')
+
+    def html_for_path(self, path):
+        """The page at `path`, or None if there is none."""
+        if path in ("/", ""):
+            return self.page(0)
+        if path.startswith("/p/") and path[3:].isdigit() and 0 < int(path[3:]) < self.pages:
+            return self.page(int(path[3:]))
+        return None
+
+    def redirect_for_path(self, path):
+        """Where a request for `path` is redirected, or None."""
+        if path == "/p/0":
+            return "/"
+        return None
+
+
+def serve(site, host='127.0.0.1', port=0):
+    """Serve `site` from a background thread. Returns (server, base_url); call server.shutdown() when done."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            location = site.redirect_for_path(path)
+            if location is not None:
+                self.send_response(301)
+                self.send_header('Location', location)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = site.html_for_path(path)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='synthetic-site', daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/"
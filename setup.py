@@ -59,7 +59,6 @@ setup(
     install_requires=[
         "crawl4ai>=0.3.73",
         "beautifulsoup4>=4.12.0",
-        "markdown>=3.5.0",
         "pdfkit>=1.0.0",
         "litellm==1.51.2",
         "requests==2.32.3",
@@ -4,10 +4,18 @@ import json
 import asyncio
 import sys
 import subprocess
-from unittest.mock import Mock, patch, AsyncMock
+import time
+from unittest.mock import Mock, MagicMock, patch, AsyncMock
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
-from website_crawling_agent.agent import WebsiteCrawlingAgent
+from website_crawling_agent.agent import WebsiteCrawlingAgent, remember_browser_check
+from website_crawling_agent.politeness import RobotsCache
+from website_crawling_agent.fetcher import HttpPageResult
+from website_crawling_agent.visited_index import FingerprintSet
+from website_crawling_agent.sitemap import SitemapEntry
+from website_crawling_agent.coordinator import SqliteCoordinator, partition_for
+from website_crawling_agent import incremental
+from website_crawling_agent.options import IncrementalOptions, MetricsOptions, OutputOptions, PolitenessOptions
 
 @pytest.fixture
 def agent():
@@ -19,13 +27,40 @@ def mock_crawler():
     return crawler
 
 class MockCrawlResult:
-    def __init__(self, success=True, status_code=200, content="Test content", html="<html><title>Test</title></html>"):
+    def __init__(self, success=True, status_code=200, content="Test content", html="<html><title>Test</title></html>",
+                 response_headers=None):
         self.success = success
         self.status_code = status_code
         self.extracted_content = content
+        self.markdown = content
         self.html = html
+        self.response_headers = response_headers or {}
         self.error_message = None if success else "Error"
 
+class FakeExtractionStrategy:
+    """Stands in for LLMExtractionStrategy so tests never call an LLM"""
+    calls = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+    def run(self, url, sections):
+        FakeExtractionStrategy.calls.append(url)
+        return [{"index": 0, "content": section} for section in sections]
+
+@pytest.fixture(autouse=True)
+def fake_llm():
+    FakeExtractionStrategy.calls = []
+    with patch('website_crawling_agent.agent.LLMExtractionStrategy', FakeExtractionStrategy):
+        yield FakeExtractionStrategy
+
+@pytest.fixture(autouse=True)
+def browser_check_cache(tmp_path_factory, monkeypatch):
+    """Keep browser check markers out of the real cache folder"""
+    cache_home = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+    return cache_home
+
 def test_init():
     """Test the initialization of WebsiteCrawlingAgent"""
     agent = WebsiteCrawlingAgent(
@@ -42,12 +77,13 @@ def test_init():
     assert agent.base_domain == "example.com"
     assert agent.pages_crawled == 0
     assert agent.shutdown_flag is False
-    assert isinstance(agent.visited_urls, set)
+    assert isinstance(agent.visited_urls, FingerprintSet)
 
 @pytest.mark.asyncio
 async def test_crawl(agent, mock_crawler):
     """Test the crawl method"""
-    with patch('website_crawling_agent.agent.AsyncWebCrawler') as MockCrawler:
+    # An explicit `new` keeps patch from probing, and so importing, the real crawl4ai class
+    with patch('website_crawling_agent.agent.AsyncWebCrawler', new=MagicMock()) as MockCrawler:
         MockCrawler.return_value.__aenter__.return_value = mock_crawler
         await agent.crawl()
         mock_crawler.arun.assert_called()
@@ -261,3 +297,826 @@ def test_check_playwright_browser_already_installed(mock_path_exists):
     agent = WebsiteCrawlingAgent("https://example.com")
     # Should not raise any exceptions
     agent.check_playwright_browser()
+
+@patch('website_crawling_agent.agent.playwright_version', return_value="1.0")
+def test_browser_check_is_remembered(mock_version, tmp_path):
+    """Test that the browser check is skipped once it passed for this Playwright version"""
+    remember_browser_check(tmp_path)
+
+    with patch('website_crawling_agent.agent.Path.exists', side_effect=AssertionError("checked again")):
+        WebsiteCrawlingAgent("https://example.com")
+
+    mock_version.return_value = "2.0"
+    with patch('website_crawling_agent.agent.Path.exists', return_value=True) as mock_path_exists:
+        WebsiteCrawlingAgent("https://example.com")
+    mock_path_exists.assert_called()
+
+@pytest.mark.parametrize("options", [{"fetch_mode": "http"}, {"check_browser": False}])
+def test_browser_check_skipped(options):
+    """Test that plain HTTP crawls and check_browser=False don't look for a browser"""
+    with patch('website_crawling_agent.agent.Path.exists', side_effect=AssertionError("checked")):
+        WebsiteCrawlingAgent("https://example.com", **options)
+
+@pytest.mark.asyncio
+async def test_http_crawl_starts_no_browser(tmp_path):
+    """Test that an http fetch mode crawl never starts AsyncWebCrawler"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path), fetch_mode="http")
+    page = HttpPageResult("https://example.com", 200, "<html><title>Home</title><body><p>Text</p></body></html>")
+
+    with patch('website_crawling_agent.agent.AsyncWebCrawler', new=Mock(side_effect=AssertionError("browser started"))), \
+            patch('website_crawling_agent.fetcher.http_fetch', return_value=page):
+        await agent.crawl()
+
+    assert agent.pages_crawled == 1
+
+def make_linked_site(page_count):
+    """Build a mock arun that serves a chain of pages, each linking to the next"""
+    async def arun(url, **kwargs):
+        number = int(url.rsplit('/', 1)[-1]) if url.rsplit('/', 1)[-1].isdigit() else 0
+        html = f'<html><title>Chain page</title><a href="/{number + 1}">next</a></html>'
+        if number + 1 >= page_count:
+            html = f'<html><title>Chain page</title></html>'
+        return MockCrawlResult(html=html)
+    return arun
+
+@pytest.mark.asyncio
+async def test_concurrent_workers_share_crawler(tmp_path, mock_crawler):
+    """Test that several pages are fetched at the same time"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path), concurrency=3)
+    in_flight = 0
+    max_in_flight = 0
+
+    async def slow_arun(url, **kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if url == "https://example.com/":
+            links = "".join(f'<a href="/page{i}">Page</a>' for i in range(6))
+            return MockCrawlResult(html=f"<html><title>Home</title>{links}</html>")
+        return MockCrawlResult()
+
+    mock_crawler.arun.side_effect = slow_arun
+    await agent.crawl_page(mock_crawler, "https://example.com")
+
+    assert agent.pages_crawled == 7
+    assert mock_crawler.arun.call_count == 7
+    assert max_in_flight == 3
+
+@pytest.mark.asyncio
+async def test_max_pages_exact_with_concurrency(tmp_path, mock_crawler):
+    """Test that concurrent workers never go over max_pages"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path),
+                                 max_pages=5, concurrency=4)
+
+    async def arun(url, **kwargs):
+        await asyncio.sleep(0)
+        links = "".join(f'<a href="{url.rstrip("/")}/{i}">Link</a>' for i in range(4))
+        return MockCrawlResult(html=f"<html><title>Page</title>{links}</html>")
+
+    mock_crawler.arun.side_effect = arun
+    await agent.crawl_page(mock_crawler, "https://example.com")
+
+    assert agent.pages_crawled == 5
+    assert len(agent.visited_urls) == 5
+    assert mock_crawler.arun.call_count == 5
+
+@pytest.mark.asyncio
+async def test_shutdown_stops_new_pages(tmp_path, mock_crawler):
+    """Test that no new pages are started after shutdown"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path), concurrency=2)
+    site = make_linked_site(100)
+
+    async def arun(url, **kwargs):
+        if agent.pages_crawled == 3:
+            agent.shutdown()
+        return await site(url, **kwargs)
+
+    mock_crawler.arun.side_effect = arun
+    await agent.crawl_page(mock_crawler, "https://example.com/0")
+
+    assert agent.pages_crawled == 3
+    assert mock_crawler.arun.call_count == 3
+
+@pytest.mark.asyncio
+async def test_deep_site_does_not_recurse(tmp_path, mock_crawler):
+    """Test that a site deeper than the recursion limit can be crawled"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path))
+    page_count = sys.getrecursionlimit() + 50
+    mock_crawler.arun.side_effect = make_linked_site(page_count)
+
+    await agent.crawl_page(mock_crawler, "https://example.com/0")
+
+    assert agent.pages_crawled == page_count
+
+@pytest.mark.asyncio
+async def test_robots_disallowed_urls_are_skipped(tmp_path, mock_crawler):
+    """Test that URLs disallowed by robots.txt never reach the browser"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path),
+                                 politeness=PolitenessOptions(respect_robots=True))
+    agent.robots = RobotsCache(fetcher=lambda robots_url: (200, "User-agent: *\nDisallow: /private\n"))
+    mock_crawler.arun.return_value = MockCrawlResult(
+        html='<html><title>Home</title><a href="/private/a">A</a><a href="/public">B</a></html>'
+    )
+
+    await agent.crawl_page(mock_crawler, "https://example.com/")
+
+    called_urls = [call.kwargs["url"] for call in mock_crawler.arun.call_args_list]
+    assert called_urls == ["https://example.com/", "https://example.com/public"]
+    assert agent.pages_crawled == 2
+
+@pytest.mark.asyncio
+async def test_resume_continues_interrupted_crawl(tmp_path, mock_crawler):
+    """Test that --resume skips finished pages and crawls the remaining frontier"""
+    site = make_linked_site(6)
+    first = WebsiteCrawlingAgent("https://example.com/0", output_folder=str(tmp_path), concurrency=1)
+
+    async def interrupted_arun(url, **kwargs):
+        if first.pages_crawled == 3:
+            first.shutdown()
+        return await site(url, **kwargs)
+
+    mock_crawler.arun.side_effect = interrupted_arun
+    await first.crawl_page(mock_crawler, "https://example.com/0")
+    first.state_store.close()
+    assert first.pages_crawled == 3
+
+    second_crawler = AsyncMock()
+    second_crawler.arun.side_effect = site
+    second = WebsiteCrawlingAgent("https://example.com/0", output_folder=str(tmp_path),
+                                  incremental=IncrementalOptions(resume=True))
+    await second.crawl_page(second_crawler, "https://example.com/0")
+
+    called_urls = [call.kwargs["url"] for call in second_crawler.arun.call_args_list]
+    assert called_urls == ["https://example.com/3", "https://example.com/4", "https://example.com/5"]
+    assert second.pages_crawled == 6
+
+@pytest.mark.asyncio
+async def test_extraction_runs_outside_arun(tmp_path, mock_crawler, fake_llm):
+    """Test that the page is fetched without an extraction strategy and extracted afterwards"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path), output_format="json")
+    mock_crawler.arun.return_value = MockCrawlResult(content="Hello world")
+
+    await agent.crawl_page(mock_crawler, "https://example.com/page")
+
+    assert "extraction_strategy" not in mock_crawler.arun.call_args.kwargs
+    assert fake_llm.calls == ["https://example.com/page"]
+    saved = json.loads((tmp_path / "page.json").read_text())
+    assert json.loads(saved["content"]) == [{"index": 0, "content": "Hello world"}]
+
+@pytest.mark.asyncio
+async def test_metadata_saved_next_to_output(tmp_path, mock_crawler):
+    """Test that ETag, Last-Modified, content hash and links are saved with each page"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path))
+    mock_crawler.arun.return_value = MockCrawlResult(
+        html='<html><title>Page</title><a href="/next">Next</a></html>',
+        response_headers={"ETag": '"abc"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"}
+    )
+
+    await agent.crawl_page(mock_crawler, "https://example.com/page", test_mode=True)
+
+    metadata = json.loads((tmp_path / "page.markdown.meta.json").read_text())
+    assert metadata["etag"] == '"abc"'
+    assert metadata["last_modified"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+    assert metadata["links"] == ["https://example.com/next"]
+    assert metadata["content_hash"]
+
+@pytest.mark.asyncio
+async def test_incremental_skips_extraction_of_unchanged_pages(tmp_path, mock_crawler, fake_llm):
+    """Test that a page with the same content hash is not extracted or rewritten"""
+    mock_crawler.arun.return_value = MockCrawlResult()
+    first = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path))
+    await first.crawl_page(mock_crawler, "https://example.com/page")
+    output_file = tmp_path / "page.markdown"
+    output_file.write_text("previous output")
+
+    second = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path),
+                                  incremental=IncrementalOptions(enabled=True))
+    await second.crawl_page(mock_crawler, "https://example.com/page")
+
+    assert fake_llm.calls == ["https://example.com/page"]
+    assert output_file.read_text() == "previous output"
+    assert mock_crawler.arun.call_args.kwargs["bypass_cache"] is True
+
+@pytest.mark.asyncio
+async def test_incremental_not_modified_uses_saved_links(tmp_path, mock_crawler):
+    """Test that a 304 page is not fetched again and its saved links are followed"""
+    mock_crawler.arun.return_value = MockCrawlResult(
+        html='<html><title>Page</title><a href="/other">Other</a></html>',
+        response_headers={"ETag": '"abc"'}
+    )
+    first = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path))
+    await first.crawl_page(mock_crawler, "https://example.com/page", test_mode=True)
+
+    second_crawler = AsyncMock()
+    second_crawler.arun.return_value = MockCrawlResult()
+    second = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path),
+                                  incremental=IncrementalOptions(enabled=True))
+    with patch('website_crawling_agent.agent.incremental.is_not_modified', return_value=True) as not_modified:
+        await second.crawl_page(second_crawler, "https://example.com/page")
+
+    assert not_modified.call_args.args[1] == "https://example.com/page"
+    called_urls = [call.kwargs["url"] for call in second_crawler.arun.call_args_list]
+    assert called_urls == ["https://example.com/other"]
+    assert second.pages_crawled == 2
+
+@pytest.mark.asyncio
+async def test_identical_content_is_extracted_once(tmp_path, mock_crawler, fake_llm):
+    """Test that a second URL with the same content is served from the extraction cache"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path))
+    mock_crawler.arun.return_value = MockCrawlResult(content="Same article")
+
+    await agent.crawl_page(mock_crawler, "https://example.com/article")
+    await agent.crawl_page(mock_crawler, "https://example.com/article?print=1")
+
+    assert fake_llm.calls == ["https://example.com/article"]
+    assert agent.extraction_cache.hits == 1
+    assert agent.extraction_cache.misses == 1
+
+@pytest.mark.asyncio
+async def test_failed_extraction_is_not_cached(tmp_path, mock_crawler, fake_llm):
+    """Test that LLM error blocks are not stored in the extraction cache"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path),
+                                 politeness=PolitenessOptions(retry_base_delay=0))
+    mock_crawler.arun.return_value = MockCrawlResult(content="Article")
+
+    with patch.object(FakeExtractionStrategy, 'run', return_value=[{"error": True, "content": "rate limited"}]):
+        await agent.crawl_page(mock_crawler, "https://example.com/a")
+
+    assert len(agent.extraction_cache) == 0
+
+@pytest.mark.asyncio
+async def test_auto_fetch_mode_crawls_static_site_without_browser(tmp_path, mock_crawler, fake_llm):
+    """Test that a server-rendered site is crawled over plain HTTP"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path), fetch_mode="auto")
+    body = "<p>" + "Server-rendered article text. " * 20 + "</p>"
+    pages = {
+        "https://example.com/": f'<html><title>Home</title><body>{body}<a href="/about">About</a></body></html>',
+        "https://example.com/about": f'<html><title>About</title><body>{body}</body></html>',
+    }
+
+    def plain_fetch(session, url):
+        return HttpPageResult(url, 200, pages[url])
+
+    with patch('website_crawling_agent.fetcher.http_fetch', side_effect=plain_fetch):
+        await agent.crawl_page(mock_crawler, "https://example.com/")
+
+    mock_crawler.arun.assert_not_called()
+    assert agent.pages_crawled == 2
+    assert agent.fetcher.tier_counts["http"] == 2
+    assert (tmp_path / "about.markdown").exists()
+
+@pytest.mark.asyncio
+async def test_transient_failure_is_retried(tmp_path, mock_crawler):
+    """Test that a page failing with a server error is crawled again and saved"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path),
+                                 politeness=PolitenessOptions(retry_base_delay=0))
+    mock_crawler.arun.side_effect = [MockCrawlResult(success=False, status_code=503), MockCrawlResult()]
+
+    await agent.crawl_page(mock_crawler, "https://example.com/a", test_mode=True)
+
+    assert mock_crawler.arun.call_count == 2
+    assert agent.pages_crawled == 1
+    assert agent.retry_counts == {"server_error": 1}
+    assert (tmp_path / "a.markdown").exists()
+
+@pytest.mark.asyncio
+async def test_client_error_is_not_retried(tmp_path, mock_crawler):
+    """Test that failures another try would not fix are given up on at once"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path),
+                                 politeness=PolitenessOptions(retry_base_delay=0))
+    mock_crawler.arun.return_value = MockCrawlResult(success=False, status_code=403)
+
+    await agent.crawl_page(mock_crawler, "https://example.com/a", test_mode=True)
+
+    assert mock_crawler.arun.call_count == 1
+    assert agent.retry_counts == {}
+    assert agent.metrics.counters["errors"] == 1
+
+@pytest.mark.asyncio
+async def test_failed_extraction_is_retried(tmp_path, mock_crawler):
+    """Test that a page whose LLM extraction returned errors is crawled again"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path),
+                                 politeness=PolitenessOptions(retry_base_delay=0))
+    mock_crawler.arun.return_value = MockCrawlResult(content="Article")
+    answers = [[{"error": True, "content": "rate limited"}], [{"index": 0, "content": "Article"}]]
+
+    with patch.object(FakeExtractionStrategy, 'run', side_effect=lambda url, sections: answers.pop(0)):
+        await agent.crawl_page(mock_crawler, "https://example.com/a", test_mode=True)
+
+    assert agent.retry_counts == {"extraction": 1}
+    assert "rate limited" not in (tmp_path / "a.markdown").read_text()
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_pauses_failing_host(tmp_path, mock_crawler):
+    """Test that a host failing most requests is paused, then crawled once a probe succeeds"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path), concurrency=1,
+                                 politeness=PolitenessOptions(retry_base_delay=0.01, breaker_cooldown=0.1))
+    links = "".join(f'<a href="/{number}">{number}</a>' for number in range(1, 11))
+    calls = []
+
+    async def arun(url, **kwargs):
+        calls.append((url, time.monotonic()))
+        if url == "https://example.com/":
+            return MockCrawlResult(html=f"<html><title>Home</title>{links}</html>")
+        if len(calls) <= 6:
+            return MockCrawlResult(success=False, status_code=503)
+        return MockCrawlResult()
+
+    mock_crawler.arun.side_effect = arun
+    await agent.crawl_page(mock_crawler, "https://example.com/")
+
+    assert agent.circuit_breaker.trips == 1
+    assert agent.pages_crawled == 11
+    assert len(calls) == 16
+    # Nothing was sent to the host while its circuit was open
+    opened_at = calls[4][1]
+    assert calls[5][1] - opened_at >= 0.1
+    assert calls[6][1] - calls[5][1] >= 0.2
+
+@pytest.mark.asyncio
+async def test_shutdown_does_not_wait_for_retries(tmp_path, mock_crawler):
+    """Test that pages waiting for a retry don't hold up a shutdown, and stay queued for --resume"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path), concurrency=1,
+                                 politeness=PolitenessOptions(retry_base_delay=60))
+
+    async def arun(url, **kwargs):
+        if url == "https://example.com/":
+            return MockCrawlResult(html='<html><title>Home</title><a href="/a">A</a><a href="/b">B</a></html>')
+        if url == "https://example.com/a":
+            return MockCrawlResult(success=False, status_code=500)
+        agent.shutdown()
+        return MockCrawlResult()
+
+    mock_crawler.arun.side_effect = arun
+    await asyncio.wait_for(agent.crawl_page(mock_crawler, "https://example.com/"), 5)
+
+    assert "https://example.com/a" in agent.state_store.load()[1]
+
+ARTICLE_HTML = ("<html><title>Article</title><body><nav><a href='/a'>Menu</a></nav><article><h1>Heading</h1>"
+                + "<p>" + "Real article text, with commas, for the heuristic extractor. " * 5 + "</p>" * 6
+                + "</article></body></html>")
+
+@pytest.mark.asyncio
+async def test_heuristic_extractor_skips_llm(tmp_path, mock_crawler, fake_llm):
+    """Test that the heuristic extractor saves content without calling the LLM"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path), output_format="json",
+                                 extractor="heuristic")
+    mock_crawler.arun.return_value = MockCrawlResult(html=ARTICLE_HTML)
+
+    await agent.crawl_page(mock_crawler, "https://example.com/article", test_mode=True)
+
+    assert fake_llm.calls == []
+    saved = json.loads((tmp_path / "article.json").read_text())
+    blocks = json.loads(saved["content"])
+    assert blocks[0]["content"][0] == "# Heading"
+    assert "Menu" not in saved["content"]
+    assert agent.extractor_counts == {"heuristic": 1, "llm": 0}
+
+@pytest.mark.asyncio
+async def test_auto_extractor_escalates_unsure_pages(tmp_path, mock_crawler, fake_llm):
+    """Test that auto mode only sends low-confidence pages to the LLM"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path), extractor="auto")
+    pages = {
+        "https://example.com/article": MockCrawlResult(html=ARTICLE_HTML),
+        "https://example.com/app": MockCrawlResult(html="<html><title>App</title><body><div id='root'></div></body></html>"),
+    }
+    mock_crawler.arun.side_effect = lambda url, **kwargs: pages[url]
+
+    await agent.crawl_page(mock_crawler, "https://example.com/article", test_mode=True)
+    await agent.crawl_page(mock_crawler, "https://example.com/app", test_mode=True)
+
+    assert fake_llm.calls == ["https://example.com/app"]
+    assert agent.extractor_counts == {"heuristic": 1, "llm": 1}
+
+@pytest.mark.asyncio
+async def test_llm_receives_pruned_chunks(tmp_path, mock_crawler):
+    """Test that the LLM gets pruned page text and the tokens saved are counted"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path))
+    html = ("<html><body><nav><a href='/'>Home</a><a href='/b'>Blog</a></nav><script>track();</script>"
+            "<h1>Title</h1><p>Useful text.</p></body></html>")
+    crawl4ai_markdown = "[Home](/) [Blog](/b)\n\n# Title\n\nUseful text.\n\n" + "Footer links " * 50
+    mock_crawler.arun.return_value = MockCrawlResult(html=html, content=crawl4ai_markdown)
+    sent_sections = []
+
+    def run(self, url, sections):
+        sent_sections.extend(sections)
+        return [{"index": 0, "content": sections}]
+
+    with patch.object(FakeExtractionStrategy, 'run', run):
+        await agent.crawl_page(mock_crawler, "https://example.com/page", test_mode=True)
+
+    assert sent_sections == ["# Title\n\nUseful text."]
+    assert agent.pruning_stats["pages"] == 1
+    assert agent.pruning_stats["tokens_after"] < agent.pruning_stats["tokens_before"]
+
+@pytest.mark.asyncio
+async def test_fetching_continues_while_extraction_is_slow(tmp_path, mock_crawler):
+    """Test that a slow LLM doesn't hold up fetching of the next pages"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path), concurrency=1,
+                                 llm_concurrency=1)
+    mock_crawler.arun.side_effect = make_linked_site(4)
+    fetched_during_first_extraction = []
+
+    def slow_run(self, url, sections):
+        time.sleep(0.05)
+        if not fetched_during_first_extraction:
+            fetched_during_first_extraction.append(mock_crawler.arun.call_count)
+        return [{"index": 0, "content": sections}]
+
+    with patch.object(FakeExtractionStrategy, 'run', slow_run):
+        await agent.crawl_page(mock_crawler, "https://example.com/0")
+
+    assert agent.pages_crawled == 4
+    assert len(list(tmp_path.glob("*.markdown"))) == 4
+    # The single fetch worker fetched every page while the first LLM call was running
+    assert fetched_during_first_extraction == [4]
+
+@pytest.mark.asyncio
+async def test_url_variants_are_fetched_once(tmp_path, mock_crawler):
+    """Test that spelling variants of a URL are crawled as one page"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path))
+    links = ['/a', '/a/', 'HTTPS://EXAMPLE.COM:443/a', '/a?utm_source=news', '/b?y=2&x=1', '/b?x=1&y=2&gclid=abc']
+    mock_crawler.arun.return_value = MockCrawlResult(
+        html="<html><title>Home</title>" + "".join(f'<a href="{link}">link</a>' for link in links) + "</html>"
+    )
+
+    await agent.crawl_page(mock_crawler, "https://example.com")
+
+    called_urls = [call.kwargs["url"] for call in mock_crawler.arun.call_args_list]
+    assert called_urls == ["https://example.com/", "https://example.com/a", "https://example.com/b?x=1&y=2"]
+
+@pytest.mark.asyncio
+async def test_relative_links_on_directory_pages(tmp_path, mock_crawler):
+    """Test that a directory URL is fetched with its trailing slash and its relative links resolve below it"""
+    agent = WebsiteCrawlingAgent("https://example.com/docs/", output_folder=str(tmp_path))
+    pages = {
+        "https://example.com/docs/": '<a href="intro.html">intro</a><a href="guide/">guide</a><a href="../docs">self</a>',
+        "https://example.com/docs/intro.html": '<p>Intro</p>',
+        "https://example.com/docs/guide/": '<a href="setup.html">setup</a>',
+        "https://example.com/docs/guide/setup.html": '<p>Setup</p>',
+    }
+
+    async def arun(url, **kwargs):
+        if url not in pages:
+            return MockCrawlResult(success=False, status_code=404)
+        return MockCrawlResult(html=f"<html><title>Docs</title>{pages[url]}</html>")
+
+    mock_crawler.arun.side_effect = arun
+    await agent.crawl_page(mock_crawler, "https://example.com/docs/")
+
+    called_urls = sorted(call.kwargs["url"] for call in mock_crawler.arun.call_args_list)
+    assert called_urls == sorted(pages)
+    assert agent.pages_crawled == 4
+
+@pytest.mark.asyncio
+async def test_rel_canonical_prevents_duplicate_fetches(tmp_path, mock_crawler):
+    """Test that a page's rel=canonical URL counts as visited and later duplicates are skipped"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path), concurrency=1)
+    pages = {
+        "https://example.com/": '<a href="/print">print</a><a href="/article">article</a><a href="/copy">copy</a>',
+        "https://example.com/print": '<link rel="canonical" href="/article"><p>Article</p>',
+        "https://example.com/copy": '<link rel="canonical" href="https://example.com/article"><p>Article</p>',
+    }
+
+    async def arun(url, **kwargs):
+        return MockCrawlResult(html=f"<html><title>Page</title>{pages.get(url, '')}</html>")
+
+    mock_crawler.arun.side_effect = arun
+    await agent.crawl_page(mock_crawler, "https://example.com/")
+
+    called_urls = [call.kwargs["url"] for call in mock_crawler.arun.call_args_list]
+    assert called_urls == ["https://example.com/", "https://example.com/print", "https://example.com/copy"]
+    assert (tmp_path / "print.markdown").exists()
+    assert not (tmp_path / "copy.markdown").exists()
+
+@pytest.mark.asyncio
+async def test_failed_write_marks_page_failed(tmp_path, mock_crawler):
+    """Test that a page whose output can't be written is recorded as failed"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path))
+    mock_crawler.arun.return_value = MockCrawlResult()
+
+    with patch.object(agent, 'save_content', side_effect=OSError("disk full")):
+        await agent.crawl_page(mock_crawler, "https://example.com/page", test_mode=True)
+
+    assert agent.writer.stats == {"written": 0, "failed": 1}
+    agent.state_store.flush()
+    status = agent.state_store.connection.execute(
+        "SELECT status FROM urls WHERE url = ?", ("https://example.com/page",)
+    ).fetchone()[0]
+    assert status == "failed"
+
+@pytest.mark.asyncio
+async def test_jsonl_output_goes_to_shards(tmp_path, mock_crawler):
+    """Test that jsonl output appends one record per page to a shard instead of a file per page"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_format="jsonl", output_folder=str(tmp_path))
+    mock_crawler.arun.side_effect = make_linked_site(3)
+
+    await agent.crawl_page(mock_crawler, "https://example.com/0")
+
+    with open(tmp_path / "pages-00000.jsonl", encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert sorted(record["url"] for record in records) == [f"https://example.com/{i}" for i in range(3)]
+    assert records[0]["title"] == "Chain page"
+    assert records[0]["status"] == 200
+    assert records[0]["fetched_at"] >= records[0]["fetch_started_at"]
+    assert json.loads(records[0]["content"])
+    assert not list(tmp_path.glob("*.meta.json"))
+
+@pytest.mark.asyncio
+async def test_sitemap_seeds_frontier_newest_first(tmp_path, mock_crawler):
+    """Test that sitemap pages are crawled newest first and max_pages goes to fresh pages"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path), concurrency=1, max_pages=3,
+                                 incremental=IncrementalOptions(use_sitemaps=True))
+    mock_crawler.arun.return_value = MockCrawlResult()
+    entries = [SitemapEntry("https://example.com/new", 3), SitemapEntry("https://example.com/mid", 2)]
+
+    with patch('website_crawling_agent.agent.discover_sitemap_entries', return_value=entries) as discover:
+        await agent.crawl_page(mock_crawler, "https://example.com/")
+
+    assert discover.call_args.args[3] == 3
+    called_urls = [call.kwargs["url"] for call in mock_crawler.arun.call_args_list]
+    assert called_urls == ["https://example.com/", "https://example.com/new", "https://example.com/mid"]
+
+@pytest.mark.asyncio
+async def test_incremental_skips_pages_unchanged_in_sitemap(tmp_path, mock_crawler):
+    """Test that an incremental crawl doesn't request pages whose sitemap lastmod predates the last crawl"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path),
+                                 incremental=IncrementalOptions(enabled=True, use_sitemaps=True))
+    url = "https://example.com/page"
+    metadata_path = incremental.metadata_path(agent.output_path(url))
+    incremental.save_metadata(metadata_path, incremental.build_metadata(url, {}, "hash", []))
+    mock_crawler.arun.return_value = MockCrawlResult()
+
+    with patch('website_crawling_agent.agent.discover_sitemap_entries', return_value=[SitemapEntry(url, 1000)]):
+        await agent.crawl_page(mock_crawler, "https://example.com/")
+
+    called_urls = [call.kwargs["url"] for call in mock_crawler.arun.call_args_list]
+    assert called_urls == ["https://example.com/"]
+
+@pytest.mark.asyncio
+async def test_max_depth_and_exclude_are_applied_before_queueing(tmp_path, mock_crawler):
+    """Test that excluded and too-deep pages never reach the browser"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path), max_depth=2,
+                                 exclude_patterns=[r"/private"])
+
+    async def arun(url, **kwargs):
+        result = await make_linked_site(6)(url)
+        result.html = result.html.replace("</html>", '<a href="/private">private</a></html>')
+        return result
+
+    mock_crawler.arun.side_effect = arun
+    await agent.crawl_page(mock_crawler, "https://example.com/0")
+
+    called_urls = [call.kwargs["url"] for call in mock_crawler.arun.call_args_list]
+    assert called_urls == ["https://example.com/0", "https://example.com/1", "https://example.com/2"]
+
+@pytest.mark.asyncio
+async def test_page_budget_goes_to_content_before_archives(tmp_path, mock_crawler):
+    """Test that with a small max_pages, content pages are crawled before paginated archives"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path), concurrency=1, max_pages=3)
+    pages = {
+        "https://example.com/": '<a href="/archive/page/2">older</a><a href="/tag/news">news</a>'
+                                '<a href="/about">about</a><a href="/post">post</a>',
+    }
+
+    async def arun(url, **kwargs):
+        return MockCrawlResult(html=f"<html><title>Page</title>{pages.get(url, '')}</html>")
+
+    mock_crawler.arun.side_effect = arun
+    await agent.crawl_page(mock_crawler, "https://example.com/")
+
+    called_urls = [call.kwargs["url"] for call in mock_crawler.arun.call_args_list]
+    assert called_urls == ["https://example.com/", "https://example.com/about", "https://example.com/post"]
+
+@pytest.mark.asyncio
+async def test_workers_share_frontier_through_coordinator(tmp_path):
+    """Test that coordinated workers each crawl only their own URLs, and every page once"""
+    coordinator_path = str(tmp_path / "coordinator.sqlite")
+    crawlers = []
+    workers = []
+    for worker_id in range(2):
+        crawler = AsyncMock()
+        crawler.arun.side_effect = make_linked_site(12)
+        crawlers.append(crawler)
+        workers.append(WebsiteCrawlingAgent(
+            "https://example.com/0", output_folder=str(tmp_path), worker_id=worker_id,
+            coordinator=SqliteCoordinator(coordinator_path, 2)
+        ))
+
+    await asyncio.gather(*(worker.crawl_page(crawler, "https://example.com/0")
+                           for worker, crawler in zip(workers, crawlers)))
+
+    fetched = [[call.kwargs["url"] for call in crawler.arun.call_args_list] for crawler in crawlers]
+    assert sorted(fetched[0] + fetched[1]) == sorted(f"https://example.com/{i}" for i in range(12))
+    for worker_id, urls in enumerate(fetched):
+        assert all(partition_for(url, 2) == worker_id for url in urls)
+    assert os.path.exists(tmp_path / ".crawl_state.worker-1.sqlite")
+
+def make_coordinated_workers(tmp_path, arun, **options):
+    """Two workers sharing a SQLite coordinator, each with a mock crawler serving `arun`
+
+    Retries wait long enough for the other worker to poll the coordinator in the meantime.
+    """
+    coordinator_path = str(tmp_path / "coordinator.sqlite")
+    crawlers = []
+    workers = []
+    for worker_id in range(2):
+        crawler = AsyncMock()
+        crawler.arun.side_effect = arun
+        crawlers.append(crawler)
+        workers.append(WebsiteCrawlingAgent(
+            "https://example.com/0", output_folder=str(tmp_path), worker_id=worker_id,
+            coordinator=SqliteCoordinator(coordinator_path, 2),
+            politeness=PolitenessOptions(retry_base_delay=0.6), **options
+        ))
+    return workers, crawlers
+
+@pytest.mark.asyncio
+async def test_coordinated_fetch_retry_keeps_crawl_open(tmp_path):
+    """Test that a page waiting for a retry is not done in the coordinator, so its links are still crawled"""
+    site = make_linked_site(6)
+    failures = []
+
+    async def arun(url, **kwargs):
+        if url == "https://example.com/0" and not failures:
+            failures.append(url)
+            return MockCrawlResult(success=False, status_code=500)
+        return await site(url, **kwargs)
+
+    workers, crawlers = make_coordinated_workers(tmp_path, arun)
+    await asyncio.gather(*(worker.crawl_page(crawler, "https://example.com/0")
+                           for worker, crawler in zip(workers, crawlers)))
+
+    fetched = [call.kwargs["url"] for crawler in crawlers for call in crawler.arun.call_args_list]
+    assert sorted(set(fetched)) == sorted(f"https://example.com/{i}" for i in range(6))
+    assert fetched.count("https://example.com/0") == 2
+    assert workers[0].coordinator.finished()
+
+@pytest.mark.asyncio
+async def test_coordinated_extraction_retry_keeps_crawl_open(tmp_path, fake_llm):
+    """Test that a page whose extraction is retried is only done in the coordinator after the retry"""
+    failures = []
+    finished_during_retry = []
+    site = make_linked_site(4)
+
+    class FlakyExtractionStrategy(FakeExtractionStrategy):
+        def run(self, url, sections):
+            if url == "https://example.com/0" and not failures:
+                failures.append(url)
+                return [{"index": 0, "error": True, "content": "rate limited"}]
+            return super().run(url, sections)
+
+    async def arun(url, **kwargs):
+        if url == "https://example.com/0" and failures:
+            finished_during_retry.append(workers[0].coordinator.finished())
+        return await site(url, **kwargs)
+
+    workers, crawlers = make_coordinated_workers(tmp_path, arun)
+    with patch('website_crawling_agent.agent.LLMExtractionStrategy', FlakyExtractionStrategy):
+        await asyncio.gather(*(worker.crawl_page(crawler, "https://example.com/0")
+                               for worker, crawler in zip(workers, crawlers)))
+
+    fetched = [call.kwargs["url"] for crawler in crawlers for call in crawler.arun.call_args_list]
+    assert fetched.count("https://example.com/0") == 2
+    assert sum(worker.pages_crawled for worker in workers) == 4
+    assert finished_during_retry == [False]
+    assert (tmp_path / "0.markdown").exists()
+    assert workers[0].coordinator.finished()
+
+@pytest.mark.asyncio
+async def test_coordinated_workers_share_max_pages(tmp_path):
+    """Test that max_pages limits the pages of all coordinated workers together"""
+    coordinator_path = str(tmp_path / "coordinator.sqlite")
+    crawlers = []
+    workers = []
+    for worker_id in range(2):
+        crawler = AsyncMock()
+        crawler.arun.side_effect = make_linked_site(30)
+        crawlers.append(crawler)
+        workers.append(WebsiteCrawlingAgent(
+            "https://example.com/0", output_folder=str(tmp_path), worker_id=worker_id, max_pages=5,
+            coordinator=SqliteCoordinator(coordinator_path, 2)
+        ))
+
+    await asyncio.gather(*(worker.crawl_page(crawler, "https://example.com/0")
+                           for worker, crawler in zip(workers, crawlers)))
+
+    assert sum(crawler.arun.call_count for crawler in crawlers) == 5
+
+@pytest.mark.asyncio
+async def test_stage_metrics_and_profile(tmp_path, mock_crawler):
+    """Test that stage timings and counters are collected and the sampled pages profiled"""
+    metrics_path = tmp_path / "metrics.jsonl"
+    agent = WebsiteCrawlingAgent("https://example.com/0", output_folder=str(tmp_path), extractor="heuristic",
+                                 metrics=MetricsOptions(path=str(metrics_path), profile_pages=2))
+    mock_crawler.arun.side_effect = make_linked_site(4)
+
+    await agent.crawl_page(mock_crawler, "https://example.com/0")
+
+    snapshot = json.loads(metrics_path.read_text().splitlines()[-1])
+    assert snapshot['counters']['pages'] == 4
+    assert snapshot['counters']['pages_saved'] == 4
+    for stage in ('fetch', 'parse', 'extract', 'write'):
+        assert snapshot['stages'][stage]['count'] == 4
+    assert snapshot['gauges']['fetch_in_flight'] == 0
+    assert len(agent.profiler.sampled_urls) == 2
+    assert agent.profiler.save() is not None
+    assert os.path.exists(tmp_path / "profile.pstats")
+
+def chain_fetch(page_count):
+    """Serve the pages of make_linked_site over plain HTTP"""
+    def fetch(session, url):
+        number = int(url.rsplit('/', 1)[-1])
+        links = f'<a href="/{number + 1}">next</a>' if number + 1 < page_count else ''
+        return HttpPageResult(url, 200, f'<html><title>Page {number}</title><body><p>Text {number}</p>{links}</body></html>')
+    return fetch
+
+@pytest.mark.asyncio
+async def test_iter_pages_yields_records_without_saving(tmp_path):
+    """Test that iter_pages yields a record per page, and not saving output writes no page files"""
+    agent = WebsiteCrawlingAgent("https://example.com/0", output_folder=str(tmp_path), fetch_mode="http",
+                                 output=OutputOptions(save=False))
+
+    with patch('website_crawling_agent.fetcher.http_fetch', side_effect=chain_fetch(3)):
+        records = [record async for record in agent.iter_pages()]
+
+    assert [record['url'] for record in records] == ["https://example.com/0", "https://example.com/1",
+                                                     "https://example.com/2"]
+    assert records[0]['title'] == "Page 0"
+    assert records[0]['status'] == 200
+    assert "Text 0" in records[0]['content']
+    assert not list(tmp_path.glob("*.markdown")) and not list(tmp_path.glob("*.meta.json"))
+    assert agent.metrics.counters['pages_streamed'] == 3
+
+@pytest.mark.asyncio
+async def test_iter_pages_also_saves_by_default(tmp_path):
+    """Test that streamed pages are still written to the output folder"""
+    agent = WebsiteCrawlingAgent("https://example.com/0", output_folder=str(tmp_path), fetch_mode="http")
+
+    with patch('website_crawling_agent.fetcher.http_fetch', side_effect=chain_fetch(2)):
+        records = [record async for record in agent.iter_pages()]
+
+    assert len(records) == 2
+    assert (tmp_path / "0.markdown").exists() and (tmp_path / "1.markdown").exists()
+
+@pytest.mark.asyncio
+async def test_iter_pages_applies_backpressure(tmp_path):
+    """Test that a consumer that stops reading holds up the crawl, and leaving early ends it"""
+    agent = WebsiteCrawlingAgent("https://example.com/0", output_folder=str(tmp_path), fetch_mode="http",
+                                 output=OutputOptions(save=False), concurrency=1, max_pending_extractions=1)
+
+    with patch('website_crawling_agent.fetcher.http_fetch', side_effect=chain_fetch(50)):
+        pages = agent.iter_pages(buffer_size=2)
+        first = await pages.__anext__()
+        await asyncio.sleep(0.2)
+        # The buffer, one page waiting to enter it and one fetched page waiting for extraction
+        assert agent.pages_crawled <= 5
+        await pages.aclose()
+
+    assert first['url'] == "https://example.com/0"
+    assert agent.pages_crawled < 50
+    assert agent.page_stream is None
+
+@pytest.mark.asyncio
+async def test_sitemap_skips_out_of_scope_pages_before_picking_the_newest(tmp_path, mock_crawler):
+    """Test that excluded and off-site sitemap pages don't use up the max_pages picked from the sitemaps"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path), concurrency=1, max_pages=2,
+                                 incremental=IncrementalOptions(use_sitemaps=True), exclude_patterns=[r"/private"])
+    mock_crawler.arun.return_value = MockCrawlResult()
+    accepted = []
+
+    def discover(session, url, since, limit, accept):
+        for entry_url in ["https://example.com/private/a", "https://other.com/b", "https://example.com/c"]:
+            if accept(entry_url):
+                accepted.append(entry_url)
+        return [SitemapEntry(entry_url) for entry_url in accepted]
+
+    with patch('website_crawling_agent.agent.discover_sitemap_entries', side_effect=discover):
+        await agent.crawl_page(mock_crawler, "https://example.com/")
+
+    assert accepted == ["https://example.com/c"]
+
+def test_extraction_model_is_read_once(tmp_path):
+    """Test that the LLM provider for cache keys comes from a single strategy, built on first use"""
+    strategy = Mock(provider="openai/test-model")
+    with patch('website_crawling_agent.agent.LLMExtractionStrategy', return_value=strategy) as create:
+        agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path))
+        assert create.call_count == 0
+        assert agent.extraction_model() == "openai/test-model"
+        assert agent.extraction_model() == "openai/test-model"
+
+    assert create.call_count == 1
+
+@pytest.mark.asyncio
+async def test_conditional_request_goes_through_the_fetcher(tmp_path):
+    """Test that an incremental crawl's conditional request is paced like other requests"""
+    agent = WebsiteCrawlingAgent("https://example.com", output_folder=str(tmp_path),
+                                 incremental=IncrementalOptions(enabled=True))
+    metadata = incremental.build_metadata("https://example.com/a", {"ETag": '"v1"'}, "hash", [])
+
+    with patch.object(agent.fetcher, 'run_request', AsyncMock(return_value=True)) as run_request:
+        assert await agent.is_unchanged_on_server("https://example.com/a", metadata)
+
+    assert run_request.await_args.args[:2] == ("https://example.com/a", incremental.is_not_modified)
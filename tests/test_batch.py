@@ -0,0 +1,198 @@
+import pytest
+import asyncio
+from unittest.mock import patch
+from website_crawling_agent.batch import BatchCrawler, FairScheduler, Seed, parse_seed_file, parse_seed_line
+from website_crawling_agent.fetcher import HttpPageResult
+from website_crawling_agent.options import MetricsOptions, PolitenessOptions
+
+class FakeExtractionStrategy:
+    """Stands in for LLMExtractionStrategy so tests never call an LLM"""
+    calls = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+    def run(self, url, sections):
+        FakeExtractionStrategy.calls.append(url)
+        return [{"index": 0, "content": section} for section in sections]
+
+@pytest.fixture(autouse=True)
+def fake_llm():
+    FakeExtractionStrategy.calls = []
+    with patch('website_crawling_agent.agent.LLMExtractionStrategy', FakeExtractionStrategy):
+        yield FakeExtractionStrategy
+
+@pytest.fixture(autouse=True)
+def browser_check_cache(tmp_path_factory, monkeypatch):
+    """Keep browser check markers out of the real cache folder"""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path_factory.mktemp("cache")))
+
+def site_html(url):
+    """A page of a small test site: every page links to three more on its site, and to another site"""
+    path = url.split('/', 3)[-1] if url.count('/') > 2 else ''
+    number = int(path) if path.isdigit() else 0
+    links = "".join(f'<a href="/{number * 3 + i}">page</a>' for i in range(1, 4))
+    return f'<html><title>Page {number}</title><body><p>Text of {url}</p>{links}' \
+           f'<a href="https://elsewhere.org/">away</a></body></html>'
+
+def serve_site(session, url):
+    return HttpPageResult(url, 200, site_html(url))
+
+def test_parse_seed_line():
+    """Test parsing a seed line with its options"""
+    seed = parse_seed_line("https://a.com/docs max_pages=5 output=out/a\n")
+    assert (seed.url, seed.max_pages, seed.output_folder) == ("https://a.com/docs", 5, "out/a")
+    assert parse_seed_line("https://b.com").max_pages is None
+    assert parse_seed_line("   ") is None
+    assert parse_seed_line("# a comment") is None
+
+def test_parse_seed_line_rejects_bad_lines():
+    """Test that unknown options and non-http URLs are errors"""
+    with pytest.raises(ValueError):
+        parse_seed_line("a.com")
+    with pytest.raises(ValueError):
+        parse_seed_line("https://a.com max_pages=many")
+    with pytest.raises(ValueError):
+        parse_seed_line("https://a.com depth=2")
+
+def test_parse_seed_file_reports_line_number(tmp_path):
+    """Test that seed files skip comments and name the line of an error"""
+    path = tmp_path / "seeds.txt"
+    path.write_text("# sites\nhttps://a.com\n\nhttps://b.com max_pages=2\n")
+    assert [seed.url for seed in parse_seed_file(path)] == ["https://a.com", "https://b.com"]
+
+    path.write_text("https://a.com\nhttps://b.com pages=2\n")
+    with pytest.raises(ValueError, match="line 2"):
+        parse_seed_file(path)
+
+@pytest.mark.asyncio
+async def test_fair_scheduler_takes_turns_between_keys():
+    """Test that freed slots go to each waiting key in turn, not in arrival order"""
+    scheduler = FairScheduler(1)
+    await scheduler.acquire("busy")
+    order = []
+
+    async def use(key):
+        async with scheduler.slot(key):
+            order.append(key)
+
+    tasks = [asyncio.ensure_future(use(key)) for key in ["busy", "busy", "busy", "quiet"]]
+    await asyncio.sleep(0)
+    scheduler.release()
+    await asyncio.gather(*tasks)
+
+    assert order == ["busy", "quiet", "busy", "busy"]
+    assert scheduler.in_use == 0
+
+@pytest.mark.asyncio
+async def test_fair_scheduler_cancelled_waiter_gives_up_its_place():
+    """Test that a cancelled wait leaves no waiter and no slot behind"""
+    scheduler = FairScheduler(1)
+    await scheduler.acquire("a")
+    waiter = asyncio.ensure_future(scheduler.acquire("b"))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert not scheduler.waiters
+    scheduler.release()
+    assert scheduler.in_use == 0
+
+def test_output_folders_per_domain(tmp_path):
+    """Test that every seed gets its own folder, numbered for repeated domains"""
+    batch = BatchCrawler(
+        ["https://a.com", "https://b.com/docs", "https://a.com/blog", Seed("https://c.com", output_folder="mine")],
+        output_folder=str(tmp_path)
+    )
+    assert batch.output_folders == [
+        str(tmp_path / "a.com"), str(tmp_path / "b.com"), str(tmp_path / "a.com-2"), "mine"
+    ]
+
+def test_option_groups_reach_shared_resources_and_agents(tmp_path):
+    """Test that shared politeness options go to the shared resources and each seed gets its own metrics file"""
+    metrics = MetricsOptions(path=str(tmp_path / "metrics.jsonl"))
+    batch = BatchCrawler(["https://a.com", "https://b.com"], output_folder=str(tmp_path), fetch_mode="http",
+                         politeness=PolitenessOptions(max_host_rate=2.0), metrics=metrics)
+
+    agent = batch.create_agent(1)
+
+    assert batch.shared.host_scheduler.max_rate == 2.0
+    assert agent.host_scheduler is batch.shared.host_scheduler
+    assert agent.metrics_reporter.path == str(tmp_path / "metrics.b.com.jsonl")
+    assert metrics.path == str(tmp_path / "metrics.jsonl")
+    agent.close()
+
+def test_batch_rejects_metrics_port():
+    """Test that options only one crawl per process can use are refused"""
+    with pytest.raises(ValueError):
+        BatchCrawler(["https://a.com"], metrics=MetricsOptions(port=9100))
+
+@pytest.mark.asyncio
+async def test_batch_crawls_each_seed_into_its_own_folder(tmp_path, fake_llm):
+    """Test an http batch: separate folders, per-seed quotas, domain boundaries and one shared LLM stage"""
+    batch = BatchCrawler(
+        [Seed("https://a.com/", max_pages=2), "https://b.com/"], output_folder=str(tmp_path), max_pages=4,
+        concurrency=3, fetch_mode="http"
+    )
+
+    with patch('website_crawling_agent.fetcher.http_fetch', side_effect=serve_site):
+        await batch.crawl()
+
+    pages = {result['url']: result['pages'] for result in batch.results}
+    assert pages == {"https://a.com/": 2, "https://b.com/": 4}
+    assert len(list((tmp_path / "a.com").glob("*.markdown"))) == 2
+    assert len(list((tmp_path / "b.com").glob("*.markdown"))) == 4
+    assert not any("elsewhere.org" in url for url in fake_llm.calls)
+    assert batch.shared.extraction_stage.stats['pages'] == 6
+    assert batch.shared.fetch_scheduler.in_use == 0
+
+@pytest.mark.asyncio
+async def test_failing_seed_does_not_stop_the_batch(tmp_path):
+    """Test that an error in one seed is reported and the other seeds are crawled"""
+    batch = BatchCrawler(["https://a.com/", "https://b.com/"], output_folder=str(tmp_path), max_pages=1,
+                         fetch_mode="http")
+    crawl_page = batch.agent_class.crawl_page
+
+    async def failing_crawl_page(agent, crawler, url, **kwargs):
+        if "a.com" in url:
+            raise RuntimeError("boom")
+        return await crawl_page(agent, crawler, url, **kwargs)
+
+    with patch.object(batch.agent_class, 'crawl_page', failing_crawl_page), \
+            patch('website_crawling_agent.fetcher.http_fetch', side_effect=serve_site):
+        await batch.crawl()
+
+    results = {result['url']: result for result in batch.results}
+    assert results["https://a.com/"]['error'] == "boom"
+    assert results["https://b.com/"]['pages'] == 1
+
+class FakeBrowser:
+    """Stands in for AsyncWebCrawler and counts how many were started"""
+    started = 0
+
+    def __init__(self, **kwargs):
+        FakeBrowser.started += 1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def arun(self, url, **kwargs):
+        html = site_html(url)
+        return HttpPageResult(url, 200, html)
+
+@pytest.mark.asyncio
+async def test_browser_batch_starts_one_browser(tmp_path):
+    """Test that all seeds of a browser batch share a single browser"""
+    FakeBrowser.started = 0
+    batch = BatchCrawler(["https://a.com/", "https://b.com/", "https://c.com/"], output_folder=str(tmp_path),
+                         max_pages=2, check_browser=False)
+
+    with patch('website_crawling_agent.agent.AsyncWebCrawler', FakeBrowser):
+        await batch.crawl()
+
+    assert FakeBrowser.started == 1
+    assert sorted(result['pages'] for result in batch.results) == [2, 2, 2]
@@ -0,0 +1,123 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from website_crawling_agent.browser_pool import RequestBlocker, BrowserSessionPool, ESTIMATED_RESOURCE_BYTES
+from website_crawling_agent.fetcher import TieredFetcher
+from website_crawling_agent.politeness import HostScheduler
+
+class FakeRoute:
+    def __init__(self, resource_type, url):
+        self.request = Mock(resource_type=resource_type, url=url)
+        self.aborted = False
+        self.continued = False
+
+    async def abort(self):
+        self.aborted = True
+
+    async def continue_(self):
+        self.continued = True
+
+class FakeStrategy:
+    def __init__(self):
+        self.hooks = {'before_goto': None}
+        self.killed = []
+
+    def set_hook(self, hook_type, hook):
+        self.hooks[hook_type] = hook
+
+    async def kill_session(self, session_id):
+        self.killed.append(session_id)
+
+class FakePage:
+    def __init__(self):
+        self.routes = []
+
+    async def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+@pytest.mark.asyncio
+async def test_blocker_aborts_blocked_types_and_patterns():
+    """Test that images, fonts and tracker URLs are aborted and everything else continues"""
+    blocker = RequestBlocker()
+    image = FakeRoute("image", "https://example.com/photo.jpg")
+    tracker = FakeRoute("script", "https://www.google-analytics.com/analytics.js")
+    document = FakeRoute("document", "https://example.com/page")
+
+    for route in (image, tracker, document):
+        await blocker.handle_route(route)
+
+    assert image.aborted and tracker.aborted
+    assert document.continued and not document.aborted
+    assert blocker.blocked_counts == {"image": 1, "script": 1}
+    assert blocker.estimated_bytes_saved == ESTIMATED_RESOURCE_BYTES["image"] + ESTIMATED_RESOURCE_BYTES["script"]
+
+@pytest.mark.asyncio
+async def test_blocker_routes_each_page_once():
+    """Test that a reused page doesn't get a second route handler"""
+    blocker = RequestBlocker()
+    strategy = FakeStrategy()
+    crawler = Mock(crawler_strategy=strategy)
+    page = FakePage()
+
+    assert blocker.attach(crawler) is True
+    await strategy.hooks["before_goto"](page)
+    await strategy.hooks["before_goto"](page)
+
+    assert len(page.routes) == 1
+    assert page.routes[0][0] == "**/*"
+
+def test_blocker_with_nothing_to_block_is_not_attached():
+    """Test that an empty blocker leaves the crawler alone, as does a crawler without hooks"""
+    assert RequestBlocker(resource_types=(), url_patterns=()).attach(Mock(crawler_strategy=FakeStrategy())) is False
+    assert RequestBlocker().attach(AsyncMock()) is False
+
+@pytest.mark.asyncio
+async def test_sessions_are_recycled():
+    """Test that a session is closed and replaced after pages_per_session pages or an error"""
+    pool = BrowserSessionPool(size=1, pages_per_session=2)
+    pool.start()
+    crawler = Mock(crawler_strategy=FakeStrategy())
+
+    session = await pool.acquire()
+    assert session.id == "crawl-0-0"
+    await pool.release(crawler, session)
+    session = await pool.acquire()
+    await pool.release(crawler, session)
+    assert crawler.crawler_strategy.killed == ["crawl-0-0"]
+
+    session = await pool.acquire()
+    assert session.id == "crawl-0-1"
+    await pool.release(crawler, session, broken=True)
+    assert crawler.crawler_strategy.killed == ["crawl-0-0", "crawl-0-1"]
+    assert pool.recycled == 2
+
+    await pool.close(crawler)
+    assert crawler.crawler_strategy.killed[-1] == "crawl-0-2"
+
+@pytest.mark.asyncio
+async def test_fetcher_uses_pooled_sessions():
+    """Test that browser fetches borrow a pooled session and record render time"""
+    pool = BrowserSessionPool(size=2)
+    pool.start()
+    fetcher = TieredFetcher(HostScheduler(), session=None, session_pool=pool)
+    crawler = AsyncMock()
+    crawler.arun.return_value = Mock(success=True, status_code=200, response_headers={})
+
+    await fetcher.fetch(crawler, "https://example.com/a")
+    await fetcher.fetch(crawler, "https://example.com/b")
+
+    session_ids = [call.kwargs["session_id"] for call in crawler.arun.call_args_list]
+    assert set(session_ids) <= {"crawl-0-0", "crawl-1-0"}
+    assert fetcher.render_stats["pages"] == 2
+    assert pool.sessions.qsize() == 2
+
+@pytest.mark.asyncio
+async def test_fetcher_without_pooling():
+    """Test that pages_per_session=0 leaves session handling to crawl4ai"""
+    pool = BrowserSessionPool(size=2, pages_per_session=0)
+    pool.start()
+    fetcher = TieredFetcher(HostScheduler(), session=None, session_pool=pool)
+    crawler = AsyncMock()
+    crawler.arun.return_value = Mock(success=True, status_code=200, response_headers={})
+
+    await fetcher.fetch(crawler, "https://example.com/a")
+    assert "session_id" not in crawler.arun.call_args.kwargs
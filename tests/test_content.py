@@ -0,0 +1,24 @@
+from website_crawling_agent.content import html_to_markdown
+
+def test_headings_paragraphs_and_lists():
+    """Test that block elements become markdown lines"""
+    html = """
+    <html><head><title>Ignored</title></head><body>
+        <h1>Title</h1>
+        <p>First   paragraph with <a href="/x">a link</a>.</p>
+        <ul><li>One</li><li>Two</li></ul>
+    </body></html>
+    """
+
+    assert html_to_markdown(html) == "# Title\n\nFirst paragraph with a link.\n\n- One\n\n- Two"
+
+def test_scripts_styles_and_comments_are_dropped():
+    """Test that non-content markup never reaches the text"""
+    html = "<body><script>var x = 1;</script><style>p {}</style><!-- note --><p>Text</p><svg><text>icon</text></svg></body>"
+
+    assert html_to_markdown(html) == "Text"
+
+def test_empty_input():
+    """Test that empty or missing HTML gives empty text"""
+    assert html_to_markdown("") == ""
+    assert html_to_markdown(None) == ""
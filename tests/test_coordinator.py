@@ -0,0 +1,174 @@
+import pytest
+from website_crawling_agent.coordinator import RedisCoordinator, SqliteCoordinator, partition_for
+
+class FakeRedis:
+    """In-memory stand-in for the few Redis commands the coordinator uses"""
+
+    def __init__(self):
+        self.data = {}
+
+    def sadd(self, key, member):
+        members = self.data.setdefault(key, set())
+        if member in members:
+            return 0
+        members.add(member)
+        return 1
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def decr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) - 1
+        return self.data[key]
+
+    def get(self, key):
+        value = self.data.get(key)
+        return None if value is None else str(value)
+
+    def rpush(self, key, value):
+        self.data.setdefault(key, []).append(value)
+
+    def lpop(self, key):
+        values = self.data.get(key)
+        return values.pop(0) if values else None
+
+    def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = str(value)
+
+    def hdel(self, key, field):
+        return 1 if self.data.get(key, {}).pop(field, None) is not None else 0
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def register_script(self, script):
+        """Runs the coordinator's take script, the only one it registers"""
+        assert "LPOP" in script and "HSET" in script
+
+        def take(keys, args):
+            queue_key, taken_key = keys
+            entries = []
+            for _ in range(int(args[0])):
+                entry = self.lpop(queue_key)
+                if entry is None:
+                    break
+                depth, url = entry.split(" ", 1)
+                self.hset(taken_key, url, depth)
+                entries.append(entry)
+            return entries
+
+        return take
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def close(self):
+        pass
+
+@pytest.fixture(params=["sqlite", "redis"])
+def make_coordinator(request, tmp_path):
+    """Builds coordinators that share one backend, like workers in separate processes"""
+    redis = FakeRedis()
+    coordinators = []
+
+    def make(partitions=2, partition_by="url"):
+        if request.param == "sqlite":
+            coordinator = SqliteCoordinator(str(tmp_path / "coordinator.sqlite"), partitions, partition_by)
+        else:
+            coordinator = RedisCoordinator(redis, partitions, partition_by)
+        coordinators.append(coordinator)
+        return coordinator
+
+    yield make
+    for coordinator in coordinators:
+        coordinator.close()
+
+def urls_of(partition, partitions=2, count=20):
+    return [url for url in (f"https://example.com/{i}" for i in range(count))
+            if partition_for(url, partitions) == partition]
+
+def test_partition_by_host_keeps_hosts_together():
+    """Test that host partitioning sends every URL of a host to the same worker"""
+    partitions = {partition_for(f"https://a.example.com/{i}", 8, "host") for i in range(20)}
+    assert len(partitions) == 1
+    assert len({partition_for(f"https://example.com/{i}", 8) for i in range(20)}) > 1
+
+def test_urls_are_queued_once_across_workers(make_coordinator):
+    """Test that a URL added by two workers is only queued once"""
+    first, second = make_coordinator(), make_coordinator()
+    assert first.add("https://example.com/a")
+    assert not second.add("https://example.com/a")
+
+def test_trailing_slash_variants_are_queued_once(make_coordinator):
+    """Test that /a/ is not queued again after /a, and that both have the same owner"""
+    first, second = make_coordinator(), make_coordinator()
+    assert partition_for("https://example.com/a/", 2) == partition_for("https://example.com/a", 2)
+    assert first.add("https://example.com/a/")
+    assert not second.add("https://example.com/a")
+
+def test_workers_only_take_their_own_urls(make_coordinator):
+    """Test that each worker takes exactly the URLs of its partition"""
+    first, second = make_coordinator(), make_coordinator()
+    for i in range(20):
+        first.add(f"https://example.com/{i}", depth=1)
+
+    assert sorted(url for url, _ in first.take(0, 100)) == sorted(urls_of(0))
+    assert sorted(url for url, _ in second.take(1, 100)) == sorted(urls_of(1))
+    assert first.take(0, 100) == []
+
+def test_finished_waits_for_taken_urls(make_coordinator):
+    """Test that the crawl is only finished once every taken URL is done"""
+    coordinator = make_coordinator(partitions=1)
+    assert coordinator.finished()
+
+    coordinator.add("https://example.com/a")
+    assert not coordinator.finished()
+    [(url, depth)] = coordinator.take(0, 10)
+    assert not coordinator.finished()
+
+    coordinator.add("https://example.com/b", depth + 1)
+    coordinator.done(url)
+    assert not coordinator.finished()
+    assert coordinator.take(0, 10) == [("https://example.com/b", 1)]
+    coordinator.done("https://example.com/b")
+    assert coordinator.finished()
+
+def test_page_budget_is_shared(make_coordinator):
+    """Test that max_pages counts the pages claimed by every worker"""
+    first, second = make_coordinator(), make_coordinator()
+    assert first.claim(3)
+    assert second.claim(3)
+    assert first.claim(3)
+    assert not second.claim(3)
+    assert first.finished(3)
+
+def test_requeue_returns_taken_urls(make_coordinator):
+    """Test that URLs taken by an interrupted worker can be taken again"""
+    coordinator = make_coordinator(partitions=1)
+    coordinator.add("https://example.com/a", depth=2)
+    coordinator.take(0, 10)
+
+    coordinator.requeue([0])
+    assert coordinator.take(0, 10) == [("https://example.com/a", 2)]
+
+def test_reset_forgets_previous_crawl(make_coordinator):
+    """Test that a reset coordinator queues old URLs again"""
+    coordinator = make_coordinator(partitions=1)
+    coordinator.add("https://example.com/a")
+    coordinator.claim()
+
+    coordinator.reset()
+    assert coordinator.finished()
+    assert coordinator.claimed() == 0
+    assert coordinator.add("https://example.com/a")
+
+def test_sqlite_takes_shallow_urls_first(tmp_path):
+    """Test that the SQLite coordinator hands out the shallowest URLs first"""
+    coordinator = SqliteCoordinator(str(tmp_path / "coordinator.sqlite"), 1)
+    coordinator.add("https://example.com/deep", depth=3)
+    coordinator.add("https://example.com/shallow", depth=1)
+
+    assert coordinator.take(0, 1) == [("https://example.com/shallow", 1)]
+    coordinator.close()
@@ -0,0 +1,91 @@
+import pytest
+from website_crawling_agent.extraction_cache import ExtractionCache, make_cache_key
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"))
+    yield cache
+    cache.close()
+
+def test_cache_key_depends_on_content_instruction_and_model():
+    """Test that changing any part of the input changes the key"""
+    key = make_cache_key("content", "instruction", "model")
+
+    assert key == make_cache_key("content", "instruction", "model")
+    assert key != make_cache_key("other content", "instruction", "model")
+    assert key != make_cache_key("content", "other instruction", "model")
+    assert key != make_cache_key("content", "instruction", "other model")
+
+def test_get_and_put_count_hits_and_misses(cache):
+    """Test that lookups are counted as hits or misses"""
+    assert cache.get("key") is None
+    cache.put("key", "value")
+    assert cache.get("key") == "value"
+
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1, "bytes": 5}
+
+def test_least_recently_used_is_evicted(tmp_path):
+    """Test that the cache stays within its size limit by evicting the oldest entries"""
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"), max_bytes=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    cache.flush()
+    cache.get("a")
+    cache.put("c", "cccc")
+    cache.flush()
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+    assert cache.total_bytes == 8
+    cache.close()
+
+def test_replacing_an_entry_keeps_size_accurate(cache):
+    """Test that overwriting a key does not count its old value"""
+    cache.put("key", "12345")
+    cache.flush()
+    cache.put("key", "123")
+    cache.flush()
+
+    assert cache.total_bytes == 3
+    assert len(cache) == 1
+
+def test_cache_persists_between_runs(tmp_path):
+    """Test that a later run sees entries from an earlier one"""
+    path = str(tmp_path / "cache.sqlite")
+    first = ExtractionCache(path)
+    first.put("key", "value")
+    first.close()
+
+    second = ExtractionCache(path)
+    assert second.get("key") == "value"
+    assert second.total_bytes == 5
+    second.close()
+
+def test_writes_are_batched(tmp_path):
+    """Test that entries are only committed once a batch is full, and are served from memory until then"""
+    path = str(tmp_path / "cache.sqlite")
+    cache = ExtractionCache(path, batch_size=2, flush_interval=60)
+    other = ExtractionCache(path)
+    cache.put("a", "aaaa")
+
+    assert cache.get("a") == "aaaa"
+    assert other.get("a") is None
+    cache.put("b", "bbbb")
+    assert other.get("a") == "aaaa"
+    other.close()
+    cache.close()
+
+def test_eviction_counts_entries_of_other_crawls(tmp_path):
+    """Test that eviction sees the entries another cache on the same file added"""
+    path = str(tmp_path / "cache.sqlite")
+    first = ExtractionCache(path, max_bytes=10, batch_size=1)
+    second = ExtractionCache(path, max_bytes=10, batch_size=1)
+    first.put("a", "aaaa")
+    second.put("b", "bbbb")
+    first.put("c", "cccc")
+
+    assert first.total_bytes == 8
+    assert first.get("a") is None
+    second.close()
+    first.close()
@@ -0,0 +1,161 @@
+import asyncio
+import threading
+import time
+import pytest
+from website_crawling_agent.extraction_stage import ExtractionStage, ExtractionJob, pack_pages, split_packed_blocks
+
+class RecordingStrategy:
+    """Records how many runs overlap and answers like a tagging LLM would"""
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+    runs = []
+
+    def __init__(self, instruction, delay=0, tag_pages=True):
+        self.instruction = instruction
+        self.delay = delay
+        self.tag_pages = tag_pages
+
+    def run(self, url, sections):
+        with RecordingStrategy.lock:
+            RecordingStrategy.in_flight += 1
+            RecordingStrategy.max_in_flight = max(RecordingStrategy.max_in_flight, RecordingStrategy.in_flight)
+            RecordingStrategy.runs.append((url, sections))
+        time.sleep(self.delay)
+        with RecordingStrategy.lock:
+            RecordingStrategy.in_flight -= 1
+
+        if '<page id="' not in sections[0]:
+            return [{"index": 0, "tags": [], "content": sections}]
+        blocks = []
+        for page_id in range(sections[0].count('<page id="')):
+            tags = [f"page-{page_id}"] if self.tag_pages else []
+            blocks.append({"index": page_id, "tags": tags, "content": [f"page {page_id}"]})
+        return blocks
+
+@pytest.fixture(autouse=True)
+def reset_strategy():
+    RecordingStrategy.in_flight = 0
+    RecordingStrategy.max_in_flight = 0
+    RecordingStrategy.runs = []
+
+def make_jobs(count, tokens=10):
+    return [ExtractionJob(f"https://example.com/{i}", [f"text {i}"], tokens, None) for i in range(count)]
+
+def test_pack_and_split_pages():
+    """Test that packed pages are numbered and tagged blocks go back to their page"""
+    packed = pack_pages(make_jobs(2))
+    assert '<page id="0" url="https://example.com/0">\ntext 0\n</page>' in packed
+    assert '<page id="1"' in packed
+
+    blocks = [
+        {"index": 0, "tags": ["page-1", "intro"], "content": ["b"]},
+        {"index": 1, "tags": ["page-0"], "content": ["a"]},
+        {"index": 2, "tags": ["page-7"], "content": ["unknown page"]},
+        {"index": 3, "tags": [], "content": ["untagged"]},
+    ]
+    by_page = split_packed_blocks(blocks, 2)
+    assert by_page[0] == [{"index": 1, "tags": [], "content": ["a"]}]
+    assert by_page[1] == [{"index": 0, "tags": ["intro"], "content": ["b"]}]
+
+@pytest.mark.asyncio
+async def test_stage_limits_llm_concurrency():
+    """Test that no more than `concurrency` LLM requests run at once"""
+    stage = ExtractionStage(lambda instruction: RecordingStrategy(instruction, delay=0.02), "Extract", concurrency=2)
+    stage.start()
+    try:
+        results = await asyncio.gather(*(stage.extract(f"https://example.com/{i}", [f"text {i}"], 5) for i in range(6)))
+    finally:
+        await stage.stop()
+
+    assert [result[0]["content"] for result in results] == [[f"text {i}"] for i in range(6)]
+    assert RecordingStrategy.max_in_flight == 2
+    assert stage.stats["requests"] == 6
+
+@pytest.mark.asyncio
+async def test_stage_rate_limit():
+    """Test that requests per minute are capped"""
+    stage = ExtractionStage(lambda instruction: RecordingStrategy(instruction), "Extract", concurrency=4,
+                            requests_per_minute=600)
+    stage.start()
+    started = time.monotonic()
+    try:
+        await asyncio.gather(*(stage.extract(f"https://example.com/{i}", ["text"], 5) for i in range(4)))
+    finally:
+        await stage.stop()
+
+    # One request right away, then one every 0.1s
+    assert time.monotonic() - started >= 0.25
+
+@pytest.mark.asyncio
+async def test_stage_packs_small_pages():
+    """Test that small waiting pages share one LLM request within the token budget"""
+    stage = ExtractionStage(lambda instruction: RecordingStrategy(instruction), "Extract", concurrency=1,
+                            batch_tokens=25)
+    stage.start()
+    try:
+        results = await asyncio.gather(*(stage.extract(f"https://example.com/{i}", [f"text {i}"], 10) for i in range(4)))
+    finally:
+        await stage.stop()
+
+    # 25 tokens fit two 10-token pages per request
+    assert stage.stats == {"requests": 2, "pages": 4, "batched_pages": 4}
+    assert [result[0]["content"] for result in results] == [["page 0"], ["page 1"], ["page 0"], ["page 1"]]
+    assert all(result[0]["tags"] == [] for result in results)
+
+@pytest.mark.asyncio
+async def test_stage_retries_untagged_pages_alone():
+    """Test that pages the LLM didn't tag in a packed request are extracted on their own"""
+    stage = ExtractionStage(lambda instruction: RecordingStrategy(instruction, tag_pages='page id' not in instruction),
+                            "Extract", concurrency=1, batch_tokens=100)
+    stage.start()
+    try:
+        results = await asyncio.gather(*(stage.extract(f"https://example.com/{i}", [f"text {i}"], 10) for i in range(2)))
+    finally:
+        await stage.stop()
+
+    assert [result[0]["content"] for result in results] == [["text 0"], ["text 1"]]
+    assert stage.stats == {"requests": 3, "pages": 2, "batched_pages": 0}
+
+@pytest.mark.asyncio
+async def test_stage_does_not_pack_large_pages():
+    """Test that pages over the batch budget or with several chunks get their own request"""
+    stage = ExtractionStage(lambda instruction: RecordingStrategy(instruction), "Extract", concurrency=1,
+                            batch_tokens=50)
+    stage.start()
+    try:
+        await asyncio.gather(
+            stage.extract("https://example.com/big", ["big"], 80),
+            stage.extract("https://example.com/chunked", ["one", "two"], 20),
+        )
+    finally:
+        await stage.stop()
+
+    assert stage.stats == {"requests": 2, "pages": 2, "batched_pages": 0}
+
+@pytest.mark.asyncio
+async def test_stage_uses_each_pages_strategy():
+    """Test that pages bringing their own strategy factory use it, and are only packed with pages sharing it"""
+    def factory(name):
+        def create(instruction):
+            strategy = RecordingStrategy(instruction)
+            strategy.name = name
+            created.append(name)
+            return strategy
+        return create
+
+    created = []
+    first, second = factory("first"), factory("second")
+    stage = ExtractionStage(None, "Extract", concurrency=1, batch_tokens=100)
+    stage.start()
+    try:
+        await asyncio.gather(
+            stage.extract("https://a.com/0", ["a 0"], 10, first),
+            stage.extract("https://a.com/1", ["a 1"], 10, first),
+            stage.extract("https://b.com/0", ["b 0"], 10, second),
+        )
+    finally:
+        await stage.stop()
+
+    assert sorted(created) == ["first", "second"]
+    assert stage.stats == {"requests": 2, "pages": 3, "batched_pages": 2}
@@ -0,0 +1,41 @@
+from website_crawling_agent.extractor import extract_main_content
+
+PARAGRAPH = "<p>" + "This is a sentence of real article text, with commas, and substance. " * 5 + "</p>"
+
+ARTICLE_PAGE = f"""<!DOCTYPE html>
+<html><head><title>Article</title></head><body>
+<header class="masthead"><a href="/">Home</a><a href="/about">About</a></header>
+<nav><ul><li><a href="/x">Menu item</a></li><li><a href="/y">Other item</a></li></ul></nav>
+<div class="layout has-sidebar">
+  <div class="sidebar"><h3>Related</h3><ul><li><a href="/r1">Related one</a></li></ul></div>
+  <article><h1>Article title</h1>{PARAGRAPH * 6}<div class="share"><a href="/tweet">Tweet this</a></div></article>
+</div>
+<footer>Copyright <a href="/contact">Contact us</a></footer>
+</body></html>"""
+
+def test_extracts_article_and_drops_chrome():
+    """Test that the article is kept and navigation, sidebar, share links and footer are dropped"""
+    text, confidence = extract_main_content(ARTICLE_PAGE)
+
+    assert text.startswith("# Article title")
+    assert "real article text" in text
+    for chrome in ("Menu item", "Related one", "Tweet this", "Copyright", "About"):
+        assert chrome not in text
+    assert confidence >= 0.9
+
+def test_content_wrapper_named_like_chrome_is_kept():
+    """Test that a large content wrapper is not dropped because of its class name"""
+    html = f'<html><body><div class="content-with-sidebar">{PARAGRAPH * 4}</div></body></html>'
+
+    text, confidence = extract_main_content(html)
+    assert "real article text" in text
+
+def test_low_confidence_for_link_pages_and_empty_apps():
+    """Test that pages without clear main content get low confidence"""
+    link_page = "<html><body><ul>" + '<li><a href="/a">A link to another page</a></li>' * 30 + "</ul></body></html>"
+    short_page = "<html><body><p>Just a short note on this page.</p></body></html>"
+    app_shell = '<html><body><div id="root"></div></body></html>'
+
+    assert extract_main_content(link_page) == ("", 0.0)
+    assert extract_main_content(app_shell) == ("", 0.0)
+    assert extract_main_content(short_page)[1] < 0.6
@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from website_crawling_agent.fetcher import HttpPageResult, TieredFetcher, needs_browser, http_fetch
+from website_crawling_agent.politeness import HostScheduler
+
+ARTICLE_HTML = "<html><title>Article</title><body><p>" + "Plenty of server-rendered text. " * 20 + "</p></body></html>"
+SPA_HTML = '<html><title>App</title><body><div id="root"></div><script src="/app.js"></script></body></html>'
+
+def make_fetcher(mode):
+    return TieredFetcher(HostScheduler(), Mock(), mode=mode)
+
+def test_needs_browser_heuristics():
+    """Test which plain HTTP results are sent on to the browser"""
+    assert needs_browser(HttpPageResult("https://example.com/a", 200, ARTICLE_HTML)) is None
+    assert needs_browser(HttpPageResult("https://example.com/a", 200, SPA_HTML)) == "single-page app markers"
+    assert needs_browser(HttpPageResult("https://example.com/a", 200, "<p>Hi</p>")) == "almost no text without JavaScript"
+    assert needs_browser(HttpPageResult("https://example.com/a", 403, "Forbidden")) == "HTTP 403"
+    assert needs_browser(HttpPageResult("https://example.com/a", 404, "Not found")) is None
+
+def test_http_fetch_rejects_non_html():
+    """Test that non-HTML responses are not treated as pages"""
+    session = Mock()
+    session.get.return_value = Mock(ok=True, status_code=200, headers={"Content-Type": "application/pdf"}, text="%PDF")
+
+    result = http_fetch(session, "https://example.com/file.pdf")
+    assert result.success is False
+    assert "Not an HTML page" in result.error_message
+
+def test_unknown_fetch_mode():
+    """Test that an unknown mode is rejected"""
+    with pytest.raises(ValueError):
+        make_fetcher("carrier-pigeon")
+
+@pytest.mark.asyncio
+async def test_auto_mode_uses_http_for_static_pages():
+    """Test that a server-rendered page never reaches the browser"""
+    fetcher = make_fetcher("auto")
+    crawler = AsyncMock()
+
+    with patch('website_crawling_agent.fetcher.http_fetch', return_value=HttpPageResult("https://example.com/a", 200, ARTICLE_HTML)):
+        result = await fetcher.fetch(crawler, "https://example.com/a")
+
+    assert result.success
+    assert "Plenty of server-rendered text." in result.markdown
+    crawler.arun.assert_not_called()
+    assert fetcher.tier_counts == {"http": 1, "browser": 0, "escalated": 0}
+
+@pytest.mark.asyncio
+async def test_auto_mode_escalates_and_learns_host():
+    """Test that JavaScript pages go to the browser and the host is then sent there directly"""
+    fetcher = make_fetcher("auto")
+    crawler = AsyncMock()
+    crawler.arun.return_value = Mock(status_code=200, response_headers={})
+
+    with patch('website_crawling_agent.fetcher.http_fetch', return_value=HttpPageResult("https://example.com/a", 200, SPA_HTML)) as plain:
+        for i in range(5):
+            await fetcher.fetch(crawler, f"https://example.com/{i}", bypass_cache=True)
+
+    assert plain.call_count == 3
+    assert crawler.arun.call_count == 5
+    assert crawler.arun.call_args.kwargs == {"url": "https://example.com/4", "bypass_cache": True}
+    assert fetcher.tier_counts == {"http": 0, "browser": 5, "escalated": 3}
+
+@pytest.mark.asyncio
+async def test_http_mode_never_uses_browser():
+    """Test that http mode returns the plain result even when it looks like an app"""
+    fetcher = make_fetcher("http")
+    crawler = AsyncMock()
+
+    with patch('website_crawling_agent.fetcher.http_fetch', return_value=HttpPageResult("https://example.com/a", 200, SPA_HTML)):
+        await fetcher.fetch(crawler, "https://example.com/a")
+
+    crawler.arun.assert_not_called()
+    assert fetcher.tier_counts["http"] == 1
+
+@pytest.mark.asyncio
+async def test_paused_host_does_not_hold_a_slot():
+    """Test that a host waiting out a Retry-After pause leaves the shared slots to other hosts"""
+    from website_crawling_agent.batch import FairScheduler
+    host_scheduler = HostScheduler()
+    scheduler = FairScheduler(1)
+    fetcher = TieredFetcher(host_scheduler, Mock(), mode='http', slot_scheduler=scheduler)
+    host_scheduler.record_response("https://slow.com/", 429, {"Retry-After": "30"})
+
+    with patch('website_crawling_agent.fetcher.http_fetch',
+               side_effect=lambda session, url: HttpPageResult(url, 200, ARTICLE_HTML)):
+        paused = asyncio.ensure_future(fetcher.fetch(None, "https://slow.com/a"))
+        await asyncio.sleep(0.01)
+        results = await asyncio.wait_for(
+            asyncio.gather(*(fetcher.fetch(None, f"https://fast.com/{i}") for i in range(3))), 2
+        )
+        assert not paused.done()
+        paused.cancel()
+
+    assert [result.url for result in results] == [f"https://fast.com/{i}" for i in range(3)]
+    assert scheduler.in_use == 0
+
+@pytest.mark.asyncio
+async def test_run_request_is_paced_and_holds_a_slot():
+    """Test that other requests, such as conditional ones, wait for the host and hold a shared slot"""
+    from website_crawling_agent.batch import FairScheduler
+    host_scheduler = HostScheduler()
+    host_scheduler.acquire = AsyncMock()
+    scheduler = FairScheduler(1)
+    fetcher = TieredFetcher(host_scheduler, Mock(), mode='http', slot_scheduler=scheduler)
+
+    slots_in_use = await fetcher.run_request("https://example.com/a", lambda: scheduler.in_use)
+
+    host_scheduler.acquire.assert_awaited_once_with("https://example.com/a")
+    assert slots_in_use == 1
+    assert scheduler.in_use == 0
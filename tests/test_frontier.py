@@ -0,0 +1,122 @@
+import asyncio
+import pytest
+from website_crawling_agent.frontier import Frontier, UrlFilter, UrlScorer, parse_pattern_weight
+
+@pytest.mark.asyncio
+async def test_add_deduplicates():
+    """Test that a URL is only queued once"""
+    frontier = Frontier()
+
+    assert frontier.add("https://example.com/a") is True
+    assert frontier.add("https://example.com/a") is False
+    assert frontier.add("https://example.com/b") is True
+    assert len(frontier) == 2
+
+@pytest.mark.asyncio
+async def test_add_deduplicates_by_key():
+    """Test that URLs sharing a key are queued once, with the first spelling"""
+    frontier = Frontier(key=lambda url: url.rstrip('/'))
+
+    assert frontier.add("https://example.com/a/") is True
+    assert frontier.add("https://example.com/a") is False
+    assert len(frontier) == 1
+    assert await frontier.get() == "https://example.com/a/"
+
+@pytest.mark.asyncio
+async def test_get_is_first_in_first_out():
+    """Test that URLs come out in the order they were added"""
+    frontier = Frontier()
+    frontier.add("https://example.com/a")
+    frontier.add("https://example.com/b")
+
+    assert await frontier.get() == "https://example.com/a"
+    assert await frontier.get() == "https://example.com/b"
+
+@pytest.mark.asyncio
+async def test_join_waits_for_task_done():
+    """Test that join only returns once every URL has been marked done"""
+    frontier = Frontier()
+    frontier.add("https://example.com/a")
+
+    await frontier.get()
+    frontier.task_done()
+    await frontier.join()
+    assert len(frontier) == 0
+
+@pytest.mark.asyncio
+async def test_best_first_prefers_shallow_pages():
+    """Test that a scored frontier hands out shallower pages before deeper ones"""
+    frontier = Frontier(scorer=UrlScorer(pattern_weights=()))
+    frontier.add("https://example.com/deep", depth=3)
+    frontier.add("https://example.com/shallow", depth=1)
+
+    assert await frontier.get_with_depth() == ("https://example.com/shallow", 1)
+    assert await frontier.get_with_depth() == ("https://example.com/deep", 3)
+
+@pytest.mark.asyncio
+async def test_inlinks_raise_a_waiting_url():
+    """Test that a queued URL moves up as more pages link to it"""
+    frontier = Frontier(scorer=UrlScorer(pattern_weights=()))
+    frontier.add("https://example.com/a", depth=1)
+    frontier.add("https://example.com/b", depth=1)
+    assert frontier.add("https://example.com/b", depth=1) is False
+    assert frontier.add("https://example.com/b", depth=1) is False
+
+    assert await frontier.get() == "https://example.com/b"
+    assert await frontier.get() == "https://example.com/a"
+    assert len(frontier) == 0
+
+@pytest.mark.asyncio
+async def test_default_weights_push_archives_back():
+    """Test that pagination and tag pages come after content at the same depth"""
+    frontier = Frontier(scorer=UrlScorer())
+    frontier.add("https://example.com/blog/page/2", depth=1)
+    frontier.add("https://example.com/tag/python/", depth=1)
+    frontier.add("https://example.com/list?page=3", depth=1)
+    frontier.add("https://example.com/blog/post", depth=2)
+
+    assert await frontier.get() == "https://example.com/blog/post"
+
+@pytest.mark.asyncio
+async def test_retry_requeues_after_delay():
+    """Test that a retried URL comes back after its delay, while other URLs go first"""
+    frontier = Frontier()
+    frontier.add("https://example.com/a")
+    assert await frontier.get() == "https://example.com/a"
+    frontier.task_done()
+
+    frontier.retry("https://example.com/a", delay=0.05)
+    frontier.add("https://example.com/b")
+    assert len(frontier) == 2
+    assert await frontier.get() == "https://example.com/b"
+    frontier.task_done()
+
+    assert await asyncio.wait_for(frontier.get_with_depth(), 1) == ("https://example.com/a", 0)
+    frontier.task_done()
+    await asyncio.wait_for(frontier.join(), 1)
+
+@pytest.mark.asyncio
+async def test_release_delayed():
+    """Test that released URLs are handed out without waiting for their delay"""
+    frontier = Frontier()
+    frontier.retry("https://example.com/a", 2, delay=60)
+    frontier.release_delayed()
+
+    assert await asyncio.wait_for(frontier.get_with_depth(), 1) == ("https://example.com/a", 2)
+
+def test_url_filter():
+    """Test include and exclude patterns"""
+    url_filter = UrlFilter(include=[r"/docs/"], exclude=[r"/docs/old/", r"\.pdf$"])
+
+    assert url_filter.allows("https://example.com/docs/intro")
+    assert not url_filter.allows("https://example.com/blog/post")
+    assert not url_filter.allows("https://example.com/docs/old/intro")
+    assert not url_filter.allows("https://example.com/docs/manual.pdf")
+    assert UrlFilter().allows("https://example.com/anything")
+
+def test_parse_pattern_weight():
+    """Test parsing REGEX=WEIGHT priority rules"""
+    assert parse_pattern_weight(r"/blog/=2") == (r"/blog/", 2.0)
+    assert parse_pattern_weight(r"[?&]lang=en=-1.5") == (r"[?&]lang=en", -1.5)
+    with pytest.raises(ValueError):
+        parse_pattern_weight("/blog/")
@@ -0,0 +1,60 @@
+import pytest
+from unittest.mock import Mock
+import requests
+from website_crawling_agent import incremental
+
+def test_content_hash_ignores_scripts_and_whitespace():
+    """Test that the hash only changes when the visible content changes"""
+    page = "<html><body><p>Hello   world</p></body></html>"
+    same_page = "<html>\n<body><script>var token = 123;</script><p>Hello world</p><!-- built at 10:00 --></body></html>"
+    changed_page = "<html><body><p>Hello there</p></body></html>"
+
+    assert incremental.content_hash(page) == incremental.content_hash(same_page)
+    assert incremental.content_hash(page) != incremental.content_hash(changed_page)
+
+def test_metadata_round_trip(tmp_path):
+    """Test building, saving and loading page metadata"""
+    path = incremental.metadata_path(str(tmp_path / "docs" / "page.markdown"))
+    metadata = incremental.build_metadata(
+        "https://example.com/docs/page", {"ETag": '"v1"'}, "hash", ["https://example.com/a"]
+    )
+
+    incremental.save_metadata(path, metadata)
+    loaded = incremental.load_metadata(path)
+
+    assert path.endswith("page.markdown.meta.json")
+    assert loaded["etag"] == '"v1"'
+    assert loaded["last_modified"] is None
+    assert loaded["links"] == ["https://example.com/a"]
+
+def test_load_metadata_missing_or_corrupt(tmp_path):
+    """Test that missing or unreadable metadata is treated as absent"""
+    corrupt = tmp_path / "page.meta.json"
+    corrupt.write_text("{not json")
+
+    assert incremental.load_metadata(str(tmp_path / "missing.meta.json")) is None
+    assert incremental.load_metadata(str(corrupt)) is None
+
+def test_is_not_modified_sends_validators():
+    """Test that the conditional request carries the saved validators"""
+    session = Mock()
+    session.get.return_value = Mock(status_code=304)
+    metadata = {"etag": '"v1"', "last_modified": "Wed, 01 Jan 2025 00:00:00 GMT"}
+
+    assert incremental.is_not_modified(session, "https://example.com/page", metadata) is True
+    headers = session.get.call_args.kwargs["headers"]
+    assert headers == {"If-None-Match": '"v1"', "If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT"}
+
+def test_is_not_modified_changed_or_unreachable():
+    """Test that anything but a 304 means the page has to be fetched"""
+    metadata = {"etag": '"v1"'}
+    changed = Mock()
+    changed.get.return_value = Mock(status_code=200)
+    unreachable = Mock()
+    unreachable.get.side_effect = requests.ConnectionError()
+    no_validators = Mock()
+
+    assert incremental.is_not_modified(changed, "https://example.com/page", metadata) is False
+    assert incremental.is_not_modified(unreachable, "https://example.com/page", metadata) is False
+    assert incremental.is_not_modified(no_validators, "https://example.com/page", {}) is False
+    no_validators.get.assert_not_called()
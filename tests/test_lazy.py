@@ -0,0 +1,44 @@
+import subprocess
+import sys
+
+from website_crawling_agent.lazy import LazyObject, lazy_import
+
+
+def test_lazy_object_calls_factory_once_on_first_use():
+    """Test that the factory only runs when the object is first used, and only once"""
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return {"key": "value"}
+
+    lazy = LazyObject(factory)
+    assert calls == []
+    assert lazy.get("key") == "value"
+    assert lazy.get("missing") is None
+    assert calls == [1]
+
+
+def test_lazy_import_loads_module_when_used():
+    """Test that lazy_import returns the module attribute once it is used"""
+    dumps = lazy_import('json', 'dumps')
+    assert dumps([1]) == "[1]"
+    assert lazy_import('json').loads("2") == 2
+
+
+def test_package_import_skips_heavy_dependencies():
+    """Test that importing the package doesn't import crawl4ai, bs4, requests or pdfkit"""
+    code = ("import sys, website_crawling_agent, website_crawling_agent.agent, website_crawling_agent.cli; "
+            "print(','.join(m for m in ('crawl4ai', 'bs4', 'requests', 'pdfkit', 'markdown') if m in sys.modules))")
+    output = subprocess.check_output([sys.executable, '-c', code], text=True)
+    assert output.strip() == ""
+
+
+def test_dunder_probes_do_not_load():
+    """Test that probing special names, as mock.patch does, doesn't call the factory"""
+    def factory():
+        raise AssertionError("loaded")
+
+    lazy = LazyObject(factory)
+    assert not hasattr(lazy, '__func__')
+    assert not hasattr(lazy, '__code__')
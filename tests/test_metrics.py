@@ -0,0 +1,127 @@
+import asyncio
+import json
+import pstats
+import threading
+import time
+import urllib.request
+import pytest
+from website_crawling_agent.metrics import CrawlMetrics, Histogram, MetricsReporter, MetricsServer, PageProfiler
+
+def test_histogram_quantiles_fall_in_the_right_bucket():
+    """Test that quantiles are estimated within the bucket holding them"""
+    histogram = Histogram(buckets=(0.1, 1.0, 10.0))
+    for _ in range(90):
+        histogram.observe(0.05)
+    for _ in range(10):
+        histogram.observe(5.0)
+
+    assert histogram.count == 100
+    assert 0 < histogram.quantile(0.5) <= 0.1
+    assert 1.0 < histogram.quantile(0.99) <= 5.0
+    assert histogram.summary()['max'] == 5.0
+
+def test_timer_records_duration_and_in_flight():
+    """Test that a timed stage is counted as in flight until it ends"""
+    metrics = CrawlMetrics()
+    with metrics.timer('fetch'):
+        assert metrics.snapshot()['gauges']['fetch_in_flight'] == 1
+
+    snapshot = metrics.snapshot()
+    assert snapshot['gauges']['fetch_in_flight'] == 0
+    assert snapshot['stages']['fetch']['count'] == 1
+
+def test_snapshot_reads_gauge_functions():
+    """Test that function gauges are read when the snapshot is taken"""
+    metrics = CrawlMetrics()
+    queue = [1, 2]
+    metrics.gauge_function('queue', lambda: len(queue))
+    queue.append(3)
+    assert metrics.snapshot()['gauges']['queue'] == 3
+
+def test_prometheus_text():
+    """Test that histograms, counters and gauges are exposed in the Prometheus format"""
+    metrics = CrawlMetrics(buckets=(0.5, 1.0))
+    metrics.observe('parse', 0.2)
+    metrics.observe('parse', 0.7)
+    metrics.inc('pages', 2)
+    metrics.add_gauge('fetch_in_flight', 1)
+
+    text = metrics.prometheus_text()
+    assert 'crawler_stage_seconds_bucket{stage="parse",le="0.5"} 1' in text
+    assert 'crawler_stage_seconds_bucket{stage="parse",le="+Inf"} 2' in text
+    assert 'crawler_stage_seconds_count{stage="parse"} 2' in text
+    assert 'crawler_pages_total 2' in text
+    assert 'crawler_fetch_in_flight 1' in text
+
+@pytest.mark.asyncio
+async def test_reporter_writes_periodic_and_final_snapshots(tmp_path):
+    """Test that the reporter appends a snapshot every interval and one when stopped"""
+    metrics = CrawlMetrics()
+    metrics.inc('pages')
+    reporter = MetricsReporter(metrics, str(tmp_path / "metrics.jsonl"), interval=0.01)
+    reporter.start()
+    await asyncio.sleep(0.05)
+    await reporter.stop()
+
+    lines = (tmp_path / "metrics.jsonl").read_text().splitlines()
+    assert len(lines) >= 2
+    assert json.loads(lines[-1])['counters'] == {'pages': 1}
+
+def test_server_serves_metrics():
+    """Test that the Prometheus endpoint serves the current metrics"""
+    metrics = CrawlMetrics()
+    metrics.inc('errors')
+    server = MetricsServer(metrics, 0)
+    server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+            assert 'crawler_errors_total 1' in response.read().decode()
+    finally:
+        server.stop()
+
+def test_profiler_only_profiles_sampled_pages(tmp_path):
+    """Test that only the first sampled pages are profiled"""
+    profiler = PageProfiler(1, str(tmp_path / "profile.pstats"))
+    profiler.sample("https://example.com/a")
+    profiler.sample("https://example.com/b")
+
+    assert profiler.call("https://example.com/a", sorted, [3, 1, 2]) == [1, 2, 3]
+    assert profiler.call("https://example.com/b", sorted, [2, 1]) == [1, 2]
+    assert "sorted" in profiler.save()
+    assert pstats.Stats(str(tmp_path / "profile.pstats")).total_calls > 0
+
+def test_profiler_runs_one_profiled_call_at_a_time(tmp_path):
+    """Test that profiled calls from two threads at once don't overlap or fail"""
+    profiler = PageProfiler(2, str(tmp_path / "profile.pstats"))
+    profiler.sample("https://example.com/a")
+    profiler.sample("https://example.com/b")
+    running = []
+    overlaps = []
+    errors = []
+
+    def work(name):
+        running.append(name)
+        if len(running) > 1:
+            overlaps.append(name)
+        time.sleep(0.05)
+        running.remove(name)
+        return name
+
+    def profile_page(url, name):
+        try:
+            assert profiler.call(url, work, name) == name
+        except Exception as error:
+            errors.append(error)
+
+    threads = [
+        threading.Thread(target=profile_page, args=("https://example.com/a", "a")),
+        threading.Thread(target=profile_page, args=("https://example.com/b", "b")),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert overlaps == []
+    assert profiler.stats.total_calls > 0
@@ -0,0 +1,62 @@
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from website_crawling_agent.page_parser import parse_page
+
+PAGE = """<!DOCTYPE html>
+<html><head>
+<title>Docs &amp; Guides</title>
+<base href="/docs/">
+<link rel="stylesheet" href="/style.css">
+<link rel="Canonical" href="https://example.com/docs/guide">
+</head><body>
+<a href="intro">Intro</a>
+<a name="anchor">No href</a>
+<A HREF="/about">About</A>
+<a href="#top">Top</a>
+<svg><title>Icon</title></svg>
+</body></html>"""
+
+def test_parse_page_reads_title_links_base_and_canonical():
+    """Test that one pass finds the title, hrefs, base href and canonical URL"""
+    page = parse_page(PAGE)
+
+    assert page.title == "Docs & Guides"
+    assert page.hrefs == ["intro", "/about", "#top"]
+    assert page.base_href == "/docs/"
+    assert page.canonical == "https://example.com/docs/guide"
+
+def test_links_resolve_against_base_href():
+    """Test that relative links use <base href> when the page has one"""
+    page = parse_page(PAGE)
+    assert page.links("https://example.com/guide") == [
+        "https://example.com/docs/intro",
+        "https://example.com/about",
+        "https://example.com/docs/#top",
+    ]
+
+    assert parse_page('<a href="b">b</a>').links("https://example.com/a/") == ["https://example.com/a/b"]
+
+def test_same_links_as_beautifulsoup():
+    """Test that the parser finds the same links as the BeautifulSoup path it replaces"""
+    html = "<html><body>" + "".join(
+        f'<div><p>Text <a href="/page{i}?a=1&amp;b=2">link</a><a>none</a></p></div>' for i in range(20)
+    ) + "</body></html>"
+    soup = BeautifulSoup(html, 'html.parser')
+    expected = [urljoin("https://example.com", link['href']) for link in soup.find_all('a', href=True)]
+
+    assert parse_page(html).links("https://example.com") == expected
+
+def test_custom_404_detection():
+    """Test that titles mentioning 404 or not found mark a custom 404 page"""
+    assert parse_page("<title>404 - Page Not Found</title>").is_custom_404()
+    assert parse_page("<title>Sorry, NOT FOUND</title>").is_custom_404()
+    assert not parse_page("<title>Home</title>").is_custom_404()
+    assert not parse_page("<p>No title</p>").is_custom_404()
+
+def test_unclosed_and_empty_titles():
+    """Test that an unclosed title is still read and a self-closed one doesn't swallow the page"""
+    assert parse_page("<title>Half a page").title == "Half a page"
+
+    page = parse_page('<title/><a href="/x">x</a>')
+    assert page.title == ""
+    assert page.hrefs == ["/x"]
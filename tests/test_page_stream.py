@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from website_crawling_agent.page_stream import PageStream
+
+@pytest.mark.asyncio
+async def test_stream_yields_records_then_ends():
+    """Test that records come out in order and get returns None once finished"""
+    stream = PageStream(4)
+    await stream.put({"url": "a"})
+    await stream.put({"url": "b"})
+    await stream.finish()
+
+    assert await stream.get() == {"url": "a"}
+    assert await stream.get() == {"url": "b"}
+    assert await stream.get() is None
+
+@pytest.mark.asyncio
+async def test_put_waits_while_buffer_is_full():
+    """Test that producers wait for the consumer once max_size records are waiting"""
+    stream = PageStream(2)
+    await stream.put(1)
+    await stream.put(2)
+    blocked = asyncio.ensure_future(stream.put(3))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+    assert len(stream) == 2
+
+    assert await stream.get() == 1
+    assert await blocked is True
+    assert list(stream.records) == [2, 3]
+
+@pytest.mark.asyncio
+async def test_close_releases_waiting_producers():
+    """Test that closing drops waiting records and unblocks every producer"""
+    stream = PageStream(1)
+    await stream.put(1)
+    blocked = [asyncio.ensure_future(stream.put(i)) for i in range(2, 5)]
+    await asyncio.sleep(0.01)
+
+    await stream.close()
+
+    assert await asyncio.gather(*blocked) == [False, False, False]
+    assert len(stream) == 0
+    assert await stream.put(5) is False
+    assert await stream.get() is None
@@ -0,0 +1,120 @@
+import asyncio
+import time
+import pytest
+from email.utils import formatdate
+from website_crawling_agent.politeness import (
+    TokenBucket, HostScheduler, RobotsCache, parse_retry_after, MIN_HOST_RATE
+)
+
+def test_token_bucket_wait_time():
+    """Test that an empty bucket reports how long until the next token"""
+    bucket = TokenBucket(rate=2)
+    now = bucket.updated_at
+
+    assert bucket.wait_time(now) == 0
+    bucket.consume(now)
+    assert bucket.wait_time(now) == pytest.approx(0.5)
+    assert bucket.wait_time(now + 0.5) == 0
+
+def test_parse_retry_after():
+    """Test parsing Retry-After in seconds and HTTP date form"""
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    in_a_minute = formatdate(time.time() + 60, usegmt=True)
+    assert 55 <= parse_retry_after(in_a_minute) <= 60
+
+@pytest.mark.asyncio
+async def test_scheduler_unthrottled_until_pushback():
+    """Test that a host is not throttled before it answers 429 or 503"""
+    scheduler = HostScheduler()
+    url = "https://example.com/page"
+
+    for _ in range(5):
+        await scheduler.acquire(url)
+    assert scheduler.get_host(url).bucket is None
+
+def test_scheduler_backs_off_and_recovers():
+    """Test that 429 halves the rate and successes slowly raise it again"""
+    scheduler = HostScheduler(max_rate=4)
+    url = "https://example.com/page"
+
+    scheduler.record_response(url, 429)
+    state = scheduler.get_host(url)
+    assert state.bucket.rate == 2
+
+    scheduler.record_response(url, 200)
+    assert state.bucket.rate > 2
+
+    for _ in range(100):
+        scheduler.record_response(url, 200)
+    assert state.bucket.rate == 4
+
+def test_scheduler_rate_never_below_minimum():
+    """Test that repeated pushback stops at the minimum rate"""
+    scheduler = HostScheduler(max_rate=1)
+    url = "https://example.com/page"
+
+    for _ in range(50):
+        scheduler.record_response(url, 503)
+    assert scheduler.get_host(url).bucket.rate == MIN_HOST_RATE
+
+def test_scheduler_honors_retry_after():
+    """Test that Retry-After pauses the host"""
+    scheduler = HostScheduler()
+    url = "https://example.com/page"
+
+    scheduler.record_response(url, 429, {"Retry-After": "30"})
+    assert scheduler.get_host(url).paused_until >= time.monotonic() + 29
+
+def test_crawl_delay_caps_rate():
+    """Test that Crawl-delay limits the host to one request per delay"""
+    scheduler = HostScheduler(max_rate=10)
+    url = "https://example.com/page"
+
+    scheduler.set_crawl_delay(url, 2)
+    state = scheduler.get_host(url)
+    assert state.bucket.rate == 0.5
+
+    for _ in range(10):
+        scheduler.record_response(url, 200)
+    assert state.bucket.rate == 0.5
+
+@pytest.mark.asyncio
+async def test_scheduler_spaces_requests():
+    """Test that acquire waits for the token bucket"""
+    scheduler = HostScheduler(max_rate=20)
+    url = "https://example.com/page"
+
+    started = time.monotonic()
+    for _ in range(3):
+        await scheduler.acquire(url)
+    assert time.monotonic() - started >= 0.09
+
+@pytest.mark.asyncio
+async def test_robots_cache_fetches_once():
+    """Test that robots.txt is fetched once per host and rules are applied"""
+    fetched = []
+
+    def fetcher(robots_url):
+        fetched.append(robots_url)
+        return 200, "User-agent: *\nDisallow: /private\nCrawl-delay: 3\n"
+
+    robots = RobotsCache(fetcher=fetcher)
+    results = await asyncio.gather(
+        robots.can_fetch("https://example.com/public"),
+        robots.can_fetch("https://example.com/private/page"),
+    )
+
+    assert results == [True, False]
+    assert await robots.crawl_delay("https://example.com/") == 3
+    assert fetched == ["https://example.com/robots.txt"]
+
+@pytest.mark.asyncio
+async def test_robots_cache_missing_and_unreachable():
+    """Test that a missing robots.txt allows all and an unreachable one disallows all"""
+    missing = RobotsCache(fetcher=lambda robots_url: (404, ""))
+    unreachable = RobotsCache(fetcher=lambda robots_url: (None, ""))
+
+    assert await missing.can_fetch("https://example.com/page") is True
+    assert await unreachable.can_fetch("https://example.com/page") is False
@@ -0,0 +1,62 @@
+from website_crawling_agent.pruning import (
+    estimate_tokens, drop_repeated_blocks, prune_html, chunk_text, fit_to_budget, prepare_llm_input
+)
+
+def test_estimate_tokens():
+    """Test the characters-per-token estimate"""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+def test_prune_html_strips_non_content():
+    """Test that scripts, styles, SVG and navigation never reach the LLM"""
+    html = """<html><head><style>body {}</style></head><body>
+        <nav><a href="/">Home</a><a href="/docs">Docs</a></nav>
+        <script>trackPageView();</script>
+        <svg><path d="M0 0"/><text>logo</text></svg>
+        <h1>Guide</h1><p>Install the package first.</p>
+        <footer><a href="/legal">Legal</a></footer>
+    </body></html>"""
+
+    assert prune_html(html) == "# Guide\n\nInstall the package first."
+
+def test_drop_repeated_blocks():
+    """Test that repeated blocks are only kept once"""
+    assert drop_repeated_blocks("A\n\nRead more\n\nB\n\nRead more") == "A\n\nRead more\n\nB"
+
+def test_chunk_text_respects_size_and_headings():
+    """Test that chunks stay under the limit and break before headings"""
+    text = "\n\n".join(["# One", "a" * 80, "b" * 80, "# Two", "c" * 80])
+    chunks = chunk_text(text, chunk_tokens=25)
+
+    assert chunks == ["# One\n\n" + "a" * 80, "b" * 80, "# Two\n\n" + "c" * 80]
+    assert all(estimate_tokens(chunk) <= 25 for chunk in chunks)
+
+def test_chunk_text_splits_oversized_blocks():
+    """Test that a single huge block is split on whitespace"""
+    text = " ".join(["word"] * 100)
+    chunks = chunk_text(text, chunk_tokens=20)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 20 for chunk in chunks)
+    assert " ".join(chunks) == text
+
+def test_fit_to_budget_truncates():
+    """Test that chunks past the budget are dropped and the last one is cut"""
+    chunks = ["a" * 400, "b " * 400, "c" * 400]
+
+    kept, truncated = fit_to_budget(chunks, token_budget=250)
+    assert truncated is True
+    assert kept[0] == "a" * 400
+    assert estimate_tokens(kept[1]) <= 150
+
+    kept, truncated = fit_to_budget(chunks, token_budget=1000)
+    assert (kept, truncated) == (chunks, False)
+
+def test_prepare_llm_input_falls_back_to_markdown():
+    """Test that crawl4ai's markdown is used when pruning leaves nothing"""
+    chunks, tokens, truncated = prepare_llm_input("<html><title>Only a title</title></html>", "Fallback text")
+
+    assert chunks == ["Fallback text"]
+    assert tokens == estimate_tokens("Fallback text")
+    assert truncated is False
@@ -0,0 +1,127 @@
+import asyncio
+import random
+import socket
+from unittest.mock import patch
+
+from website_crawling_agent import retry
+from website_crawling_agent.retry import (
+    CircuitBreaker, ExtractionError, RetryPolicy, classify_exception, classify_failure
+)
+
+
+def test_classify_failure_by_status_code():
+    """Test that status codes map to the kind of failure, and client errors are not retried"""
+    assert classify_failure(429) == retry.THROTTLED
+    assert classify_failure(503) == retry.SERVER_ERROR
+    assert classify_failure(408) == retry.TIMEOUT
+    assert classify_failure(403) is None
+    assert classify_failure(410) is None
+
+
+def test_classify_failure_by_error_message():
+    """Test that browser and requests error messages are recognized"""
+    assert classify_failure(None, "Page.goto: net::ERR_NAME_NOT_RESOLVED at https://example.com") == retry.DNS
+    assert classify_failure(None, "NameResolutionError: Failed to resolve 'example.com'") == retry.DNS
+    assert classify_failure(None, "Timeout 30000ms exceeded.") == retry.TIMEOUT
+    assert classify_failure(None, "HTTPSConnectionPool: Read timed out. (read timeout=20)") == retry.TIMEOUT
+    assert classify_failure(None, "net::ERR_CONNECTION_REFUSED") == retry.NETWORK
+    assert classify_failure(None, "Not an HTML page: application/pdf") is None
+    assert classify_failure(None, None) is None
+
+
+def test_classify_exception():
+    """Test that exceptions map to the kind of failure they stand for"""
+    assert classify_exception(asyncio.TimeoutError()) == retry.TIMEOUT
+    assert classify_exception(socket.gaierror(-2, "Name or service not known")) == retry.DNS
+    assert classify_exception(ConnectionResetError()) == retry.NETWORK
+    assert classify_exception(ExtractionError("LLM failed")) == retry.EXTRACTION
+    assert classify_exception(ValueError("bad page")) is None
+
+
+def test_retry_policy_backs_off_with_jitter():
+    """Test that delays double per attempt, stay within half and all of the step, and are capped"""
+    policy = RetryPolicy(max_retries=5, base_delay=1.0, max_delay=5.0, rng=random.Random(1))
+
+    for attempts, step in [(0, 1.0), (1, 2.0), (2, 4.0), (3, 5.0), (6, 5.0)]:
+        delays = {policy.delay(attempts) for _ in range(20)}
+        assert all(step / 2 <= delay <= step for delay in delays)
+        assert len(delays) > 1
+
+
+def test_retry_policy_limits():
+    """Test that retries stop at max_retries, DNS failures get one, and unknown failures none"""
+    policy = RetryPolicy(max_retries=3)
+
+    assert policy.should_retry(retry.TIMEOUT, 2)
+    assert not policy.should_retry(retry.TIMEOUT, 3)
+    assert policy.should_retry(retry.DNS, 0)
+    assert not policy.should_retry(retry.DNS, 1)
+    assert not policy.should_retry(None, 0)
+
+
+def test_retry_policy_honors_retry_after():
+    """Test that Retry-After is a lower bound on the delay, up to max_delay"""
+    policy = RetryPolicy(base_delay=1.0, max_delay=60.0)
+
+    assert policy.delay(0, retry_after=30) == 30
+    assert policy.delay(0, retry_after=600) == 60
+
+
+def test_circuit_breaker_opens_on_error_rate():
+    """Test that a host's circuit opens once most of its recent requests failed"""
+    breaker = CircuitBreaker(error_rate=0.5, cooldown=30)
+    url = "https://example.com/a"
+
+    for _ in range(retry.BREAKER_MIN_REQUESTS - 1):
+        breaker.record(url, retry.SERVER_ERROR)
+    assert breaker.wait_time(url) == 0
+
+    breaker.record(url, retry.SERVER_ERROR)
+    assert 29 < breaker.wait_time(url) <= 30
+    assert breaker.trips == 1
+    # Other hosts are not affected
+    assert breaker.wait_time("https://other.example/a") == 0
+
+
+def test_circuit_breaker_ignores_non_host_failures():
+    """Test that extraction failures and 404s don't count against the host"""
+    breaker = CircuitBreaker(error_rate=0.5)
+    for _ in range(10):
+        breaker.record("https://example.com/a", retry.EXTRACTION)
+        breaker.record("https://example.com/a", None)
+
+    assert breaker.wait_time("https://example.com/a") == 0
+
+
+def test_circuit_breaker_probe_closes_or_reopens():
+    """Test that after the cooldown one probe goes through, and its outcome closes or reopens the circuit"""
+    breaker = CircuitBreaker(error_rate=0.5, cooldown=10)
+    url = "https://example.com/a"
+    now = [1000.0]
+
+    with patch('website_crawling_agent.retry.time.monotonic', side_effect=lambda: now[0]):
+        for _ in range(retry.BREAKER_MIN_REQUESTS):
+            breaker.record(url, retry.TIMEOUT)
+
+        now[0] += 10
+        assert breaker.wait_time(url) == 0
+        # Only one probe at a time
+        assert breaker.wait_time(url) == retry.BREAKER_PROBE_INTERVAL
+
+        breaker.record(url, retry.TIMEOUT)
+        assert breaker.wait_time(url) == 20
+
+        now[0] += 20
+        assert breaker.wait_time(url) == 0
+        breaker.record(url)
+        assert breaker.wait_time(url) == 0
+        assert not breaker.is_open(url)
+
+
+def test_circuit_breaker_disabled():
+    """Test that an error rate of 0 turns the breaker off"""
+    breaker = CircuitBreaker(error_rate=0)
+    for _ in range(20):
+        breaker.record("https://example.com/a", retry.SERVER_ERROR)
+
+    assert breaker.wait_time("https://example.com/a") == 0
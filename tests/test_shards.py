@@ -0,0 +1,66 @@
+import gzip
+import json
+import pytest
+from website_crawling_agent.shards import JsonlShardWriter, get_compressor
+
+def read_records(path):
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+def test_records_are_flushed_in_batches(tmp_path):
+    """Test that records reach the shard once a batch is full, and the rest on flush"""
+    writer = JsonlShardWriter(str(tmp_path), batch_size=3)
+    for i in range(4):
+        writer.write({"url": f"https://example.com/{i}", "content": "Text"})
+
+    shard = tmp_path / "pages-00000.jsonl"
+    assert [record["url"] for record in read_records(shard)] == [f"https://example.com/{i}" for i in range(3)]
+
+    writer.close()
+    assert len(read_records(shard)) == 4
+    assert writer.records_written == 4
+
+def test_shards_rotate_at_size_cap(tmp_path):
+    """Test that a new shard is started once the open one reaches its size cap"""
+    writer = JsonlShardWriter(str(tmp_path), max_shard_bytes=100, batch_size=1)
+    for i in range(5):
+        writer.write({"url": f"https://example.com/{i}", "content": "x" * 80})
+    writer.close()
+
+    shards = sorted(path.name for path in tmp_path.iterdir())
+    assert shards == [f"pages-0000{i}.jsonl" for i in range(5)]
+
+def test_gzip_shards_survive_batch_appends(tmp_path):
+    """Test that a gzip shard written in several batches reads back as one file"""
+    writer = JsonlShardWriter(str(tmp_path), compression="gzip", batch_size=2)
+    for i in range(5):
+        writer.write({"url": f"https://example.com/{i}", "content": "Ünïcode"})
+    writer.close()
+
+    records = read_records(tmp_path / "pages-00000.jsonl.gz")
+    assert len(records) == 5
+    assert records[0]["content"] == "Ünïcode"
+
+def test_new_writer_continues_shard_numbering(tmp_path):
+    """Test that a later crawl into the same folder doesn't overwrite earlier shards"""
+    (tmp_path / "pages-00003.jsonl.gz").write_bytes(b"")
+    writer = JsonlShardWriter(str(tmp_path))
+    writer.write({"url": "https://example.com"})
+    writer.close()
+
+    assert (tmp_path / "pages-00004.jsonl").exists()
+
+def test_unknown_compression():
+    """Test that an unknown compression is rejected"""
+    with pytest.raises(ValueError):
+        get_compressor("brotli")
+
+def test_prefixed_writers_share_a_folder(tmp_path):
+    """Test that writers with different prefixes number their shards separately"""
+    JsonlShardWriter(str(tmp_path), batch_size=1).write({"url": "https://example.com/a"})
+    worker_writer = JsonlShardWriter(str(tmp_path), batch_size=1, prefix="pages-w001")
+    worker_writer.write({"url": "https://example.com/b"})
+
+    assert (tmp_path / "pages-00000.jsonl").exists()
+    assert (tmp_path / "pages-w001-00000.jsonl").exists()
@@ -0,0 +1,125 @@
+import gzip
+import io
+from website_crawling_agent.sitemap import (
+    iter_sitemap, parse_lastmod, sitemaps_from_robots, discover_sitemap_entries, newest_first, SitemapEntry
+)
+
+def urlset(*entries):
+    urls = "".join(
+        f"<url><loc>{loc}</loc>{f'<lastmod>{lastmod}</lastmod>' if lastmod else ''}</url>" for loc, lastmod in entries
+    )
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>').encode()
+
+def sitemap_index(*entries):
+    sitemaps = "".join(
+        f"<sitemap><loc>{loc}</loc>{f'<lastmod>{lastmod}</lastmod>' if lastmod else ''}</sitemap>"
+        for loc, lastmod in entries
+    )
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{sitemaps}</sitemapindex>').encode()
+
+class FakeResponse:
+    def __init__(self, status_code, body=b""):
+        self.status_code = status_code
+        self.raw = io.BytesIO(body)
+        self.text = body.decode(errors="replace")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        return FakeResponse(*self.responses.get(url, (404, b"")))
+
+def test_parse_lastmod():
+    """Test parsing the W3C datetime forms used in sitemaps"""
+    assert parse_lastmod("2024-05-01") == parse_lastmod("2024-05-01T00:00:00Z")
+    assert parse_lastmod("2024-05-01T02:00:00+02:00") == parse_lastmod("2024-05-01T00:00:00Z")
+    assert parse_lastmod("yesterday") is None
+    assert parse_lastmod(None) is None
+
+def test_sitemaps_from_robots():
+    """Test reading Sitemap lines from robots.txt"""
+    robots = "User-agent: *\nDisallow: /private\nSitemap: https://example.com/sitemap_index.xml\nsitemap: /news.xml\n"
+    assert sitemaps_from_robots("https://example.com/robots.txt", robots) == [
+        "https://example.com/sitemap_index.xml", "https://example.com/news.xml"
+    ]
+
+def test_iter_sitemap_streams_plain_and_gzipped():
+    """Test that plain and gzipped sitemaps yield their entries"""
+    body = urlset(("https://example.com/a", "2024-01-01"), ("https://example.com/b", None))
+    expected = [("url", "https://example.com/a", parse_lastmod("2024-01-01")), ("url", "https://example.com/b", None)]
+
+    assert list(iter_sitemap(io.BytesIO(body))) == expected
+    assert list(iter_sitemap(io.BytesIO(gzip.compress(body)))) == expected
+
+def test_newest_first_with_limit():
+    """Test that with a limit only the newest entries are kept, newest first, and without one the order is kept"""
+    entries = [SitemapEntry("old", 1), SitemapEntry("none"), SitemapEntry("new", 3), SitemapEntry("mid", 2)]
+
+    assert [entry.url for entry in newest_first(iter(entries), limit=2)] == ["new", "mid"]
+    assert [entry.url for entry in newest_first(entries, limit=10)] == ["new", "mid", "old", "none"]
+    assert [entry.url for entry in newest_first(entries)] == ["old", "none", "new", "mid"]
+
+def test_discover_follows_robots_and_indexes():
+    """Test that sitemaps listed in robots.txt and their child sitemaps are read, skipping stale ones"""
+    session = FakeSession({
+        "https://example.com/robots.txt": (200, b"Sitemap: https://example.com/index.xml\n"),
+        "https://example.com/index.xml": (200, sitemap_index(
+            ("https://example.com/fresh.xml.gz", "2024-06-01"),
+            ("https://example.com/stale.xml", "2020-01-01"),
+            ("https://example.com/index.xml", None),
+        )),
+        "https://example.com/fresh.xml.gz": (200, gzip.compress(urlset(
+            ("https://example.com/old", "2023-01-01"),
+            ("https://example.com/new", "2024-05-01"),
+            ("https://example.com/undated", None),
+        ))),
+    })
+
+    entries = discover_sitemap_entries(session, "https://example.com/", since=parse_lastmod("2022-01-01"), limit=10)
+
+    assert [entry.url for entry in entries] == [
+        "https://example.com/new", "https://example.com/old", "https://example.com/undated"
+    ]
+    assert "https://example.com/stale.xml" not in session.requested
+    assert session.requested.count("https://example.com/index.xml") == 1
+
+def test_discover_falls_back_to_sitemap_xml():
+    """Test that /sitemap.xml is tried when robots.txt lists no sitemaps"""
+    session = FakeSession({
+        "https://example.com/sitemap.xml": (200, urlset(("https://example.com/a", None))),
+    })
+    assert [entry.url for entry in discover_sitemap_entries(session, "https://example.com/")] == ["https://example.com/a"]
+
+def test_broken_sitemap_is_skipped():
+    """Test that an unparseable sitemap doesn't stop discovery"""
+    session = FakeSession({
+        "https://example.com/robots.txt": (200, b"Sitemap: /broken.xml\nSitemap: /ok.xml\n"),
+        "https://example.com/broken.xml": (200, b"<urlset><url><loc>https://example.com/x"),
+        "https://example.com/ok.xml": (200, urlset(("https://example.com/ok", None))),
+    })
+    urls = [entry.url for entry in discover_sitemap_entries(session, "https://example.com/")]
+    assert "https://example.com/ok" in urls
+
+def test_accept_filters_before_the_limit():
+    """Test that rejected pages don't take any of the newest `limit` places"""
+    session = FakeSession({
+        "https://example.com/sitemap.xml": (200, urlset(
+            ("https://example.com/private/newest", "2024-06-01"),
+            ("https://example.com/newer", "2024-05-01"),
+            ("https://example.com/older", "2024-01-01"),
+        )),
+    })
+    entries = discover_sitemap_entries(session, "https://example.com/", limit=1,
+                                       accept=lambda url: "/private" not in url)
+    assert [entry.url for entry in entries] == ["https://example.com/newer"]
@@ -0,0 +1,99 @@
+import sqlite3
+import pytest
+from website_crawling_agent import state
+from website_crawling_agent.state import CrawlStateStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = CrawlStateStore(str(tmp_path / "state.sqlite"), batch_size=3, flush_interval=3600)
+    yield store
+    store.close()
+
+def count_rows(path):
+    connection = sqlite3.connect(path)
+    count = connection.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+    connection.close()
+    return count
+
+def test_record_is_written_in_batches(store):
+    """Test that updates are buffered until the batch is full"""
+    store.record("https://example.com/a", state.QUEUED)
+    store.record("https://example.com/b", state.QUEUED)
+    assert count_rows(store.path) == 0
+
+    store.record("https://example.com/c", state.QUEUED)
+    assert count_rows(store.path) == 3
+    assert store.pending == {}
+
+def test_latest_status_wins(store):
+    """Test that only the last status recorded for a URL is kept"""
+    store.record("https://example.com/a", state.QUEUED)
+    store.record("https://example.com/a", state.CLAIMED)
+    store.record("https://example.com/a", state.DONE)
+    store.flush()
+
+    visited_urls, frontier_urls = store.load()
+    assert visited_urls == {"https://example.com/a"}
+    assert frontier_urls == []
+
+def test_load_splits_finished_and_unfinished(store):
+    """Test that finished pages are visited and queued or in-progress pages are requeued"""
+    store.record("https://example.com/done", state.DONE)
+    store.record("https://example.com/failed", state.FAILED)
+    store.record("https://example.com/missing", state.NOT_FOUND)
+    store.record("https://example.com/queued", state.QUEUED)
+    store.record("https://example.com/claimed", state.CLAIMED)
+    store.record("https://example.com/private", state.DISALLOWED)
+
+    visited_urls, frontier_urls = store.load()
+    assert visited_urls == {
+        "https://example.com/done",
+        "https://example.com/failed",
+        "https://example.com/missing",
+    }
+    assert sorted(frontier_urls) == ["https://example.com/claimed", "https://example.com/queued"]
+
+def test_reset_forgets_previous_crawl(store):
+    """Test that reset clears saved and pending state"""
+    store.record("https://example.com/a", state.DONE)
+    store.flush()
+    store.record("https://example.com/b", state.QUEUED)
+
+    store.reset()
+    assert store.load() == (set(), [])
+
+def test_state_survives_reopen(tmp_path):
+    """Test that state written by one store can be read by the next"""
+    path = str(tmp_path / "state.sqlite")
+    first = CrawlStateStore(path)
+    first.record("https://example.com/a", state.DONE)
+    first.close()
+
+    second = CrawlStateStore(path)
+    assert second.load() == ({"https://example.com/a"}, [])
+    second.close()
+
+def test_depths_are_kept_for_resume(store):
+    """Test that the link depth of unfinished pages survives later status updates"""
+    store.record("https://example.com/a", state.QUEUED, 2)
+    store.flush()
+    store.record("https://example.com/a", state.CLAIMED)
+    store.record("https://example.com/b", state.QUEUED, 1)
+    store.record("https://example.com/b", state.DONE)
+
+    assert store.load_depths() == {"https://example.com/a": 2}
+
+def test_old_state_files_get_depth_column(tmp_path):
+    """Test that a state file from before depths were stored still opens"""
+    path = str(tmp_path / "old.sqlite")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE urls (url TEXT PRIMARY KEY, status TEXT NOT NULL, updated_at REAL NOT NULL)")
+    connection.execute("INSERT INTO urls VALUES ('https://example.com/a', 'queued', 0)")
+    connection.commit()
+    connection.close()
+
+    store = CrawlStateStore(path)
+    store.record("https://example.com/b", state.QUEUED, 1)
+    assert store.load_depths() == {"https://example.com/b": 1}
+    assert store.load()[1] == ["https://example.com/a", "https://example.com/b"]
+    store.close()
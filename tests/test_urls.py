@@ -0,0 +1,39 @@
+from website_crawling_agent.urls import canonicalize_url, parse_param_list, url_key
+
+def test_canonicalize_case_ports_and_fragments():
+    """Test that scheme and host case, default ports and anchors don't make a new URL"""
+    assert canonicalize_url("HTTPS://Example.COM:443/Path#section") == "https://example.com/Path"
+    assert canonicalize_url("http://example.com:80/a") == "http://example.com/a"
+    assert canonicalize_url("http://example.com:8080/a") == "http://example.com:8080/a"
+    assert canonicalize_url("http://example.com:443/a") == "http://example.com:443/a"
+
+def test_canonicalize_trailing_slashes():
+    """Test that a trailing slash is kept for fetching, and the root is always /"""
+    assert canonicalize_url("https://example.com/a/") == "https://example.com/a/"
+    assert canonicalize_url("https://example.com/a") == "https://example.com/a"
+    assert canonicalize_url("https://example.com") == "https://example.com/"
+    assert canonicalize_url("https://example.com/") == "https://example.com/"
+
+def test_url_key_ignores_trailing_slashes():
+    """Test that /a and /a/ share a key, and the root keeps its slash"""
+    assert url_key("https://example.com/a/") == url_key("https://example.com/a") == "https://example.com/a"
+    assert url_key("https://example.com/a/?x=1") == "https://example.com/a?x=1"
+    assert url_key("https://example.com/") == "https://example.com/"
+
+def test_canonicalize_query():
+    """Test that query parameters are sorted and tracking parameters removed"""
+    assert canonicalize_url("https://example.com/a?b=2&a=1") == "https://example.com/a?a=1&b=2"
+    assert canonicalize_url("https://example.com/a?utm_source=x&id=3&fbclid=y&utm_medium=z") == \
+        "https://example.com/a?id=3"
+    assert canonicalize_url("https://example.com/a?utm_source=x") == "https://example.com/a"
+    # Encoding is kept as it is
+    assert canonicalize_url("https://example.com/a?q=a%20b+c") == "https://example.com/a?q=a%20b+c"
+
+def test_canonicalize_custom_strip_params():
+    """Test that the list of stripped parameters can be changed"""
+    assert canonicalize_url("https://example.com/a?utm_source=x&sid=1", strip_params=("sid",)) == \
+        "https://example.com/a?utm_source=x"
+    assert canonicalize_url("https://example.com/a?session_1=x", strip_params=("session_*",)) == \
+        "https://example.com/a"
+    assert parse_param_list(" sid, ref_*,,") == ("sid", "ref_*")
+    assert parse_param_list("") == ()
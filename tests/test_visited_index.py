@@ -0,0 +1,39 @@
+import pytest
+from website_crawling_agent.visited_index import FingerprintSet, BloomFilter, create_visited_index
+
+def test_fingerprint_set():
+    """Test that the fingerprint set behaves like a set of URLs"""
+    visited = FingerprintSet(["https://example.com/a"])
+
+    assert "https://example.com/a" in visited
+    assert "https://example.com/b" not in visited
+    assert visited.add("https://example.com/b") is True
+    assert visited.add("https://example.com/b") is False
+    assert len(visited) == 2
+
+def test_bloom_filter_has_no_false_negatives():
+    """Test that every URL added to the Bloom filter is found again"""
+    bloom = BloomFilter(capacity=1000)
+    urls = [f"https://example.com/page{i}" for i in range(1000)]
+    bloom.update(urls)
+
+    assert all(url in bloom for url in urls)
+    assert len(bloom) >= 990
+
+def test_bloom_filter_false_positive_rate_and_size():
+    """Test that the Bloom filter stays near its error rate and its size doesn't grow"""
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    size = len(bloom.bits)
+    bloom.update(f"https://example.com/page{i}" for i in range(10000))
+
+    false_positives = sum(f"https://example.com/other{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+    assert len(bloom.bits) == size
+    assert size < 15000
+
+def test_create_visited_index():
+    """Test choosing the visited index mode"""
+    assert isinstance(create_visited_index("exact"), FingerprintSet)
+    assert isinstance(create_visited_index("bloom", capacity=100), BloomFilter)
+    with pytest.raises(ValueError):
+        create_visited_index("unknown")
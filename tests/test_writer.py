@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import Mock, patch
+from website_crawling_agent.writer import OutputWriter, render_pdf
+
+@pytest.mark.asyncio
+async def test_writes_run_off_the_event_loop():
+    """Test that queued writes run in writer threads and report back on the loop"""
+    writer = OutputWriter(write_workers=2)
+    writer.start()
+    threads = []
+    done = []
+
+    try:
+        for i in range(4):
+            await writer.submit(lambda: threads.append(threading.current_thread()), on_done=done.append)
+        await writer.join()
+    finally:
+        await writer.stop()
+
+    assert len(threads) == 4
+    assert threading.main_thread() not in threads
+    assert done == [None] * 4
+    assert writer.stats == {"written": 4, "failed": 0}
+
+@pytest.mark.asyncio
+async def test_failed_writes_are_reported():
+    """Test that on_done gets the exception of a failed write"""
+    writer = OutputWriter()
+    writer.start()
+    errors = []
+
+    def fail():
+        raise OSError("disk full")
+
+    try:
+        await writer.submit(fail, on_done=errors.append)
+        await writer.join()
+    finally:
+        await writer.stop()
+
+    assert isinstance(errors[0], OSError)
+    assert writer.stats == {"written": 0, "failed": 1}
+
+@pytest.mark.asyncio
+async def test_full_queue_applies_backpressure():
+    """Test that submit waits when the writer has fallen behind"""
+    writer = OutputWriter(queue_size=1, write_workers=1)
+    writer.start()
+    release = threading.Event()
+
+    try:
+        await writer.submit(release.wait)
+        await asyncio.sleep(0.01)
+        # The worker is busy with the first write and the queue holds the second
+        await writer.submit(time.sleep, 0)
+        third = asyncio.ensure_future(writer.submit(time.sleep, 0))
+        await asyncio.sleep(0.05)
+        assert not third.done()
+
+        release.set()
+        await asyncio.wait_for(third, 1)
+        await writer.join()
+    finally:
+        release.set()
+        await writer.stop()
+
+    assert writer.stats["written"] == 3
+
+def test_pdfs_render_in_process_pool(tmp_path):
+    """Test that PDFs go to the process pool, which is only started when needed"""
+    writer = OutputWriter(pdf_workers=3)
+    pool = Mock()
+    with patch('website_crawling_agent.writer.ProcessPoolExecutor', return_value=pool) as pool_class:
+        writer.render_pdf("<h1>Page</h1>", str(tmp_path / "page.pdf"))
+        writer.render_pdf("<h1>Other</h1>", str(tmp_path / "other.pdf"))
+
+    pool_class.assert_called_once_with(max_workers=3)
+    pool.submit.assert_any_call(render_pdf, "<h1>Page</h1>", str(tmp_path / "page.pdf"))
+    assert pool.submit.call_count == 2
+
+def test_pdfs_render_in_thread_without_pool(tmp_path):
+    """Test that pdf_workers=0 renders PDFs in the calling writer thread"""
+    writer = OutputWriter(pdf_workers=0)
+    with patch('website_crawling_agent.writer.pdfkit') as mock_pdfkit:
+        writer.render_pdf("<h1>Page</h1>", "page.pdf")
+    mock_pdfkit.from_string.assert_called_once_with("<h1>Page</h1>", "page.pdf")
@@ -1,9 +1,10 @@
 from .agent import WebsiteCrawlingAgent
+from .batch import BatchCrawler, Seed
+from .options import CacheOptions, IncrementalOptions, MetricsOptions, OutputOptions, PolitenessOptions
 
 __version__ = "0.1.0"
-from .agent import WebsiteCrawlingAgent
-
-__all__ = ['WebsiteCrawlingAgent']
-from .agent import WebsiteCrawlingAgent
 
-__all__ = ['WebsiteCrawlingAgent']
+__all__ = [
+    'WebsiteCrawlingAgent', 'BatchCrawler', 'Seed', 'PolitenessOptions', 'IncrementalOptions', 'CacheOptions',
+    'OutputOptions', 'MetricsOptions',
+]
@@ -1,98 +1,1072 @@
+import asyncio
+import importlib.util
+import itertools
 import os
+import re
 import subprocess
 import sys
+import time
+from functools import partial
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
-from crawl4ai import AsyncWebCrawler
-from crawl4ai.extraction_strategy import LLMExtractionStrategy
-from bs4 import BeautifulSoup
 import json
-import markdown
-import pdfkit
+
+from . import incremental
+from .browser_pool import (
+    DEFAULT_BLOCKED_RESOURCE_TYPES, DEFAULT_BLOCKED_URL_PATTERNS, DEFAULT_PAGES_PER_SESSION, BrowserSessionPool,
+    RequestBlocker
+)
+from .coordinator import DEFAULT_POLL_INTERVAL
+from .extraction_cache import ExtractionCache, make_cache_key
+from . import extraction_cache
+from .extraction_stage import DEFAULT_LLM_CONCURRENCY, ExtractionStage
+from .extractor import DEFAULT_CONFIDENCE_THRESHOLD, extract_main_content
+from .fetcher import TieredFetcher, create_http_session
+from .lazy import LazyObject, lazy_import
+from .frontier import DEFAULT_PATTERN_WEIGHTS, Frontier, UrlFilter, UrlScorer
+from .metrics import PROFILE_FILENAME, CrawlMetrics, MetricsReporter, MetricsServer, PageProfiler
+from .options import CacheOptions, IncrementalOptions, MetricsOptions, OutputOptions, PolitenessOptions
+from .page_parser import parse_page
+from .page_stream import DEFAULT_PAGE_BUFFER, PageStream
+from .pruning import DEFAULT_CHUNK_TOKENS, DEFAULT_TOKEN_BUDGET, estimate_tokens, prepare_llm_input
+from .politeness import HostScheduler, RobotsCache, get_header, parse_retry_after
+from .retry import EXTRACTION, CircuitBreaker, ExtractionError, RetryPolicy, classify_exception, classify_failure
+from . import state
+from .shards import JsonlShardWriter, iso_timestamp
+from .sitemap import SITEMAP_BATCH_SIZE, discover_sitemap_entries
+from .state import CrawlStateStore
+from .urls import DEFAULT_TRACKING_PARAMS, canonicalize_url, url_key
+from .visited_index import DEFAULT_BLOOM_CAPACITY, FingerprintSet, create_visited_index
+from .writer import OutputWriter
+
+# crawl4ai pulls in Playwright and litellm, and wkhtmltopdf is only needed
+# for PDFs; they are imported the first time they are used
+AsyncWebCrawler = lazy_import('crawl4ai', 'AsyncWebCrawler')
+LLMExtractionStrategy = lazy_import('crawl4ai.extraction_strategy', 'LLMExtractionStrategy')
+pdfkit = lazy_import('pdfkit')
+
+DEFAULT_CONCURRENCY = 4
+
+# Fetched pages that may wait for extraction before fetching pauses
+DEFAULT_MAX_PENDING_EXTRACTIONS = 32
+
+EXTRACTION_INSTRUCTION = "Extract the main content, including headings, paragraphs, and any important information. Ignore navigation menus, footers, and sidebars."
+
+BROWSER_CHECK_FOLDER = "website-crawling-agent"
+
+PLAYWRIGHT_VERSION_PATTERN = re.compile(r"version\s*=\s*['\"]([^'\"]+)['\"]")
+
+
+def playwright_version():
+    """The installed Playwright version, found without importing Playwright, or None."""
+    spec = importlib.util.find_spec('playwright')
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    for location in spec.submodule_search_locations:
+        try:
+            with open(os.path.join(location, '_repo_version.py'), encoding='utf-8') as f:
+                match = PLAYWRIGHT_VERSION_PATTERN.search(f.read())
+        except OSError:
+            continue
+        if match:
+            return match.group(1)
+
+    from importlib import metadata
+    try:
+        return metadata.version('playwright')
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def browser_check_marker_path():
+    """File remembering that the browser check passed for this Playwright version, or None."""
+    version = playwright_version()
+    if version is None:
+        return None
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, BROWSER_CHECK_FOLDER, f"playwright-{version}.checked")
+
+
+def browser_check_passed():
+    """True if an earlier run found Chromium for this Playwright version, and it is still there."""
+    marker_path = browser_check_marker_path()
+    if marker_path is None:
+        return False
+    try:
+        with open(marker_path, encoding='utf-8') as f:
+            browser_path = f.read().strip()
+    except OSError:
+        return False
+    return bool(browser_path) and os.path.isdir(browser_path)
+
+
+def remember_browser_check(browser_path):
+    marker_path = browser_check_marker_path()
+    if marker_path is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(marker_path), exist_ok=True)
+        with open(marker_path, 'w', encoding='utf-8') as f:
+            f.write(str(browser_path))
+    except OSError:
+        # Only a cache; the check simply runs again next time
+        pass
+
+def check_playwright_browser():
+    """Check if Playwright browser is installed and provide instructions if not."""
+    try:
+        # Try multiple possible paths for different operating systems
+        possible_paths = [
+            Path.home() / '.cache' / 'ms-playwright',  # Linux/Mac
+            Path.home() / 'AppData' / 'Local' / 'ms-playwright',  # Windows
+            Path('/ms-playwright'),  # Docker/CI environments
+            Path('/usr/local/ms-playwright'),  # Alternative Linux path
+            Path('/opt/ms-playwright')  # Another common Linux path
+        ]
+        
+        browser_exists = False
+        for base_path in possible_paths:
+            if base_path.exists():
+                # Look for chromium directory with more specific patterns
+                chromium_paths = list(base_path.glob('chromium-*')) + \
+                               list(base_path.glob('*/chromium-*'))
+                if chromium_paths:
+                    browser_exists = True
+                    remember_browser_check(chromium_paths[0])
+                    break
+        
+        if not browser_exists:
+            print("\n" + "="*50)
+            print("Playwright Browser Installation Required")
+            print("="*50)
+            print("\nPlaywright browser (Chromium) is not installed.")
+            print("\nInstallation options:")
+            print("\n1. Automatic installation (recommended):")
+            print("   The script will attempt this automatically.")
+            print("\n2. Manual installation:")
+            print("   Run these commands if automatic installation fails:")
+            print("   - pip install playwright")
+            print("   - python -m playwright install chromium")
+            
+            # Try automatic installation
+            try:
+                print("\nAttempting automatic installation...")
+                subprocess.check_call(
+                    [sys.executable, '-m', 'playwright', 'install', 'chromium'],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE
+                )
+                print("\n✓ Successfully installed Playwright browser!")
+                return
+            except subprocess.CalledProcessError as e:
+                print("\n❌ Automatic installation failed.")
+                print(f"Error: {e.stderr.decode() if e.stderr else 'Unknown error'}")
+                print("\nPlease try manual installation using the commands above.")
+                sys.exit(1)
+            except Exception as e:
+                print(f"\n❌ Unexpected error during installation: {str(e)}")
+                print("\nPlease try manual installation using the commands above.")
+                sys.exit(1)
+                
+    except Exception as e:
+        print("\n" + "="*50)
+        print("Error Checking Browser Installation")
+        print("="*50)
+        print(f"\nError details: {str(e)}")
+        print("\nPlease ensure Playwright is installed correctly:")
+        print("1. pip install playwright")
+        print("2. python -m playwright install chromium")
+        sys.exit(1)
+
 
 class WebsiteCrawlingAgent:
-    def __init__(self, start_url, output_format='markdown', max_pages=None, output_folder=None):
+    """Crawls the pages of one site, extracts their content and saves it.
+
+    Related options come in groups, see options.py: `politeness`,
+    `incremental`, `cache`, `output` and `metrics`. A group that is left
+    out has its defaults.
+    """
+
+    def __init__(self, start_url, output_format='markdown', max_pages=None, output_folder=None,
+                 concurrency=DEFAULT_CONCURRENCY, fetch_mode='browser',
+                 extractor='llm', confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD,
+                 llm_token_budget=DEFAULT_TOKEN_BUDGET, llm_chunk_tokens=DEFAULT_CHUNK_TOKENS,
+                 llm_concurrency=DEFAULT_LLM_CONCURRENCY, llm_requests_per_minute=None, llm_batch_tokens=0,
+                 max_pending_extractions=DEFAULT_MAX_PENDING_EXTRACTIONS,
+                 strip_query_params=DEFAULT_TRACKING_PARAMS, visited_index='exact',
+                 bloom_capacity=DEFAULT_BLOOM_CAPACITY, respect_canonical=True,
+                 include_patterns=(), exclude_patterns=(), max_depth=None,
+                 pattern_weights=DEFAULT_PATTERN_WEIGHTS, blocked_resource_types=DEFAULT_BLOCKED_RESOURCE_TYPES,
+                 blocked_url_patterns=DEFAULT_BLOCKED_URL_PATTERNS, pages_per_session=DEFAULT_PAGES_PER_SESSION,
+                 coordinator=None, worker_id=0, check_browser=True, shared=None,
+                 politeness=None, incremental=None, cache=None, output=None, metrics=None):
+        politeness = politeness or PolitenessOptions()
+        incremental = incremental or IncrementalOptions()
+        cache = cache or CacheOptions()
+        output = output or OutputOptions()
+        metrics = metrics or MetricsOptions()
         self.start_url = start_url
         self.output_format = output_format
-        self.visited_urls = set()
+
+        # In a distributed crawl this agent is one of several workers. The
+        # coordinator holds the shared frontier, visited set and page budget,
+        # and this worker only crawls the URLs in its own partition.
+        self.coordinator = coordinator
+        self.worker_id = worker_id
+        self.offered_urls = FingerprintSet()
+        self.budget_spent = False
+
+        # URLs are canonicalized before they are queued, and the visited set
+        # keeps only a fingerprint of each URL's key (or a Bloom filter of them)
+        self.strip_query_params = strip_query_params
+        self.visited_index = visited_index
+        self.bloom_capacity = bloom_capacity
+        self.respect_canonical = respect_canonical
+        self.visited_urls = create_visited_index(visited_index, bloom_capacity)
+
+        # The frontier is best-first: shallow pages, pages many others link to
+        # and pages matching positive pattern weights go first. Filters are
+        # checked before anything is queued.
+        self.url_scorer = UrlScorer(pattern_weights)
+        self.url_filter = UrlFilter(include_patterns, exclude_patterns)
+        self.max_depth = max_depth
+
+        # Seed the frontier from the site's sitemaps, newest pages first
+        self.use_sitemaps = incremental.use_sitemaps
+        self.sitemap_since = incremental.sitemap_since
+        self.sitemap_lastmod = {}
         self.base_domain = urlparse(start_url).netloc
+        self.canonical_domain = urlparse(canonicalize_url(start_url)).netloc
         self.output_folder = output_folder or f"output_{self.base_domain}"
         os.makedirs(self.output_folder, exist_ok=True)
         self.max_pages = max_pages
+        self.concurrency = max(1, concurrency)
         self.pages_crawled = 0
         self.shutdown_flag = False
+
+        # In a batch crawl every seed uses the batch's browser pages, HTTP
+        # session, host scheduler, circuit breaker, LLM stage and writer
+        # (see batch.SharedResources), and the batch starts and stops them.
+        # The options for those are then ignored here.
+        self.shared = shared
+        if shared is None:
+            self.host_scheduler = HostScheduler(max_rate=politeness.max_host_rate)
+        else:
+            self.host_scheduler = shared.host_scheduler
+        # Pages that failed with a timeout, server error, 429, DNS or network
+        # error, or whose extraction failed, are queued again after a
+        # jittered, growing delay. Hosts that keep failing are paused by
+        # their circuit breaker, so the browser and the LLM are spent on
+        # pages that can succeed.
+        self.retry_policy = RetryPolicy(politeness.max_retries, politeness.retry_base_delay, politeness.retry_max_delay)
+        if shared is None:
+            self.circuit_breaker = CircuitBreaker(politeness.breaker_error_rate, politeness.breaker_cooldown)
+        else:
+            self.circuit_breaker = shared.circuit_breaker
+        self.retry_attempts = {}
+        self.retry_urls = set()
+        # Pages whose extraction is still running; see finish_url
+        self.extracting_urls = set()
+        self.retry_counts = {}
+        self.frontier = None
+        self.robots = RobotsCache() if politeness.respect_robots else None
+        self.incremental = incremental.enabled
+        if shared is None:
+            # requests is only imported once something is fetched over plain HTTP
+            self.http_session = LazyObject(partial(create_http_session, self.concurrency))
+            # The browser skips images, fonts, media and trackers, and reuses a
+            # fixed set of pages that are recycled now and then
+            self.request_blocker = RequestBlocker(blocked_resource_types, blocked_url_patterns)
+            self.session_pool = BrowserSessionPool(self.concurrency, pages_per_session)
+        else:
+            self.http_session = shared.http_session
+            self.request_blocker = shared.request_blocker
+            self.session_pool = shared.session_pool
+        # In a batch crawl, requests share the batch's fetch slots fairly across hosts
+        self.fetcher = TieredFetcher(self.host_scheduler, self.http_session, mode=fetch_mode,
+                                     session_pool=self.session_pool,
+                                     slot_scheduler=shared.fetch_scheduler if shared is not None else None)
+
+        # llm, heuristic, or auto: heuristic first and the LLM only when it is unsure
+        self.extractor = extractor
+        self.confidence_threshold = confidence_threshold
+        self.extractor_counts = {'heuristic': 0, 'llm': 0}
+
+        # Pages are pruned to fit this many tokens before they are sent to the LLM
+        self.llm_token_budget = llm_token_budget
+        self.llm_chunk_tokens = llm_chunk_tokens
+        self.pruning_stats = {'pages': 0, 'tokens_before': 0, 'tokens_after': 0, 'truncated': 0}
+
+        # LLM calls run in their own stage, so a slow LLM doesn't hold up fetching and vice versa
+        if shared is None:
+            self.extraction_stage = ExtractionStage(
+                self.create_extraction_strategy, EXTRACTION_INSTRUCTION, concurrency=llm_concurrency,
+                requests_per_minute=llm_requests_per_minute, batch_tokens=llm_batch_tokens
+            )
+        else:
+            self.extraction_stage = shared.extraction_stage
+        self.max_pending_extractions = max_pending_extractions
+        self.extraction_slots = None
+        self.extraction_tasks = set()
+
+        # Time spent in each stage, counters and in-flight gauges. They can be
+        # appended to a JSON lines file every few seconds and served to
+        # Prometheus; workers of a distributed crawl each get their own.
+        self.metrics = CrawlMetrics()
+        self.metrics.gauge_function('pending_extractions', lambda: len(self.extraction_tasks))
+        self.metrics_reporter = None
+        if metrics.path:
+            metrics_path = metrics.path
+            if coordinator is not None:
+                root, extension = os.path.splitext(metrics_path)
+                metrics_path = f"{root}.worker-{worker_id}{extension}"
+            self.metrics_reporter = MetricsReporter(self.metrics, metrics_path, metrics.interval)
+        self.metrics_server = None
+        if metrics.port is not None:
+            metrics_port = metrics.port
+            if coordinator is not None and metrics_port:
+                metrics_port += worker_id
+            self.metrics_server = MetricsServer(self.metrics, metrics_port)
+
+        # cProfile of the parsing, extraction and writing of the first pages
+        self.profiler = None
+        if metrics.profile_pages:
+            profile_filename = PROFILE_FILENAME if coordinator is None else f"profile.worker-{worker_id}.pstats"
+            self.profiler = PageProfiler(metrics.profile_pages, os.path.join(self.output_folder, profile_filename))
+
+        # Output files are written by their own stage, off the event loop.
+        # The writes of this crawl are counted, since a shared writer also
+        # has other crawls' writes queued.
+        if shared is None:
+            self.writer = OutputWriter(queue_size=output.write_queue_size, pdf_workers=output.pdf_workers)
+        else:
+            self.writer = shared.writer
+        self.pending_writes = 0
+        self.writes_finished = None
+        # Pages can be consumed with `iter_pages` instead of, or as well as,
+        # being saved. Without output.save nothing but the crawl state, the
+        # extraction cache and, for incremental crawls, the page metadata
+        # goes to the output folder.
+        self.save_output = output.save
+        self.page_stream = None
+        # jsonl output goes to a few large shard files rather than a file per page
+        self.output_shards = None
+        if output_format == 'jsonl' and self.save_output:
+            # Workers sharing an output folder each write their own shards
+            prefix = 'pages' if coordinator is None else f'pages-w{worker_id:03d}'
+            self.output_shards = JsonlShardWriter(
+                self.output_folder, compression=output.compression, max_shard_bytes=output.max_shard_bytes,
+                prefix=prefix
+            )
+
+        # Extraction results are cached by content, so identical pages only go to the LLM once.
+        # The model is part of the key; see extraction_model
+        self.llm_model = None
+        self.extraction_cache = ExtractionCache(
+            cache.path or os.path.join(self.output_folder, extraction_cache.CACHE_FILENAME), max_bytes=cache.max_bytes
+        )
+
+        # Crawl progress is kept on disk so an interrupted crawl can be resumed
+        state_filename = state.STATE_FILENAME if coordinator is None else state.WORKER_STATE_FILENAME.format(worker_id)
+        self.state_store = CrawlStateStore(os.path.join(self.output_folder, state_filename))
+        self.resume_urls = []
+        self.resume_depths = {}
+        if incremental.resume:
+            self.restore_state()
+        else:
+            self.state_store.reset()
         
-        # Check for Playwright browser installation
-        self.check_playwright_browser()
+        # Check for Playwright browser installation. Plain HTTP crawls don't
+        # need a browser, and once the check has passed for this Playwright
+        # version it is remembered.
+        if check_browser and fetch_mode != 'http' and not browser_check_passed():
+            self.check_playwright_browser()
 
     async def crawl(self):
-        print(f"Starting crawl from {self.start_url}")
-        async with AsyncWebCrawler(verbose=True) as crawler:
-            await self.crawl_page(crawler, self.start_url)
+        if self.coordinator is None:
+            print(f"Starting crawl from {self.start_url}")
+        else:
+            print(f"Starting crawl from {self.start_url} as worker {self.worker_id}")
+        if self.fetcher.mode == 'http':
+            # Nothing to render; don't start a browser
+            await self.crawl_page(None, self.start_url)
+        else:
+            async with AsyncWebCrawler(verbose=True) as crawler:
+                self.request_blocker.attach(crawler)
+                await self.crawl_page(crawler, self.start_url)
+        self.close()
+        self.print_summary()
+
+    async def iter_pages(self, buffer_size=DEFAULT_PAGE_BUFFER):
+        """Crawl the site, yielding a record for every page as soon as it is extracted.
+
+        Records are dicts with the page's `url`, `title`, HTTP `status`,
+        `fetch_started_at`, `fetched_at` and extracted `content`, the same
+        as in jsonl shards. At most `buffer_size` records wait for the
+        consumer; beyond that extraction, and then fetching, wait too.
+        Pages are still saved unless the agent was created with
+        `output=OutputOptions(save=False)`. Leaving the loop early stops
+        the crawl gracefully.
+        """
+        stream = PageStream(buffer_size)
+        self.page_stream = stream
+        self.metrics.gauge_function('page_buffer', lambda: len(stream))
+        crawl_task = asyncio.ensure_future(self.crawl_into(stream))
+        try:
+            while True:
+                record = await stream.get()
+                if record is None:
+                    break
+                yield record
+            await crawl_task
+        finally:
+            if not crawl_task.done():
+                # The consumer stopped early: finish the pages in progress and drop their records
+                self.shutdown()
+                await stream.close()
+                await crawl_task
+            self.page_stream = None
+
+    async def crawl_into(self, stream):
+        try:
+            await self.crawl()
+        finally:
+            await stream.finish()
+
+    def close(self):
+        """Close the crawl state, the extraction cache and the output shards."""
+        self.state_store.close()
+        self.extraction_cache.close()
+        if self.output_shards is not None:
+            self.output_shards.close()
+
+    def print_summary(self):
         print(f"\nCrawl completed. Output saved in {self.output_folder}")
         print(f"Total pages crawled: {self.pages_crawled}")
+        print(f"Extracted with the heuristic: {self.extractor_counts['heuristic']}, "
+              f"with the LLM: {self.extractor_counts['llm']}")
+        print(f"Extraction cache: {self.extraction_cache.hits} hits, {self.extraction_cache.misses} misses")
+        if self.pruning_stats['pages']:
+            saved_tokens = self.pruning_stats['tokens_before'] - self.pruning_stats['tokens_after']
+            print(f"LLM input pruned from {self.pruning_stats['tokens_before']} to {self.pruning_stats['tokens_after']} tokens "
+                  f"({saved_tokens // self.pruning_stats['pages']} saved per page, "
+                  f"{self.pruning_stats['truncated']} pages cut to the token budget)")
+        stage_stats = self.extraction_stage.stats
+        if stage_stats['requests']:
+            print(f"LLM requests: {stage_stats['requests']} for {stage_stats['pages']} pages "
+                  f"({stage_stats['batched_pages']} pages packed into shared requests)")
+        if self.writer.stats['failed']:
+            print(f"Failed to write {self.writer.stats['failed']} pages")
+        if self.retry_counts:
+            retries = ", ".join(f"{count} after {failure}" for failure, count in sorted(self.retry_counts.items()))
+            print(f"Retries: {retries}")
+        if self.circuit_breaker.trips:
+            print(f"Circuit breaker opened {self.circuit_breaker.trips} times")
+        tier_counts = self.fetcher.tier_counts
+        print(f"Fetched over HTTP: {tier_counts['http']}, with the browser: {tier_counts['browser']} "
+              f"({tier_counts['escalated']} escalated from HTTP)")
+        render_stats = self.fetcher.render_stats
+        if render_stats['pages']:
+            print(f"Browser render time: {render_stats['seconds'] / render_stats['pages']:.2f}s per page on average, "
+                  f"{render_stats['max_seconds']:.2f}s at most "
+                  f"({self.session_pool.recycled} browser pages recycled)")
+        blocked_counts = self.request_blocker.blocked_counts
+        if blocked_counts:
+            blocked = ", ".join(f"{count} {resource_type}" for resource_type, count in sorted(blocked_counts.items()))
+            print(f"Blocked browser requests: {blocked} "
+                  f"(about {self.request_blocker.estimated_bytes_saved / (1024 * 1024):.1f} MB saved)")
+        stage_lines = self.metrics.report()
+        if stage_lines:
+            print("Time per stage:")
+            for line in stage_lines:
+                print(f"  {line}")
+        if self.profiler is not None:
+            profile_summary = self.profiler.save()
+            if profile_summary:
+                print(f"Profile of {len(self.profiler.sampled_urls)} pages saved to {self.profiler.path}")
+                print(profile_summary)
 
     async def crawl_page(self, crawler, url, test_mode=False):
-        if self.shutdown_flag or (self.max_pages and self.pages_crawled >= self.max_pages):
-            return
+        """Crawl `url` and every same-domain page reachable from it.
 
-        # Remove anchor from URL
-        url = url.split('#')[0]
+        Pages are taken from a shared frontier by `self.concurrency` workers
+        that all use the same crawler, so several pages can be in flight at
+        once. In test mode only `url` itself is crawled.
 
-        if url in self.visited_urls or not url.startswith(('http://', 'https://')):
-            return
+        With a coordinator, every worker offers the start page and the links
+        it finds to the shared frontier, and crawls the URLs it owns until
+        no worker has anything left.
+        """
+        frontier = Frontier(create_visited_index(self.visited_index, self.bloom_capacity), scorer=self.url_scorer,
+                            key=url_key)
+        # The start page is always crawled, whatever the include and exclude patterns say
+        self.enqueue_url(frontier, url, apply_filters=False)
+        # One worker reading the sitemaps is enough
+        if self.use_sitemaps and self.worker_id == 0:
+            await self.seed_from_sitemaps(frontier, url)
+
+        # Pick up the pages an earlier, interrupted crawl never finished
+        for resume_url in self.resume_urls:
+            self.enqueue_url(frontier, resume_url, self.resume_depths.get(resume_url, 0))
+        self.resume_urls = []
+        self.resume_depths = {}
+
+        self.frontier = frontier
+        self.extraction_slots = asyncio.Semaphore(self.max_pending_extractions)
+        self.writes_finished = asyncio.Event()
+        self.writes_finished.set()
+        if self.shared is None:
+            self.extraction_stage.start()
+            self.writer.start()
+            self.session_pool.start()
+        self.metrics.gauge_function('frontier_size', lambda: len(frontier))
+        self.metrics.gauge_function('retry_queue', lambda: len(frontier.delayed))
+        self.metrics.gauge_function('write_queue', lambda: self.writer.queue.qsize())
+        if self.metrics_reporter is not None:
+            self.metrics_reporter.start()
+        if self.metrics_server is not None:
+            self.metrics_server.start()
+
+        workers = []
+        for _ in range(self.concurrency):
+            workers.append(asyncio.ensure_future(self.crawl_worker(crawler, frontier, test_mode)))
+
+        try:
+            if self.coordinator is not None:
+                await self.pull_from_coordinator(frontier)
+            else:
+                await frontier.join()
+            # Let the pages that were fetched finish extraction. Pages whose
+            # extraction failed may be queued again and crawled once more.
+            while self.extraction_tasks or len(frontier):
+                if self.extraction_tasks:
+                    await asyncio.gather(*list(self.extraction_tasks))
+                await frontier.join()
+            await self.writes_finished.wait()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            for task in self.extraction_tasks:
+                task.cancel()
+            await asyncio.gather(*workers, *self.extraction_tasks, return_exceptions=True)
+            if self.shared is None:
+                await self.extraction_stage.stop()
+                await self.writer.stop()
+                await self.session_pool.close(crawler)
+            if self.metrics_reporter is not None:
+                await self.metrics_reporter.stop()
+            if self.metrics_server is not None:
+                self.metrics_server.stop()
+            self.state_store.flush()
+            if self.output_shards is not None:
+                self.output_shards.flush()
+
+    def restore_state(self):
+        """Load the visited set and unfinished frontier of the previous crawl in this output folder."""
+        visited_urls, frontier_urls = self.state_store.load()
+        self.visited_urls.update(url_key(visited_url) for visited_url in visited_urls)
+        self.pages_crawled = len(visited_urls)
+        self.resume_urls = frontier_urls
+        self.resume_depths = self.state_store.load_depths()
+        print(f"Resuming crawl: {len(visited_urls)} pages already crawled, {len(frontier_urls)} queued")
+
+    async def crawl_worker(self, crawler, frontier, test_mode=False):
+        while True:
+            url, depth = await frontier.get_with_depth()
+            # Retried pages were claimed, and counted towards max_pages, the first time
+            retry = url in self.retry_urls
+            held = False
+            try:
+                if retry:
+                    # A crawl that is stopping doesn't try failed pages again
+                    if self.shutdown_flag:
+                        self.retry_urls.discard(url)
+                        continue
+                else:
+                    if self.crawl_finished():
+                        continue
+
+                if not retry and not await self.is_allowed(url):
+                    self.state_store.record(url, state.DISALLOWED)
+                    continue
+
+                # Hold back pages of a host whose circuit breaker is open
+                wait = self.circuit_breaker.wait_time(url)
+                if wait > 0:
+                    frontier.retry(url, depth, wait)
+                    held = True
+                    continue
+
+                if retry:
+                    self.retry_urls.discard(url)
+                elif not self.claim_url(url):
+                    continue
+
+                links = await self.process_page(crawler, url, depth)
+
+                # Don't process links in test mode
+                if test_mode:
+                    continue
+
+                for next_url in links:
+                    self.enqueue_url(frontier, next_url, depth + 1)
+            finally:
+                if not held:
+                    self.finish_url(url)
+                frontier.task_done()
+
+    def finish_url(self, url):
+        """Tell the coordinator that this worker is done with `url`.
 
-        # Check domain boundary first
-        if urlparse(url).netloc != self.base_domain:
+        Not while the page is queued here again for a retry, or its
+        extraction is still running and may queue it again: until then
+        the crawl is not over, and the links of the retry still have to
+        be offered.
+        """
+        if self.coordinator is None:
             return
+        if url in self.retry_urls or url in self.extracting_urls:
+            return
+        self.coordinator.done(url)
 
-        # Add to visited after domain check
-        self.visited_urls.add(url)
-        self.pages_crawled += 1
+    async def pull_from_coordinator(self, frontier):
+        """Move this worker's URLs from the shared frontier to the local one until the crawl is over.
 
-        print(f"\rCrawling page {self.pages_crawled}: {url}", end='', flush=True)
+        Only a few URLs per fetch worker are taken at a time, so the other
+        workers' links can still reorder them. The crawl is over when no
+        worker has anything queued or in progress, since any of them may
+        still find links this worker owns, or when the page budget is spent.
+        """
+        while not self.crawl_finished():
+            wanted = 2 * self.concurrency - len(frontier)
+            entries = self.coordinator.take(self.worker_id, wanted)
+            for next_url, depth in entries:
+                if not frontier.add(next_url, depth):
+                    self.coordinator.done(next_url)
+            if len(entries) < wanted and self.coordinator.finished(self.max_pages):
+                break
+            if len(entries) < wanted or wanted <= 0:
+                await asyncio.sleep(DEFAULT_POLL_INTERVAL)
+        await frontier.join()
 
-        extraction_strategy = LLMExtractionStrategy(
-            instruction="Extract the main content, including headings, paragraphs, and any important information. Ignore navigation menus, footers, and sidebars."
+    async def seed_from_sitemaps(self, frontier, url):
+        """Queue the pages listed in the site's sitemaps.
+
+        With max_pages, the most recently modified pages that the crawl
+        would queue are picked, newest first. Without it every page is
+        queued in sitemap order, as the sitemaps are read.
+        """
+        loop = asyncio.get_event_loop()
+        entries = await loop.run_in_executor(
+            None, discover_sitemap_entries, self.http_session, url, self.sitemap_since, self.max_pages,
+            self.wanted_from_sitemap
         )
+        entries = iter(entries)
+
+        queued = 0
+        while True:
+            # Reading the sitemaps blocks, so the entries are taken in batches in the executor
+            batch = await loop.run_in_executor(None, lambda: list(itertools.islice(entries, SITEMAP_BATCH_SIZE)))
+            if not batch:
+                break
+            for entry in batch:
+                if not self.enqueue_url(frontier, entry.url):
+                    continue
+                queued += 1
+                # Lets an incremental crawl skip pages the sitemap says haven't changed
+                if self.incremental and entry.lastmod is not None:
+                    self.sitemap_lastmod[url_key(canonicalize_url(entry.url, self.strip_query_params))] = entry.lastmod
+        print(f"Queued {queued} pages from sitemaps")
+
+    def wanted_from_sitemap(self, url):
+        """True if `enqueue_url` would take this sitemap page, as far as can be told up front.
+
+        Runs in the executor thread that reads the sitemaps, so it only
+        reads the crawl's state.
+        """
+        url = canonicalize_url(url, self.strip_query_params)
+        if not url.startswith(('http://', 'https://')) or urlparse(url).netloc != self.canonical_domain:
+            return False
+        if url_key(url) in self.visited_urls:
+            return False
+        return self.url_filter.allows(url)
+
+    def enqueue_url(self, frontier, url, depth=0, apply_filters=True):
+        """Add `url` to the frontier if it is an unvisited page on the crawled domain.
+
+        Unless `apply_filters` is False, URLs must also pass the include and
+        exclude patterns and be no deeper than `max_depth` links from the
+        start page.
+        """
+        # After a shutdown new URLs are still queued, without being crawled,
+        # so that they end up in the saved state for a resumed crawl
+        if self.max_pages_reached():
+            return False
+
+        # Drop the anchor, tracking parameters and other spelling differences.
+        # The trailing slash stays on the URL that is fetched, but not in its key.
+        url = canonicalize_url(url, self.strip_query_params)
+        key = url_key(url)
+
+        if key in self.visited_urls or not url.startswith(('http://', 'https://')):
+            return False
+
+        # Check domain boundary
+        if urlparse(url).netloc != self.canonical_domain:
+            return False
+
+        if apply_filters:
+            if self.max_depth is not None and depth > self.max_depth:
+                return False
+            if not self.url_filter.allows(url):
+                return False
+
+        if self.coordinator is not None:
+            # Every worker finds the same links; only offer each one once
+            if key in self.offered_urls:
+                return False
+            self.offered_urls.add(key)
+            if not self.coordinator.add(url, depth):
+                return False
+        elif not frontier.add(url, depth):
+            return False
+
+        self.state_store.record(url, state.QUEUED, depth)
+        return True
+
+    def claim_url(self, url):
+        """Mark `url` as visited and count it towards max_pages.
+
+        Returns False if the crawl is stopping or the URL was already claimed.
+        There is no await between the check and the update, so two workers
+        can never claim the same URL or go over max_pages. With a
+        coordinator, max_pages counts the pages of all workers.
+        """
+        key = url_key(url)
+        if self.crawl_finished() or key in self.visited_urls:
+            return False
+
+        if self.coordinator is not None and not self.coordinator.claim(self.max_pages):
+            self.budget_spent = True
+            return False
+
+        self.visited_urls.add(key)
+        self.pages_crawled += 1
+        self.state_store.record(url, state.CLAIMED)
+        return True
+
+    async def is_allowed(self, url):
+        """Check robots.txt, when respected, before any browser time is spent on `url`."""
+        if self.robots is None:
+            return True
+
+        if not await self.robots.can_fetch(url):
+            print(f"\nSkipping {url}: disallowed by robots.txt")
+            return False
+
+        crawl_delay = await self.robots.crawl_delay(url)
+        if crawl_delay:
+            self.host_scheduler.set_crawl_delay(url, crawl_delay)
+        return True
+
+    def max_pages_reached(self):
+        return self.budget_spent or bool(self.max_pages and self.pages_crawled >= self.max_pages)
 
-        # Process page even in test mode to ensure arun() is called
+    def crawl_finished(self):
+        return self.shutdown_flag or self.max_pages_reached()
+
+    async def process_page(self, crawler, url, depth=0):
+        """Fetch, extract and save a single claimed page. Returns the links found on it.
+
+        A page that fails in a way worth another try is queued again at
+        `depth`, after a backoff; see `page_failed`.
+        """
+        print(f"\rCrawling page {self.pages_crawled}: {url}", end='', flush=True)
+        self.metrics.inc('pages')
+        if self.profiler is not None:
+            self.profiler.sample(url)
+
+        fetched = False
         try:
-            result = await crawler.arun(url=url, extraction_strategy=extraction_strategy)
+            metadata_path = incremental.metadata_path(self.output_path(url))
+            metadata = None
+            if self.incremental:
+                metadata = incremental.load_metadata(metadata_path)
+                if metadata and (self.unchanged_in_sitemap(url, metadata)
+                                 or await self.is_unchanged_on_server(url, metadata)):
+                    # Nothing to fetch or extract; walk on using the saved links
+                    print(f"\nUnchanged since last crawl: {url}")
+                    self.metrics.inc('pages_unchanged')
+                    self.circuit_breaker.record(url)
+                    self.state_store.record(url, state.DONE)
+                    return metadata.get('links', [])
+
+            # crawl4ai's own cache would hide changes from an incremental crawl
+            fetch_started_at = time.time()
+            with self.metrics.timer('fetch'):
+                result = await self.fetcher.fetch(crawler, url, bypass_cache=self.incremental)
+            fetched_at = time.time()
+            self.metrics.inc('bytes_fetched', len(result.html or ''))
+            response_headers = getattr(result, 'response_headers', None)
+            failure = None
+            if not result.success and result.status_code != 404:
+                failure = classify_failure(result.status_code, result.error_message)
+            fetched = True
+            self.circuit_breaker.record(url, failure)
 
             if result.success and result.status_code != 404:
-                content = result.extracted_content
-                
+                loop = asyncio.get_event_loop()
+                with self.metrics.timer('parse'):
+                    page = await loop.run_in_executor(None, self.profiled, url, parse_page, result.html)
+
                 # Check if the page is a custom 404 page
-                soup = BeautifulSoup(result.html, 'html.parser')
-                title = soup.title.string if soup.title else ""
-                if title and ("404" in title.lower() or "not found" in title.lower()):
+                if page.is_custom_404():
                     print(f"\nSkipping 404 page: {url}")
-                    return
+                    self.metrics.inc('pages_not_found')
+                    self.state_store.record(url, state.NOT_FOUND)
+                    return []
 
-                self.save_content(url, content)
+                links = page.links(url)
 
-                # Don't process links in test mode
-                if test_mode:
-                    return
-
-                # Process links if we haven't hit max pages
-                if not self.max_pages or self.pages_crawled < self.max_pages:
-                    links = soup.find_all('a', href=True)
-                    for link in links:
-                        next_url = urljoin(url, link['href'])
-                        if next_url not in self.visited_urls:  # Only crawl unvisited URLs
-                            await self.crawl_page(crawler, next_url, test_mode=test_mode)
+                canonical_url = self.canonical_link(url, page)
+                if canonical_url:
+                    # A retried page marked its canonical URL visited the first time
+                    if url_key(canonical_url) in self.visited_urls and url not in self.retry_attempts:
+                        print(f"\nSkipping duplicate of {canonical_url}: {url}")
+                        self.metrics.inc('pages_duplicate')
+                        self.state_store.record(url, state.DONE)
+                        return links
+                    # Don't fetch the canonical page again when it is linked later on
+                    self.visited_urls.add(url_key(canonical_url))
+
+                page_hash = incremental.content_hash(result.html)
+                new_metadata = incremental.build_metadata(url, response_headers, page_hash, links)
+                if metadata and metadata.get('content_hash') == page_hash:
+                    print(f"\nUnchanged since last crawl: {url}")
+                    self.metrics.inc('pages_unchanged')
+                    await self.submit_write(url, incremental.save_metadata, metadata_path, new_metadata)
+                    return links
+
+                # Hand the page to extraction and get back to fetching. When too
+                # many pages are waiting for extraction, this waits for a slot.
+                await self.extraction_slots.acquire()
+                record = {
+                    'url': url,
+                    'title': page.title,
+                    'status': result.status_code,
+                    'fetch_started_at': iso_timestamp(fetch_started_at),
+                    'fetched_at': iso_timestamp(fetched_at),
+                }
+                self.extracting_urls.add(url)
+                task = asyncio.ensure_future(
+                    self.extract_and_save(url, result, metadata_path, new_metadata, record, depth)
+                )
+                self.extraction_tasks.add(task)
+                task.add_done_callback(self.extraction_tasks.discard)
+                return links
             elif result.status_code == 404:
                 print(f"\nSkipping 404 page: {url}")
+                self.metrics.inc('pages_not_found')
+                self.state_store.record(url, state.NOT_FOUND)
             else:
-                print(f"\nFailed to crawl {url}: {result.error_message}")
+                retry_after = parse_retry_after(get_header(response_headers, 'retry-after'))
+                self.page_failed(url, depth, failure, f"Failed to crawl {url}: {result.error_message}", retry_after)
         except Exception as e:
-            print(f"\nError crawling {url}: {str(e)}")
+            failure = classify_exception(e)
+            if not fetched:
+                self.circuit_breaker.record(url, failure)
+            self.page_failed(url, depth, failure, f"Error crawling {url}: {str(e)}")
+        return []
+
+    def page_failed(self, url, depth, failure, message, retry_after=None):
+        """Queue a failed page again after a backoff, or give up on it.
+
+        `failure` is the kind of failure, from `retry.classify_failure`, or
+        None when another try would not help. Each page gets at most
+        `max_retries` retries (one for DNS failures), and none once the
+        crawl is stopping.
+        """
+        attempts = self.retry_attempts.get(url, 0)
+        if self.frontier is not None and not self.shutdown_flag and self.retry_policy.should_retry(failure, attempts):
+            delay = self.retry_policy.delay(attempts, retry_after)
+            self.retry_attempts[url] = attempts + 1
+            self.retry_urls.add(url)
+            self.retry_counts[failure] = self.retry_counts.get(failure, 0) + 1
+            self.metrics.inc('retries')
+            self.metrics.inc(f'retries_{failure}')
+            self.state_store.record(url, state.QUEUED, depth)
+            print(f"\n{message}; retrying in {delay:.1f}s ({failure}, retry {attempts + 1} of "
+                  f"{self.retry_policy.retries_for(failure)})")
+            self.frontier.retry(url, depth, delay)
+            return
 
-    def save_content(self, url, content):
+        self.retry_attempts.pop(url, None)
+        print(f"\n{message}")
+        self.metrics.inc('errors')
+        self.state_store.record(url, state.FAILED)
+
+    def canonical_link(self, url, page):
+        """The page's rel=canonical URL, if it names another page on the crawled domain."""
+        if not self.respect_canonical or not page.canonical:
+            return None
+        canonical_url = canonicalize_url(urljoin(url, page.canonical), self.strip_query_params)
+        if url_key(canonical_url) == url_key(url) or urlparse(canonical_url).netloc != self.canonical_domain:
+            return None
+        return canonical_url
+
+    def unchanged_in_sitemap(self, url, metadata):
+        """True if the sitemap's lastmod for `url` is older than our last crawl of it."""
+        lastmod = self.sitemap_lastmod.get(url_key(url))
+        crawled_at = metadata.get('crawled_at')
+        return lastmod is not None and crawled_at is not None and lastmod <= crawled_at
+
+    async def is_unchanged_on_server(self, url, metadata):
+        """Send a conditional request for a page saved by an earlier crawl."""
+        if not incremental.conditional_headers(metadata):
+            return False
+
+        # Paced and, in a batch crawl, slotted like any other request to the host
+        return await self.fetcher.run_request(url, incremental.is_not_modified, self.http_session, url, metadata)
+
+    async def extract_and_save(self, url, result, metadata_path, metadata, record, depth=0):
+        try:
+            content = await self.extract_content(url, result)
+            if self.page_stream is not None:
+                # Waits here while the consumer of iter_pages is behind
+                if await self.page_stream.put(dict(record, content=content)):
+                    self.metrics.inc('pages_streamed')
+            if self.save_output or self.incremental:
+                # Waits here while the writer is behind
+                await self.submit_write(url, self.save_page, url, content, metadata_path, metadata, record)
+            else:
+                self.page_finished(url)
+        except Exception as e:
+            # LLM errors and rate limits are usually short-lived; the page is crawled again later
+            self.page_failed(url, depth, EXTRACTION, f"Error extracting {url}: {str(e)}")
+        finally:
+            self.extraction_slots.release()
+            self.extracting_urls.discard(url)
+            self.finish_url(url)
+
+    def save_page(self, url, content, metadata_path, metadata, record=None):
+        """Write a page and its metadata. Runs in a writer thread."""
+        with self.metrics.timer('write'):
+            if self.save_output:
+                self.profiled(url, self.save_content, url, content, record)
+            # Sidecar files would undo the point of jsonl shards; only keep them when they are used
+            if (self.save_output and self.output_shards is None) or self.incremental:
+                incremental.save_metadata(metadata_path, metadata)
+        if self.save_output:
+            self.metrics.inc('pages_saved')
+            self.metrics.inc('bytes_written', len(content or ''))
+
+    async def submit_write(self, url, func, *args):
+        """Queue a write of the page at `url` with the writer; `page_written` is called once it has run."""
+        self.pending_writes += 1
+        self.writes_finished.clear()
+        await self.writer.submit(func, *args, on_done=partial(self.page_written, url))
+
+    def page_written(self, url, error):
+        if self.writes_finished is not None:
+            self.pending_writes -= 1
+            if self.pending_writes == 0:
+                self.writes_finished.set()
+        self.page_finished(url, error)
+
+    def page_finished(self, url, error=None):
+        if error is not None:
+            print(f"\nError saving {url}: {str(error)}")
+            self.metrics.inc('errors')
+            self.state_store.record(url, state.FAILED)
+        else:
+            self.retry_attempts.pop(url, None)
+            self.state_store.record(url, state.DONE)
+
+    def profiled(self, url, func, *args):
+        """Call `func(*args)`, under the profiler when `url` is one of the sampled pages."""
+        if self.profiler is None:
+            return func(*args)
+        return self.profiler.call(url, func, *args)
+
+    def create_extraction_strategy(self, instruction):
+        return LLMExtractionStrategy(instruction=instruction, chunk_token_threshold=self.llm_chunk_tokens)
+
+    def extraction_model(self):
+        """The provider LLM extraction uses, which is part of the extraction cache key.
+
+        It is crawl4ai's default, so it is read from a strategy once, the
+        first time a page needs the LLM, rather than when the agent is
+        created, which would import crawl4ai even for crawls that never use it.
+        """
+        if self.llm_model is None:
+            self.llm_model = getattr(self.create_extraction_strategy(EXTRACTION_INSTRUCTION), 'provider', '')
+        return self.llm_model
+
+    async def extract_content(self, url, result):
+        """Extract the main content of a fetched page with the configured extractor."""
+        with self.metrics.timer('extract'):
+            if self.extractor != 'llm':
+                loop = asyncio.get_event_loop()
+                text, confidence = await loop.run_in_executor(
+                    None, self.profiled, url, extract_main_content, result.html
+                )
+                if self.extractor == 'heuristic' or confidence >= self.confidence_threshold:
+                    self.extractor_counts['heuristic'] += 1
+                    # Same shape as the blocks LLMExtractionStrategy returns
+                    blocks = [{"index": 0, "tags": ["heuristic"], "content": text.split("\n\n")}]
+                    return json.dumps(blocks, indent=4, ensure_ascii=False)
+
+            self.extractor_counts['llm'] += 1
+            return await self.llm_extract(url, result)
+
+    async def llm_extract(self, url, result):
+        """Run LLM extraction on a fetched page.
+
+        This is what crawl4ai does inside `arun` when given an extraction
+        strategy, but doing it here lets unchanged pages skip it, and the
+        extraction stage runs the blocking LLM call in a thread, with its
+        own concurrency and rate limits. The page is pruned to its content and cut to the token budget
+        first, so the prompt carries no scripts, styles or navigation.
+        """
+        loop = asyncio.get_event_loop()
+        chunks, tokens, truncated = await loop.run_in_executor(
+            None, self.profiled, url, prepare_llm_input,
+            result.html, result.markdown, self.llm_token_budget, self.llm_chunk_tokens
+        )
+        self.pruning_stats['pages'] += 1
+        self.pruning_stats['tokens_before'] += estimate_tokens(result.markdown)
+        self.pruning_stats['tokens_after'] += tokens
+        if truncated:
+            self.pruning_stats['truncated'] += 1
+
+        cache_key = make_cache_key("\n\n".join(chunks), EXTRACTION_INSTRUCTION, self.extraction_model())
+        cached_content = self.extraction_cache.get(cache_key)
+        if cached_content is not None:
+            self.metrics.inc('cache_hits')
+            return cached_content
+        self.metrics.inc('cache_misses')
+        self.metrics.inc('llm_tokens', tokens)
+
+        with self.metrics.timer('llm'):
+            blocks = await self.extraction_stage.extract(url, chunks, tokens, self.create_extraction_strategy)
+        # Failed LLM calls come back as error blocks; they are not cached, and the page is tried again
+        errors = [block for block in blocks if isinstance(block, dict) and block.get('error')]
+        if errors:
+            raise ExtractionError(f"LLM extraction failed: {errors[0].get('content')}")
+        content = json.dumps(blocks, indent=4, default=str, ensure_ascii=False)
+        self.extraction_cache.put(cache_key, content)
+        return content
+
+    def output_path(self, url):
         relative_path = urlparse(url).path.strip('/') or 'index'
-        filename = os.path.join(self.output_folder, f"{relative_path}.{self.output_format}")
+        return os.path.join(self.output_folder, f"{relative_path}.{self.output_format}")
+
+    def save_content(self, url, content, record=None):
+        if self.output_format == 'jsonl':
+            self.output_shards.write(dict(record or {'url': url}, content=content))
+            return
+
+        filename = self.output_path(url)
         os.makedirs(os.path.dirname(filename), exist_ok=True)
 
         if self.output_format == 'markdown':
@@ -103,76 +1077,26 @@ class WebsiteCrawlingAgent:
                 json.dump({"url": url, "content": content}, f, ensure_ascii=False, indent=2)
         elif self.output_format == 'pdf':
             html_content = f"<h1>{url}</h1>\n<p>{content}</p>"
-            pdfkit.from_string(html_content, filename)
+            if self.writer.running:
+                # wkhtmltopdf is slow; render in the writer's process pool
+                self.writer.render_pdf(html_content, filename)
+            else:
+                pdfkit.from_string(html_content, filename)
         else:
             with open(filename, 'w', encoding='utf-8') as f:
                 f.write(content)
 
     def shutdown(self):
-        print("\nShutting down gracefully. Please wait for the current page to finish...")
+        print("\nShutting down gracefully. Please wait for the pages in progress to finish...")
+        self.stop_crawling()
+
+    def stop_crawling(self):
+        """Take no new pages; the pages in progress still finish."""
         self.shutdown_flag = True
+        # Pages waiting for a retry are not crawled again, so don't wait for them either
+        if self.frontier is not None:
+            self.frontier.release_delayed()
 
     def check_playwright_browser(self):
         """Check if Playwright browser is installed and provide instructions if not."""
-        try:
-            # Try multiple possible paths for different operating systems
-            possible_paths = [
-                Path.home() / '.cache' / 'ms-playwright',  # Linux/Mac
-                Path.home() / 'AppData' / 'Local' / 'ms-playwright',  # Windows
-                Path('/ms-playwright'),  # Docker/CI environments
-                Path('/usr/local/ms-playwright'),  # Alternative Linux path
-                Path('/opt/ms-playwright')  # Another common Linux path
-            ]
-            
-            browser_exists = False
-            for base_path in possible_paths:
-                if base_path.exists():
-                    # Look for chromium directory with more specific patterns
-                    chromium_paths = list(base_path.glob('chromium-*')) + \
-                                   list(base_path.glob('*/chromium-*'))
-                    if chromium_paths:
-                        browser_exists = True
-                        break
-            
-            if not browser_exists:
-                print("\n" + "="*50)
-                print("Playwright Browser Installation Required")
-                print("="*50)
-                print("\nPlaywright browser (Chromium) is not installed.")
-                print("\nInstallation options:")
-                print("\n1. Automatic installation (recommended):")
-                print("   The script will attempt this automatically.")
-                print("\n2. Manual installation:")
-                print("   Run these commands if automatic installation fails:")
-                print("   - pip install playwright")
-                print("   - python -m playwright install chromium")
-                
-                # Try automatic installation
-                try:
-                    print("\nAttempting automatic installation...")
-                    subprocess.check_call(
-                        [sys.executable, '-m', 'playwright', 'install', 'chromium'],
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE
-                    )
-                    print("\n✓ Successfully installed Playwright browser!")
-                    return
-                except subprocess.CalledProcessError as e:
-                    print("\n❌ Automatic installation failed.")
-                    print(f"Error: {e.stderr.decode() if e.stderr else 'Unknown error'}")
-                    print("\nPlease try manual installation using the commands above.")
-                    sys.exit(1)
-                except Exception as e:
-                    print(f"\n❌ Unexpected error during installation: {str(e)}")
-                    print("\nPlease try manual installation using the commands above.")
-                    sys.exit(1)
-                    
-        except Exception as e:
-            print("\n" + "="*50)
-            print("Error Checking Browser Installation")
-            print("="*50)
-            print(f"\nError details: {str(e)}")
-            print("\nPlease ensure Playwright is installed correctly:")
-            print("1. pip install playwright")
-            print("2. python -m playwright install chromium")
-            sys.exit(1)
+        check_playwright_browser()
@@ -0,0 +1,331 @@
+import asyncio
+import copy
+import os
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from functools import partial
+from urllib.parse import urlparse
+
+from . import agent as agent_module
+from .agent import EXTRACTION_INSTRUCTION, WebsiteCrawlingAgent, browser_check_passed, check_playwright_browser
+from .browser_pool import (
+    DEFAULT_BLOCKED_RESOURCE_TYPES, DEFAULT_BLOCKED_URL_PATTERNS, DEFAULT_PAGES_PER_SESSION, BrowserSessionPool,
+    RequestBlocker
+)
+from .extraction_stage import DEFAULT_LLM_CONCURRENCY, ExtractionStage
+from .fetcher import create_http_session
+from .lazy import LazyObject
+from .options import OutputOptions, PolitenessOptions
+from .politeness import HostScheduler
+from .retry import CircuitBreaker
+from .writer import OutputWriter
+
+# Pages fetched at the same time across all seeds, and browser pages open
+DEFAULT_BATCH_CONCURRENCY = 8
+# Workers per seed; a seed never has more pages in flight than this
+DEFAULT_SEED_CONCURRENCY = 2
+# Seeds crawled at the same time; the others wait their turn
+DEFAULT_ACTIVE_SEEDS = 16
+
+BATCH_OUTPUT_FOLDER = "output_batch"
+
+# Agent options that configure the shared resources rather than each seed. Of
+# the politeness and output groups, only the host rate, the circuit breaker
+# and the writer settings are shared.
+SHARED_OPTIONS = (
+    'pages_per_session', 'blocked_resource_types', 'blocked_url_patterns', 'llm_concurrency',
+    'llm_requests_per_minute', 'llm_batch_tokens', 'politeness', 'output',
+)
+
+
+class Seed:
+    """A site to crawl in a batch. `max_pages` and `output_folder` default to the batch's."""
+
+    def __init__(self, url, max_pages=None, output_folder=None):
+        self.url = url
+        self.max_pages = max_pages
+        self.output_folder = output_folder
+
+
+def parse_seed_line(line):
+    """Parse a line of a seed file: a URL, optionally followed by max_pages=N and output=FOLDER.
+
+    Returns None for blank lines and # comments.
+    """
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    url, *fields = line.split()
+    if not url.startswith(('http://', 'https://')):
+        raise ValueError(f"Not an http(s) URL: {url}")
+
+    seed = Seed(url)
+    for field in fields:
+        name, separator, value = field.partition('=')
+        if name == 'max_pages' and separator and value.isdigit():
+            seed.max_pages = int(value)
+        elif name == 'output' and separator and value:
+            seed.output_folder = value
+        else:
+            raise ValueError(f"Expected max_pages=N or output=FOLDER, got {field}")
+    return seed
+
+
+def parse_seed_file(path):
+    """Read the seeds of a batch crawl, one per line."""
+    seeds = []
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            try:
+                seed = parse_seed_line(line)
+            except ValueError as e:
+                raise ValueError(f"{path}, line {number}: {e}")
+            if seed is not None:
+                seeds.append(seed)
+    return seeds
+
+
+class FairScheduler:
+    """Shares `slots` slots between keys, such as hosts, taking turns.
+
+    While slots are free they are handed out at once. Once they are all
+    taken, callers wait in a line per key, and every slot that is released
+    goes to the next key in turn, so a site with many pages waiting can't
+    starve the others.
+    """
+
+    def __init__(self, slots):
+        self.slots = max(1, slots)
+        self.in_use = 0
+        # Waiting futures by key, in the order the keys take turns
+        self.waiters = OrderedDict()
+
+    async def acquire(self, key):
+        if self.in_use < self.slots and not self.waiters:
+            self.in_use += 1
+            return
+
+        future = asyncio.get_event_loop().create_future()
+        self.waiters.setdefault(key, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the wait was cancelled
+                self.release()
+            else:
+                self.discard(key, future)
+            raise
+
+    def discard(self, key, future):
+        line = self.waiters.get(key)
+        if line is None:
+            return
+        if future in line:
+            line.remove(future)
+        if not line:
+            del self.waiters[key]
+
+    def release(self):
+        """Free a slot, or hand it straight to the first waiter of the next key in turn."""
+        while self.waiters:
+            key, line = self.waiters.popitem(last=False)
+            future = line.popleft()
+            if line:
+                # The key's next waiter goes to the back of the round
+                self.waiters[key] = line
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_use -= 1
+
+    @asynccontextmanager
+    async def slot(self, key):
+        await self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class SharedResources:
+    """The parts of a crawl that every seed of a batch shares.
+
+    One browser with a pool of `concurrency` pages, one HTTP session, one
+    host scheduler and circuit breaker, one LLM stage holding the LLM
+    concurrency and rate limits, and one writer. All fetches go through
+    `fetch_scheduler`, which shares `concurrency` fetch slots fairly
+    across hosts.
+    """
+
+    def __init__(self, concurrency=DEFAULT_BATCH_CONCURRENCY,
+                 pages_per_session=DEFAULT_PAGES_PER_SESSION, blocked_resource_types=DEFAULT_BLOCKED_RESOURCE_TYPES,
+                 blocked_url_patterns=DEFAULT_BLOCKED_URL_PATTERNS, llm_concurrency=DEFAULT_LLM_CONCURRENCY,
+                 llm_requests_per_minute=None, llm_batch_tokens=0, politeness=None, output=None):
+        politeness = politeness or PolitenessOptions()
+        output = output or OutputOptions()
+        self.concurrency = max(1, concurrency)
+        self.fetch_scheduler = FairScheduler(self.concurrency)
+        self.host_scheduler = HostScheduler(max_rate=politeness.max_host_rate)
+        self.circuit_breaker = CircuitBreaker(politeness.breaker_error_rate, politeness.breaker_cooldown)
+        self.http_session = LazyObject(partial(create_http_session, self.concurrency))
+        self.request_blocker = RequestBlocker(blocked_resource_types, blocked_url_patterns)
+        self.session_pool = BrowserSessionPool(self.concurrency, pages_per_session)
+        # Every seed passes its own extraction strategy with each page
+        self.extraction_stage = ExtractionStage(
+            None, EXTRACTION_INSTRUCTION, concurrency=llm_concurrency,
+            requests_per_minute=llm_requests_per_minute, batch_tokens=llm_batch_tokens
+        )
+        self.writer = OutputWriter(queue_size=output.write_queue_size, pdf_workers=output.pdf_workers)
+
+    def start(self):
+        self.extraction_stage.start()
+        self.writer.start()
+        self.session_pool.start()
+
+    async def stop(self, crawler):
+        await self.extraction_stage.stop()
+        await self.writer.stop()
+        await self.session_pool.close(crawler)
+
+
+class BatchCrawler:
+    """Crawls many seeds at the same time in one process.
+
+    Each seed is crawled by its own WebsiteCrawlingAgent, within its own
+    domain, into its own output folder (`output_folder/<domain>` unless
+    the seed names one), up to its own page quota (`max_pages` unless the
+    seed sets one), with `seed_concurrency` workers. At most
+    `max_active_seeds` seeds are crawled at a time; the others wait their
+    turn, in order. Every seed shares one browser and the other
+    SharedResources, so Chromium starts and the install check runs once.
+
+    Other keyword arguments are passed on to every agent.
+    """
+
+    def __init__(self, seeds, output_folder=None, max_pages=None, concurrency=DEFAULT_BATCH_CONCURRENCY,
+                 seed_concurrency=DEFAULT_SEED_CONCURRENCY, max_active_seeds=DEFAULT_ACTIVE_SEEDS,
+                 agent_class=WebsiteCrawlingAgent, **agent_options):
+        metrics = agent_options.get('metrics')
+        if agent_options.get('coordinator') is not None or (metrics is not None and metrics.port is not None):
+            raise ValueError("Batch crawls don't support a coordinator or a metrics port")
+        self.seeds = [seed if isinstance(seed, Seed) else Seed(seed) for seed in seeds]
+        self.output_folder = output_folder or BATCH_OUTPUT_FOLDER
+        self.max_pages = max_pages
+        self.seed_concurrency = seed_concurrency
+        self.max_active_seeds = max(1, max_active_seeds)
+        self.agent_class = agent_class
+        self.check_browser = agent_options.pop('check_browser', True)
+        self.fetch_mode = agent_options.get('fetch_mode', 'browser')
+        self.agent_options = agent_options
+        self.shared = SharedResources(
+            concurrency, **{name: agent_options[name] for name in SHARED_OPTIONS if name in agent_options}
+        )
+        self.output_folders = self.assign_output_folders()
+        # Agents of the seeds being crawled, by seed index
+        self.agents = {}
+        # One dict per finished seed: url, output_folder, pages and error
+        self.results = []
+        self.shutdown_flag = False
+
+    def assign_output_folders(self):
+        """An output folder per seed; seeds on the same domain get numbered folders."""
+        folders = []
+        for seed in self.seeds:
+            folder = seed.output_folder
+            if folder is None:
+                name = urlparse(seed.url).netloc.replace(':', '_')
+                folder = os.path.join(self.output_folder, name)
+                number = 2
+                while folder in folders:
+                    folder = os.path.join(self.output_folder, f"{name}-{number}")
+                    number += 1
+            folders.append(folder)
+        return folders
+
+    async def crawl(self):
+        print(f"Starting batch crawl of {len(self.seeds)} seeds, "
+              f"{min(len(self.seeds), self.max_active_seeds)} at a time")
+        if self.fetch_mode == 'http':
+            await self.crawl_seeds(None)
+        else:
+            if self.check_browser and not browser_check_passed():
+                check_playwright_browser()
+            async with agent_module.AsyncWebCrawler(verbose=True) as crawler:
+                self.shared.request_blocker.attach(crawler)
+                await self.crawl_seeds(crawler)
+        self.print_summary()
+
+    async def crawl_seeds(self, crawler):
+        self.shared.start()
+        active_seeds = asyncio.Semaphore(self.max_active_seeds)
+        try:
+            await asyncio.gather(*[self.crawl_seed(crawler, index, active_seeds) for index in range(len(self.seeds))])
+            await self.shared.writer.join()
+        finally:
+            await self.shared.stop(crawler)
+
+    def create_agent(self, index):
+        seed = self.seeds[index]
+        folder = self.output_folders[index]
+        options = dict(self.agent_options)
+        metrics = options.get('metrics')
+        if metrics is not None and metrics.path:
+            # Each seed writes its own metrics file
+            options['metrics'] = copy.copy(metrics)
+            root, extension = os.path.splitext(metrics.path)
+            options['metrics'].path = f"{root}.{os.path.basename(folder)}{extension}"
+        return self.agent_class(
+            seed.url, output_folder=folder, max_pages=seed.max_pages if seed.max_pages is not None else self.max_pages,
+            concurrency=self.seed_concurrency, check_browser=False, shared=self.shared, **options
+        )
+
+    async def crawl_seed(self, crawler, index, active_seeds):
+        """Crawl one seed once it is its turn. A seed that fails doesn't stop the others."""
+        async with active_seeds:
+            if self.shutdown_flag:
+                return
+            seed = self.seeds[index]
+            result = {'url': seed.url, 'output_folder': self.output_folders[index], 'pages': 0, 'error': None}
+            try:
+                agent = self.create_agent(index)
+            except Exception as e:
+                print(f"\nError starting seed {seed.url}: {str(e)}")
+                result['error'] = str(e)
+                self.results.append(result)
+                return
+
+            self.agents[index] = agent
+            try:
+                await agent.crawl_page(crawler, seed.url)
+                print(f"\nFinished {seed.url}: {agent.pages_crawled} pages saved in {agent.output_folder}")
+            except Exception as e:
+                print(f"\nError crawling seed {seed.url}: {str(e)}")
+                result['error'] = str(e)
+            finally:
+                del self.agents[index]
+                agent.close()
+            result['pages'] = agent.pages_crawled
+            self.results.append(result)
+
+    def shutdown(self):
+        print("\nShutting down gracefully. Please wait for the pages in progress to finish...")
+        self.shutdown_flag = True
+        for agent in list(self.agents.values()):
+            agent.stop_crawling()
+
+    def print_summary(self):
+        pages = sum(result['pages'] for result in self.results)
+        print(f"\nBatch crawl completed: {pages} pages from {len(self.results)} of {len(self.seeds)} seeds, "
+              f"saved in {self.output_folder}")
+        failed = [result for result in self.results if result['error']]
+        for result in failed:
+            print(f"  Failed: {result['url']}: {result['error']}")
+        stage_stats = self.shared.extraction_stage.stats
+        if stage_stats['requests']:
+            print(f"LLM requests: {stage_stats['requests']} for {stage_stats['pages']} pages "
+                  f"({stage_stats['batched_pages']} pages packed into shared requests)")
+        if self.shared.session_pool.recycled:
+            print(f"{self.shared.session_pool.recycled} browser pages recycled")
+        if self.shared.circuit_breaker.trips:
+            print(f"Circuit breaker opened {self.shared.circuit_breaker.trips} times")
@@ -0,0 +1,140 @@
+import asyncio
+import re
+import weakref
+
+# Playwright resource types; the text we keep never needs these
+DEFAULT_BLOCKED_RESOURCE_TYPES = ('image', 'media', 'font')
+
+# Analytics, tag managers and ad networks
+DEFAULT_BLOCKED_URL_PATTERNS = (
+    r'google-analytics\.com', r'googletagmanager\.com', r'googlesyndication\.com', r'doubleclick\.net',
+    r'adservice\.google\.', r'connect\.facebook\.net', r'hotjar\.com', r'segment\.(io|com)/',
+    r'amazon-adsystem\.com', r'scorecardresearch\.com', r'clarity\.ms', r'mixpanel\.com',
+)
+
+# Rough median transfer sizes, used to estimate what blocking saved
+ESTIMATED_RESOURCE_BYTES = {
+    'image': 20000,
+    'media': 500000,
+    'font': 30000,
+    'stylesheet': 15000,
+    'script': 25000,
+}
+ESTIMATED_OTHER_BYTES = 5000
+
+# Pages rendered in one browser page and context before it is thrown away
+DEFAULT_PAGES_PER_SESSION = 50
+
+
+class RequestBlocker:
+    """Aborts browser requests for blocked resource types and URL patterns.
+
+    Installed as crawl4ai's `before_goto` hook, it adds a Playwright route
+    to every page the first time the page is used.
+    """
+
+    def __init__(self, resource_types=DEFAULT_BLOCKED_RESOURCE_TYPES, url_patterns=DEFAULT_BLOCKED_URL_PATTERNS):
+        self.resource_types = set(resource_types)
+        self.url_patterns = [re.compile(pattern) for pattern in url_patterns]
+        self.blocked_counts = {}
+        self.estimated_bytes_saved = 0
+        self.routed_pages = weakref.WeakSet()
+
+    @property
+    def enabled(self):
+        return bool(self.resource_types or self.url_patterns)
+
+    def should_block(self, resource_type, url):
+        if resource_type in self.resource_types:
+            return True
+        return any(pattern.search(url) for pattern in self.url_patterns)
+
+    async def handle_route(self, route):
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            self.blocked_counts[request.resource_type] = self.blocked_counts.get(request.resource_type, 0) + 1
+            self.estimated_bytes_saved += ESTIMATED_RESOURCE_BYTES.get(request.resource_type, ESTIMATED_OTHER_BYTES)
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def before_goto(self, page, *args, **kwargs):
+        if page not in self.routed_pages:
+            await page.route("**/*", self.handle_route)
+            self.routed_pages.add(page)
+        return page
+
+    def attach(self, crawler):
+        """Install the blocker on a crawl4ai crawler using the Playwright strategy."""
+        strategy = getattr(crawler, 'crawler_strategy', None)
+        if not self.enabled or not isinstance(getattr(strategy, 'hooks', None), dict):
+            return False
+        strategy.set_hook('before_goto', self.before_goto)
+        return True
+
+
+class BrowserSession:
+    def __init__(self, slot):
+        self.slot = slot
+        self.generation = 0
+        self.uses = 0
+
+    @property
+    def id(self):
+        return f"crawl-{self.slot}-{self.generation}"
+
+
+class BrowserSessionPool:
+    """A fixed set of reusable browser pages, as crawl4ai sessions.
+
+    Without a session, crawl4ai opens a new browser context and page for
+    every page it renders. Each fetch instead borrows one of `size`
+    sessions, and a session is closed and replaced after
+    `pages_per_session` pages, or after an error, so Chromium's memory
+    can't keep growing on long crawls. A `pages_per_session` of 0 turns
+    pooling off.
+    """
+
+    def __init__(self, size, pages_per_session=DEFAULT_PAGES_PER_SESSION):
+        self.size = max(1, size)
+        self.pages_per_session = pages_per_session
+        self.recycled = 0
+        self.sessions = None
+
+    @property
+    def enabled(self):
+        return self.pages_per_session > 0
+
+    def start(self):
+        self.sessions = asyncio.Queue()
+        for slot in range(self.size):
+            self.sessions.put_nowait(BrowserSession(slot))
+
+    async def acquire(self):
+        return await self.sessions.get()
+
+    async def release(self, crawler, session, broken=False):
+        session.uses += 1
+        try:
+            if broken or session.uses >= self.pages_per_session:
+                await self.kill(crawler, session)
+                session.generation += 1
+                session.uses = 0
+                self.recycled += 1
+        finally:
+            self.sessions.put_nowait(session)
+
+    async def kill(self, crawler, session):
+        strategy = getattr(crawler, 'crawler_strategy', None)
+        if strategy is not None and hasattr(strategy, 'kill_session'):
+            try:
+                await strategy.kill_session(session.id)
+            except Exception as e:
+                print(f"\nError closing browser session {session.id}: {str(e)}")
+
+    async def close(self, crawler):
+        if self.sessions is None:
+            return
+        while not self.sessions.empty():
+            await self.kill(crawler, self.sessions.get_nowait())
+        self.sessions = None
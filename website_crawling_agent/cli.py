@@ -1,29 +1,397 @@
 import asyncio
 import argparse
-from .agent import WebsiteCrawlingAgent
+import multiprocessing
+import os
+import re
+from urllib.parse import urlparse
+from .agent import WebsiteCrawlingAgent, DEFAULT_CONCURRENCY
+from .batch import (
+    BATCH_OUTPUT_FOLDER, DEFAULT_ACTIVE_SEEDS, DEFAULT_BATCH_CONCURRENCY, DEFAULT_SEED_CONCURRENCY, BatchCrawler,
+    parse_seed_file
+)
+from .browser_pool import DEFAULT_BLOCKED_RESOURCE_TYPES, DEFAULT_BLOCKED_URL_PATTERNS, DEFAULT_PAGES_PER_SESSION
+from .coordinator import COORDINATOR_FILENAME, PARTITION_MODES, create_coordinator
+from .extraction_stage import DEFAULT_LLM_CONCURRENCY
+from .extractor import EXTRACTORS
+from .fetcher import FETCH_MODES
+from .frontier import DEFAULT_PATTERN_WEIGHTS, parse_pattern_weight
+from .metrics import DEFAULT_METRICS_INTERVAL
+from .options import CacheOptions, IncrementalOptions, MetricsOptions, OutputOptions, PolitenessOptions
+from .pruning import DEFAULT_CHUNK_TOKENS, DEFAULT_TOKEN_BUDGET
+from .retry import (
+    DEFAULT_BREAKER_COOLDOWN, DEFAULT_BREAKER_ERROR_RATE, DEFAULT_MAX_RETRIES, DEFAULT_RETRY_BASE_DELAY,
+    DEFAULT_RETRY_MAX_DELAY
+)
+from .shards import COMPRESSIONS, DEFAULT_SHARD_BYTES
+from .sitemap import parse_lastmod
+from .urls import DEFAULT_TRACKING_PARAMS, parse_param_list
+from .visited_index import DEFAULT_BLOOM_CAPACITY, VISITED_INDEX_MODES
+from .writer import DEFAULT_PDF_WORKERS
+
+def regex(value):
+    try:
+        re.compile(value)
+    except re.error as e:
+        raise argparse.ArgumentTypeError(f"invalid regular expression {value}: {e}")
+    return value
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Crawl websites and extract information using LLMs")
-    parser.add_argument("url", help="Starting URL to crawl")
+    parser.add_argument("url", nargs="?", help="Starting URL to crawl")
+    parser.add_argument("--seeds",
+                      metavar="FILE",
+                      help="Crawl every site listed in FILE, one starting URL per line, optionally followed by "
+                           "max_pages=N and output=FOLDER, instead of a single URL")
+    parser.add_argument("--seed-concurrency",
+                      type=int,
+                      default=DEFAULT_SEED_CONCURRENCY,
+                      help=f"With --seeds, pages of one site crawled at the same time (default: {DEFAULT_SEED_CONCURRENCY})")
+    parser.add_argument("--active-seeds",
+                      type=int,
+                      default=DEFAULT_ACTIVE_SEEDS,
+                      help=f"With --seeds, sites crawled at the same time (default: {DEFAULT_ACTIVE_SEEDS})")
     parser.add_argument("--format", "-f", 
-                      choices=["markdown", "json", "pdf", "txt"],
+                      choices=["markdown", "json", "pdf", "txt", "jsonl"],
                       default="markdown",
                       help="Output format (default: markdown)")
     parser.add_argument("--max-pages", "-m", 
                       type=int,
                       help="Maximum number of pages to crawl")
     parser.add_argument("--output-folder", "-o",
-                      help="Output folder path")
-    return parser.parse_args()
+                      help="Output folder path; with --seeds, the folder holding a folder per site "
+                           f"(default: {BATCH_OUTPUT_FOLDER})")
+    parser.add_argument("--compression",
+                      choices=COMPRESSIONS,
+                      default="none",
+                      help="Compression of jsonl shards (default: none; zstd needs the zstandard package)")
+    parser.add_argument("--shard-size-mb",
+                      type=float,
+                      default=DEFAULT_SHARD_BYTES / (1024 * 1024),
+                      help=f"Size at which a new jsonl shard is started (default: {DEFAULT_SHARD_BYTES // (1024 * 1024)})")
+    parser.add_argument("--include",
+                      action="append",
+                      default=[],
+                      type=regex,
+                      metavar="REGEX",
+                      help="Only crawl URLs matching this regular expression (can be repeated)")
+    parser.add_argument("--exclude",
+                      action="append",
+                      default=[],
+                      type=regex,
+                      metavar="REGEX",
+                      help="Never crawl URLs matching this regular expression (can be repeated)")
+    parser.add_argument("--max-depth",
+                      type=int,
+                      help="Maximum number of links to follow from the starting URL")
+    parser.add_argument("--priority",
+                      action="append",
+                      default=[],
+                      type=parse_pattern_weight,
+                      metavar="REGEX=WEIGHT",
+                      help="Crawl URLs matching REGEX earlier (positive weight) or later (negative weight); "
+                           "can be repeated")
+    parser.add_argument("--concurrency", "-c",
+                      type=int,
+                      help=f"Number of pages to crawl at the same time (default: {DEFAULT_CONCURRENCY}; "
+                           f"with --seeds, across all sites: {DEFAULT_BATCH_CONCURRENCY})")
+    parser.add_argument("--workers", "-w",
+                      type=int,
+                      default=1,
+                      help="Number of crawler processes, each with its own browser, sharing one frontier (default: 1)")
+    parser.add_argument("--coordinator",
+                      help="Where the workers share their frontier: a SQLite file, or a redis:// URL for workers on "
+                           f"several machines (default: {COORDINATOR_FILENAME} in the output folder)")
+    parser.add_argument("--partition-by",
+                      choices=PARTITION_MODES,
+                      default="url",
+                      help="Split URLs between workers by a hash of the URL, or of its host (default: url)")
+    parser.add_argument("--node-index",
+                      type=int,
+                      default=0,
+                      help="Position of this machine among --node-count machines sharing a Redis coordinator "
+                           "(default: 0; start node 0 first, it clears the previous crawl)")
+    parser.add_argument("--node-count",
+                      type=int,
+                      default=1,
+                      help="Number of machines running --workers processes each (default: 1)")
+    parser.add_argument("--respect-robots",
+                      action="store_true",
+                      help="Skip URLs disallowed by robots.txt and honor its Crawl-delay")
+    parser.add_argument("--max-host-rate",
+                      type=float,
+                      help="Maximum requests per second to a single host (default: adapt to the host)")
+    parser.add_argument("--max-retries",
+                      type=int,
+                      default=DEFAULT_MAX_RETRIES,
+                      help="Retries of a page that failed with a timeout, server error, 429, DNS or network error, "
+                           f"or whose extraction failed (default: {DEFAULT_MAX_RETRIES})")
+    parser.add_argument("--retry-delay",
+                      type=float,
+                      default=DEFAULT_RETRY_BASE_DELAY,
+                      help="Seconds before the first retry; the delay doubles with every retry, with jitter "
+                           f"(default: {DEFAULT_RETRY_BASE_DELAY:g})")
+    parser.add_argument("--retry-max-delay",
+                      type=float,
+                      default=DEFAULT_RETRY_MAX_DELAY,
+                      help=f"Longest delay before a retry, in seconds (default: {DEFAULT_RETRY_MAX_DELAY:g})")
+    parser.add_argument("--breaker-error-rate",
+                      type=float,
+                      default=DEFAULT_BREAKER_ERROR_RATE,
+                      help="Pause a host when this share of its recent requests failed "
+                           f"(default: {DEFAULT_BREAKER_ERROR_RATE:g}; 0 never pauses)")
+    parser.add_argument("--breaker-cooldown",
+                      type=float,
+                      default=DEFAULT_BREAKER_COOLDOWN,
+                      help="Seconds a paused host gets before a probe request is sent; doubled while probes fail "
+                           f"(default: {DEFAULT_BREAKER_COOLDOWN:g})")
+    parser.add_argument("--resume",
+                      action="store_true",
+                      help="Continue an interrupted crawl from the state saved in the output folder")
+    parser.add_argument("--incremental",
+                      action="store_true",
+                      help="Only extract and save pages that changed since the last crawl into the output folder")
+    parser.add_argument("--sitemaps",
+                      action="store_true",
+                      help="Seed the crawl with the pages listed in the site's sitemaps; with --max-pages, the most recently modified first")
+    parser.add_argument("--sitemap-since",
+                      help="Only seed sitemap pages modified on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--extraction-cache",
+                      help="Path of the extraction cache database (default: inside the output folder)")
+    parser.add_argument("--fetch-mode",
+                      choices=FETCH_MODES,
+                      default="browser",
+                      help="browser: always use the headless browser; http: plain HTTP only; "
+                           "auto: plain HTTP first, browser when the page needs JavaScript (default: browser)")
+    parser.add_argument("--block-resources",
+                      default=",".join(DEFAULT_BLOCKED_RESOURCE_TYPES),
+                      help="Comma-separated browser resource types not to load, e.g. image,media,font,stylesheet "
+                           f"(default: {','.join(DEFAULT_BLOCKED_RESOURCE_TYPES)}; empty to load everything)")
+    parser.add_argument("--block-url",
+                      action="append",
+                      default=[],
+                      type=regex,
+                      metavar="REGEX",
+                      help="Don't load browser requests to URLs matching this regular expression, in addition to "
+                           "common analytics and ad networks (can be repeated)")
+    parser.add_argument("--skip-browser-check",
+                      action="store_true",
+                      help="Don't check that Playwright's Chromium is installed before crawling")
+    parser.add_argument("--allow-trackers",
+                      action="store_true",
+                      help="Don't block the built-in list of analytics and ad networks")
+    parser.add_argument("--pages-per-session",
+                      type=int,
+                      default=DEFAULT_PAGES_PER_SESSION,
+                      help="Pages rendered in one browser page before it is closed and replaced "
+                           f"(default: {DEFAULT_PAGES_PER_SESSION}; 0 opens a new page every time)")
+    parser.add_argument("--extractor",
+                      choices=EXTRACTORS,
+                      default="llm",
+                      help="llm: extract every page with the LLM; heuristic: fast local extraction only; "
+                           "auto: heuristic first, LLM only for pages it is unsure about (default: llm)")
+    parser.add_argument("--llm-token-budget",
+                      type=int,
+                      default=DEFAULT_TOKEN_BUDGET,
+                      help=f"Most tokens of page text sent to the LLM per page (default: {DEFAULT_TOKEN_BUDGET})")
+    parser.add_argument("--llm-chunk-tokens",
+                      type=int,
+                      default=DEFAULT_CHUNK_TOKENS,
+                      help=f"Size of each chunk of a page sent to the LLM (default: {DEFAULT_CHUNK_TOKENS})")
+    parser.add_argument("--llm-concurrency",
+                      type=int,
+                      default=DEFAULT_LLM_CONCURRENCY,
+                      help=f"Number of LLM requests running at the same time (default: {DEFAULT_LLM_CONCURRENCY})")
+    parser.add_argument("--llm-rpm",
+                      type=float,
+                      help="Maximum LLM requests per minute (default: no limit)")
+    parser.add_argument("--llm-batch-tokens",
+                      type=int,
+                      default=0,
+                      help="Pack small pages into one LLM request up to this many tokens (default: 0, no packing)")
+    parser.add_argument("--strip-params",
+                      default=",".join(DEFAULT_TRACKING_PARAMS),
+                      help="Comma-separated query parameters to remove from URLs; a trailing * matches a prefix "
+                           "(default: common tracking parameters such as utm_*, gclid and fbclid)")
+    parser.add_argument("--ignore-canonical",
+                      action="store_true",
+                      help="Don't use rel=canonical links to skip duplicate pages")
+    parser.add_argument("--visited-index",
+                      choices=VISITED_INDEX_MODES,
+                      default="exact",
+                      help="exact: keep a 64-bit fingerprint per visited URL; bloom: fixed-size Bloom filter "
+                           "for very large sites, which may skip a few pages (default: exact)")
+    parser.add_argument("--bloom-capacity",
+                      type=int,
+                      default=DEFAULT_BLOOM_CAPACITY,
+                      help=f"Number of URLs the Bloom filter is sized for (default: {DEFAULT_BLOOM_CAPACITY})")
+    parser.add_argument("--pdf-workers",
+                      type=int,
+                      default=DEFAULT_PDF_WORKERS,
+                      help=f"Number of processes rendering PDFs (default: {DEFAULT_PDF_WORKERS})")
+    parser.add_argument("--metrics-file",
+                      help="Append a JSON summary of stage timings, counters and gauges to this file periodically")
+    parser.add_argument("--metrics-interval",
+                      type=float,
+                      default=DEFAULT_METRICS_INTERVAL,
+                      help=f"Seconds between two summaries in --metrics-file (default: {DEFAULT_METRICS_INTERVAL:g})")
+    parser.add_argument("--metrics-port",
+                      type=int,
+                      help="Serve metrics for Prometheus at http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--profile-pages",
+                      type=int,
+                      default=0,
+                      metavar="N",
+                      help="Profile the parsing, extraction and writing of the first N pages with cProfile")
+    args = parser.parse_args()
+    if args.sitemap_since is not None and parse_lastmod(args.sitemap_since) is None:
+        parser.error(f"--sitemap-since: not a date: {args.sitemap_since}")
+    if args.workers < 1 or args.node_count < 1 or not 0 <= args.node_index < args.node_count:
+        parser.error("--workers and --node-count must be at least 1, and --node-index below --node-count")
+    if (args.url is None) == (args.seeds is None):
+        parser.error("give either a starting URL or --seeds")
+    if args.seeds is not None:
+        if args.workers > 1 or args.node_count > 1 or args.coordinator or args.metrics_port is not None:
+            parser.error("--seeds can't be combined with --workers, --node-count, --coordinator or --metrics-port")
+        try:
+            args.seed_list = parse_seed_file(args.seeds)
+        except (OSError, ValueError) as e:
+            parser.error(f"--seeds: {e}")
+        if not args.seed_list:
+            parser.error(f"--seeds: no URLs in {args.seeds}")
+    elif args.concurrency is None:
+        args.concurrency = DEFAULT_CONCURRENCY
+    return args
 
-def main():
-    args = parse_args()
-    agent = WebsiteCrawlingAgent(
+def agent_options(args):
+    """WebsiteCrawlingAgent arguments for the parsed command line."""
+    return dict(
         start_url=args.url,
         output_format=args.format,
         max_pages=args.max_pages,
-        output_folder=args.output_folder
+        output_folder=args.output_folder,
+        include_patterns=args.include,
+        exclude_patterns=args.exclude,
+        max_depth=args.max_depth,
+        pattern_weights=DEFAULT_PATTERN_WEIGHTS + tuple(args.priority),
+        concurrency=args.concurrency,
+        fetch_mode=args.fetch_mode,
+        blocked_resource_types=parse_param_list(args.block_resources),
+        blocked_url_patterns=(() if args.allow_trackers else DEFAULT_BLOCKED_URL_PATTERNS) + tuple(args.block_url),
+        pages_per_session=args.pages_per_session,
+        extractor=args.extractor,
+        llm_token_budget=args.llm_token_budget,
+        llm_chunk_tokens=args.llm_chunk_tokens,
+        llm_concurrency=args.llm_concurrency,
+        llm_requests_per_minute=args.llm_rpm,
+        llm_batch_tokens=args.llm_batch_tokens,
+        strip_query_params=parse_param_list(args.strip_params),
+        respect_canonical=not args.ignore_canonical,
+        visited_index=args.visited_index,
+        bloom_capacity=args.bloom_capacity,
+        check_browser=not args.skip_browser_check,
+        politeness=PolitenessOptions(
+            respect_robots=args.respect_robots,
+            max_host_rate=args.max_host_rate,
+            max_retries=args.max_retries,
+            retry_base_delay=args.retry_delay,
+            retry_max_delay=args.retry_max_delay,
+            breaker_error_rate=args.breaker_error_rate,
+            breaker_cooldown=args.breaker_cooldown
+        ),
+        incremental=IncrementalOptions(
+            enabled=args.incremental,
+            resume=args.resume,
+            use_sitemaps=args.sitemaps,
+            sitemap_since=parse_lastmod(args.sitemap_since)
+        ),
+        cache=CacheOptions(path=args.extraction_cache),
+        output=OutputOptions(
+            compression=args.compression,
+            max_shard_bytes=int(args.shard_size_mb * 1024 * 1024),
+            pdf_workers=args.pdf_workers
+        ),
+        metrics=MetricsOptions(
+            path=args.metrics_file,
+            interval=args.metrics_interval,
+            port=args.metrics_port,
+            profile_pages=args.profile_pages
+        )
     )
+
+def run_worker(options, coordinator_location, worker_id, worker_count, partition_by, namespace):
+    """Run one worker of a distributed crawl. This is the entry point of each worker process."""
+    coordinator = create_coordinator(coordinator_location, worker_count, partition_by, namespace)
+    agent = WebsiteCrawlingAgent(coordinator=coordinator, worker_id=worker_id, **options)
+    try:
+        asyncio.run(agent.crawl())
+    except KeyboardInterrupt:
+        agent.shutdown()
+    finally:
+        coordinator.close()
+
+def run_workers(args, options):
+    """Start this machine's worker processes and wait for them to finish."""
+    worker_count = args.workers * args.node_count
+    first_worker = args.node_index * args.workers
+    domain = urlparse(args.url).netloc
+    output_folder = options['output_folder'] or f"output_{domain}"
+    coordinator_location = args.coordinator or os.path.join(output_folder, COORDINATOR_FILENAME)
+    namespace = f"crawl:{domain}"
+
+    coordinator = create_coordinator(coordinator_location, worker_count, args.partition_by, namespace)
+    if args.resume:
+        # URLs the interrupted workers had taken were never finished
+        coordinator.requeue(range(first_worker, first_worker + args.workers))
+    elif args.node_index == 0:
+        coordinator.reset()
+    coordinator.close()
+
+    # Fresh processes rather than forked copies of this one
+    context = multiprocessing.get_context('spawn')
+    processes = []
+    for worker_id in range(first_worker, first_worker + args.workers):
+        process = context.Process(
+            target=run_worker,
+            args=(options, coordinator_location, worker_id, worker_count, args.partition_by, namespace)
+        )
+        process.start()
+        processes.append(process)
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # The workers got the interrupt too; let them finish their pages
+        print("\nShutting down gracefully...")
+        for process in processes:
+            process.join()
+
+def run_batch(args, options):
+    """Crawl every site of the seed file in this process, sharing one browser."""
+    for name in ('start_url', 'output_folder', 'max_pages', 'concurrency'):
+        del options[name]
+    options['metrics'].port = None
+    batch = BatchCrawler(
+        args.seed_list, output_folder=args.output_folder, max_pages=args.max_pages,
+        concurrency=args.concurrency or DEFAULT_BATCH_CONCURRENCY, seed_concurrency=args.seed_concurrency,
+        max_active_seeds=args.active_seeds, **options
+    )
+    try:
+        asyncio.run(batch.crawl())
+    except KeyboardInterrupt:
+        batch.shutdown()
+
+def main():
+    args = parse_args()
+    options = agent_options(args)
+    if args.seeds is not None:
+        run_batch(args, options)
+        return
+    if args.workers > 1 or args.node_count > 1 or args.coordinator:
+        run_workers(args, options)
+        return
+
+    agent = WebsiteCrawlingAgent(**options)
     
     try:
         asyncio.run(agent.crawl())
@@ -0,0 +1,62 @@
+# Tags whose contents are never part of the page text
+SKIPPED_TAGS = ('head', 'title', 'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'canvas')
+
+# Block-level tags start a new line; some of them get a markdown prefix
+BLOCK_PREFIXES = {
+    'h1': '# ',
+    'h2': '## ',
+    'h3': '### ',
+    'h4': '#### ',
+    'h5': '##### ',
+    'h6': '###### ',
+    'li': '- ',
+    'blockquote': '> ',
+}
+BLOCK_TAGS = set(BLOCK_PREFIXES) | {
+    'p', 'div', 'section', 'article', 'main', 'header', 'footer', 'nav', 'aside', 'pre',
+    'table', 'tr', 'ul', 'ol', 'dl', 'dt', 'dd', 'br', 'hr', 'form', 'figure', 'figcaption', 'body',
+}
+
+
+def html_to_markdown(html):
+    """Convert HTML to compact markdown: one line per block, headings and list items marked."""
+    from bs4 import BeautifulSoup
+    return element_to_markdown(BeautifulSoup(html or '', 'html.parser'))
+
+
+def element_to_markdown(element, skip=None):
+    """Convert a parsed element to compact markdown, leaving out elements for which `skip` returns True."""
+    from bs4 import NavigableString
+    from bs4.element import PreformattedString
+
+    blocks = []
+    current_text = []
+    current_prefix = ['']
+
+    def flush():
+        text = ' '.join(''.join(current_text).split())
+        if text:
+            blocks.append(current_prefix[-1] + text)
+        current_text.clear()
+
+    def walk(node):
+        for child in node.children:
+            # Comments, doctypes and similar are not page text
+            if isinstance(child, PreformattedString):
+                continue
+            if isinstance(child, NavigableString):
+                current_text.append(str(child))
+            elif child.name in SKIPPED_TAGS or (skip is not None and skip(child)):
+                continue
+            elif child.name in BLOCK_TAGS:
+                flush()
+                current_prefix.append(BLOCK_PREFIXES.get(child.name, current_prefix[-1]))
+                walk(child)
+                flush()
+                current_prefix.pop()
+            else:
+                walk(child)
+
+    walk(element)
+    flush()
+    return '\n\n'.join(blocks)
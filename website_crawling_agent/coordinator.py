@@ -0,0 +1,250 @@
+import os
+import sqlite3
+from urllib.parse import urlparse
+
+from .urls import url_key
+from .visited_index import fingerprint
+
+PARTITION_MODES = ('url', 'host')
+
+COORDINATOR_FILENAME = ".coordinator.sqlite"
+
+# How long a worker waits before asking the coordinator for more URLs when
+# it has nothing new, or enough queued already
+DEFAULT_POLL_INTERVAL = 0.1
+
+# URL statuses in the shared frontier
+QUEUED = "queued"
+TAKEN = "taken"
+DONE = "done"
+
+
+def partition_for(url, partitions, partition_by='url'):
+    """The worker that owns `url`.
+
+    By default URLs are spread over the workers by a hash of the whole URL.
+    With `partition_by='host'` every URL of a host goes to the same worker,
+    so its per-host rate limit is enforced in one place. `/a` and `/a/`
+    always have the same owner.
+    """
+    key = urlparse(url).netloc if partition_by == 'host' else url_key(url)
+    return fingerprint(key) % partitions
+
+
+class SqliteCoordinator:
+    """Shared frontier, visited set and page budget for worker processes on one machine.
+
+    Every worker opens the same SQLite file. A URL is queued at most once
+    for the whole crawl, in the partition of the worker that owns it, and
+    stays "taken" from the moment its owner takes it until `done()`; the
+    crawl is over when nothing is queued or taken. URLs are de-duplicated
+    by their `url_key`, in the `seen` table.
+    """
+
+    def __init__(self, path, partitions, partition_by='url'):
+        self.path = path
+        self.partitions = max(1, partitions)
+        self.partition_by = partition_by
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Autocommit; take() opens its own write transaction. Other workers
+        # may hold the write lock for a moment, so wait for it.
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            "url TEXT PRIMARY KEY, partition INTEGER NOT NULL, depth INTEGER NOT NULL, status TEXT NOT NULL)"
+        )
+        # Serves both take() and finished()
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS frontier_status ON frontier (status, partition, depth)"
+        )
+        self.connection.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.connection.execute("INSERT OR IGNORE INTO counters (name, value) VALUES ('claimed', 0)")
+
+    def add(self, url, depth=0):
+        """Queue `url` for its owner. Returns False if any worker queued it before."""
+        cursor = self.connection.execute("INSERT OR IGNORE INTO seen (key) VALUES (?)", (url_key(url),))
+        if cursor.rowcount != 1:
+            return False
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO frontier (url, partition, depth, status) VALUES (?, ?, ?, ?)",
+            (url, partition_for(url, self.partitions, self.partition_by), depth, QUEUED)
+        )
+        return cursor.rowcount == 1
+
+    def take(self, worker_id, limit):
+        """Take up to `limit` of the worker's queued URLs, shallowest first. Returns [(url, depth)]."""
+        if limit <= 0:
+            return []
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.connection.execute(
+                "SELECT url, depth FROM frontier WHERE status = ? AND partition = ? ORDER BY depth LIMIT ?",
+                (QUEUED, worker_id, limit)
+            ).fetchall()
+            self.connection.executemany(
+                "UPDATE frontier SET status = ? WHERE url = ?", [(TAKEN, url) for url, _ in rows]
+            )
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        return rows
+
+    def done(self, url):
+        """Mark a taken URL as finished, after the links found on it were added."""
+        self.connection.execute("UPDATE frontier SET status = ? WHERE url = ?", (DONE, url))
+
+    def claim(self, max_pages=None):
+        """Count one page towards the shared page budget. Returns False once it is spent."""
+        if not max_pages:
+            self.connection.execute("UPDATE counters SET value = value + 1 WHERE name = 'claimed'")
+            return True
+        cursor = self.connection.execute(
+            "UPDATE counters SET value = value + 1 WHERE name = 'claimed' AND value < ?", (max_pages,)
+        )
+        return cursor.rowcount == 1
+
+    def claimed(self):
+        return self.connection.execute("SELECT value FROM counters WHERE name = 'claimed'").fetchone()[0]
+
+    def finished(self, max_pages=None):
+        """True once no worker has URLs queued or in progress, or the page budget is spent."""
+        if max_pages and self.claimed() >= max_pages:
+            return True
+        row = self.connection.execute(
+            "SELECT 1 FROM frontier WHERE status IN (?, ?) LIMIT 1", (QUEUED, TAKEN)
+        ).fetchone()
+        return row is None
+
+    def requeue(self, worker_ids):
+        """Queue the URLs these workers had taken again, after they were interrupted."""
+        worker_ids = list(worker_ids)
+        placeholders = ", ".join("?" for _ in worker_ids)
+        self.connection.execute(
+            f"UPDATE frontier SET status = ? WHERE status = ? AND partition IN ({placeholders})",
+            (QUEUED, TAKEN, *worker_ids)
+        )
+
+    def reset(self):
+        """Forget any previous crawl."""
+        self.connection.execute("DELETE FROM frontier")
+        self.connection.execute("DELETE FROM seen")
+        self.connection.execute("UPDATE counters SET value = 0")
+
+    def close(self):
+        self.connection.close()
+
+
+# Moves up to ARGV[1] entries ("depth url") from the queue list KEYS[1] to the
+# taken hash KEYS[2] in one step, so a worker that dies half way can't lose a URL
+TAKE_SCRIPT = """
+local entries = {}
+for i = 1, tonumber(ARGV[1]) do
+    local entry = redis.call('LPOP', KEYS[1])
+    if not entry then
+        break
+    end
+    local space = string.find(entry, ' ', 1, true)
+    redis.call('HSET', KEYS[2], string.sub(entry, space + 1), string.sub(entry, 1, space - 1))
+    entries[#entries + 1] = entry
+end
+return entries
+"""
+
+
+class RedisCoordinator:
+    """Shared frontier, visited set and page budget for workers on several machines.
+
+    `client` is a redis-py client created with `decode_responses=True`.
+    Only basic set, list, hash and counter commands are used, plus one
+    small Lua script, so any Redis-compatible server with EVAL works. The
+    visited set keeps a 64-bit fingerprint per URL, each worker has its
+    own queue list, and a counter of queued and taken URLs tells when the
+    crawl is over. Keys start with `namespace`, so several crawls can
+    share a server.
+    """
+
+    def __init__(self, client, partitions, partition_by='url', namespace='crawl'):
+        self.client = client
+        self.partitions = max(1, partitions)
+        self.partition_by = partition_by
+        self.namespace = namespace
+        self.take_script = client.register_script(TAKE_SCRIPT)
+
+    def key(self, *parts):
+        return ":".join((self.namespace,) + tuple(str(part) for part in parts))
+
+    def add(self, url, depth=0):
+        """Queue `url` for its owner. Returns False if any worker queued it before."""
+        if not self.client.sadd(self.key('seen'), format(fingerprint(url_key(url)), '016x')):
+            return False
+        # Counted before it is queued, so the crawl never looks finished while it is in a list
+        self.client.incr(self.key('pending'))
+        partition = partition_for(url, self.partitions, self.partition_by)
+        self.client.rpush(self.key('queue', partition), f"{depth} {url}")
+        return True
+
+    def take(self, worker_id, limit):
+        """Take up to `limit` of the worker's queued URLs, in the order they were queued. Returns [(url, depth)]."""
+        if limit <= 0:
+            return []
+        # Popped and marked as taken atomically, or a crash in between would drop the URL
+        taken = self.take_script(keys=[self.key('queue', worker_id), self.key('taken', worker_id)], args=[limit])
+        entries = []
+        for entry in taken:
+            depth, url = entry.split(" ", 1)
+            entries.append((url, int(depth)))
+        return entries
+
+    def done(self, url):
+        """Mark a taken URL as finished, after the links found on it were added."""
+        partition = partition_for(url, self.partitions, self.partition_by)
+        if self.client.hdel(self.key('taken', partition), url):
+            self.client.decr(self.key('pending'))
+
+    def claim(self, max_pages=None):
+        """Count one page towards the shared page budget. Returns False once it is spent."""
+        claimed = self.client.incr(self.key('claimed'))
+        return not max_pages or claimed <= max_pages
+
+    def claimed(self):
+        return int(self.client.get(self.key('claimed')) or 0)
+
+    def finished(self, max_pages=None):
+        """True once no worker has URLs queued or in progress, or the page budget is spent."""
+        if max_pages and self.claimed() >= max_pages:
+            return True
+        return int(self.client.get(self.key('pending')) or 0) <= 0
+
+    def requeue(self, worker_ids):
+        """Queue the URLs these workers had taken again, after they were interrupted."""
+        for worker_id in worker_ids:
+            for url, depth in self.client.hgetall(self.key('taken', worker_id)).items():
+                self.client.rpush(self.key('queue', worker_id), f"{depth} {url}")
+                self.client.hdel(self.key('taken', worker_id), url)
+
+    def reset(self):
+        """Forget any previous crawl."""
+        keys = [self.key('seen'), self.key('pending'), self.key('claimed')]
+        for partition in range(self.partitions):
+            keys += [self.key('queue', partition), self.key('taken', partition)]
+        self.client.delete(*keys)
+
+    def close(self):
+        self.client.close()
+
+
+def create_coordinator(location, partitions, partition_by='url', namespace='crawl'):
+    """A coordinator for a redis:// (or rediss://, unix://) URL, or for a SQLite file path."""
+    if location.startswith(('redis://', 'rediss://', 'unix://')):
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("A Redis coordinator needs the redis package: pip install redis")
+        client = redis.Redis.from_url(location, decode_responses=True)
+        return RedisCoordinator(client, partitions, partition_by, namespace)
+    return SqliteCoordinator(location, partitions, partition_by)
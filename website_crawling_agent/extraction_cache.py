@@ -0,0 +1,150 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+CACHE_FILENAME = ".extraction_cache.sqlite"
+
+DEFAULT_MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+# Number of least recently used entries removed per eviction query
+EVICTION_BATCH_SIZE = 100
+
+# Write new entries and uses once this many have piled up, or once this
+# many seconds have passed since the last write, whichever comes first
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+
+def make_cache_key(content, instruction, model):
+    """Cache key for an extraction: the same content, instruction and model give the same result."""
+    digest = hashlib.sha256()
+    for part in (content, instruction, model):
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Persistent, size-bounded LRU cache of LLM extraction results.
+
+    Entries are keyed by `make_cache_key`, so identical content served
+    under different URLs (print views, query-string variants) or crawled
+    again in a later run is only sent to the LLM once. When the stored
+    results grow past `max_bytes`, the least recently used are evicted.
+
+    Like the crawl state, new entries and last-used times are kept in
+    memory and written to SQLite in batches, so a lookup on the event loop
+    doesn't wait for a commit. Eviction goes by the size of everything in
+    the file, which other crawls sharing it may have added to.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_CACHE_BYTES, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.hits = 0
+        self.misses = 0
+        self.last_clock = 0
+        # Entries not written yet, key -> (value, last_used), and last uses of written entries
+        self.pending = {}
+        self.touched = {}
+        self.last_flush = time.monotonic()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS extractions_last_used ON extractions (last_used)")
+        self.connection.commit()
+        self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+
+    def clock(self):
+        """Current time, nudged forward so no two uses share a timestamp and LRU order is exact."""
+        self.last_clock = max(time.time(), self.last_clock + 1e-6)
+        return self.last_clock
+
+    def get(self, key):
+        if key in self.pending:
+            self.hits += 1
+            value = self.pending[key][0]
+            self.pending[key] = (value, self.clock())
+            return value
+
+        row = self.connection.execute("SELECT value FROM extractions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.touched[key] = self.clock()
+        self.flush_if_due()
+        return row[0]
+
+    def put(self, key, value):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        self.pending[key] = (value, self.clock())
+        self.touched.pop(key, None)
+        self.flush_if_due()
+
+    def flush_if_due(self):
+        if (len(self.pending) + len(self.touched) >= self.batch_size
+                or time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write the pending entries and last uses, evict what no longer fits and commit."""
+        if self.pending or self.touched:
+            self.connection.executemany(
+                "UPDATE extractions SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self.touched.items()]
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO extractions (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                [(key, value, len(value.encode("utf-8")), last_used)
+                 for key, (value, last_used) in self.pending.items()]
+            )
+            self.evict()
+            self.connection.commit()
+            self.pending = {}
+            self.touched = {}
+        self.last_flush = time.monotonic()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        # Read afresh: other crawls sharing the file may have added entries since
+        self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+        while self.total_bytes > self.max_bytes:
+            rows = self.connection.execute(
+                "SELECT key, size FROM extractions ORDER BY last_used LIMIT ?", (EVICTION_BATCH_SIZE,)
+            ).fetchall()
+            if not rows:
+                self.total_bytes = 0
+                return
+
+            evicted_keys = []
+            for key, size in rows:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                evicted_keys.append((key,))
+                self.total_bytes -= size
+            self.connection.executemany("DELETE FROM extractions WHERE key = ?", evicted_keys)
+
+    def __len__(self):
+        self.flush()
+        return self.connection.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self), "bytes": self.total_bytes}
+
+    def close(self):
+        self.flush()
+        self.connection.close()
@@ -0,0 +1,208 @@
+import asyncio
+import re
+import time
+from collections import deque
+
+from .politeness import TokenBucket
+
+DEFAULT_LLM_CONCURRENCY = 4
+
+# Extra instruction used when several pages are packed into one request
+BATCH_INSTRUCTION = (
+    " The input contains several separate pages, each wrapped in <page id=\"N\"> tags."
+    " Extract each page separately and add the tag \"page-N\" to every block, where N is"
+    " the id of the page the block came from."
+)
+
+PAGE_TAG_PATTERN = re.compile(r"^page-(\d+)$")
+
+
+class ExtractionJob:
+    def __init__(self, url, chunks, tokens, future, strategy_factory=None):
+        self.url = url
+        self.chunks = chunks
+        self.tokens = tokens
+        self.future = future
+        self.strategy_factory = strategy_factory
+
+
+def has_error(blocks):
+    return any(isinstance(block, dict) and block.get('error') for block in blocks)
+
+
+def pack_pages(jobs):
+    """One section holding every page of a batch, each wrapped in a numbered <page> tag."""
+    pages = []
+    for page_id, job in enumerate(jobs):
+        pages.append(f'<page id="{page_id}" url="{job.url}">\n{job.chunks[0]}\n</page>')
+    return "\n\n".join(pages)
+
+
+def split_packed_blocks(blocks, page_count):
+    """Sort the blocks of a packed request back to their pages using the "page-N" tags."""
+    blocks_by_page = [[] for _ in range(page_count)]
+    for block in blocks:
+        if not isinstance(block, dict):
+            continue
+        tags = block.get('tags') or []
+        page_ids = []
+        for tag in tags:
+            match = PAGE_TAG_PATTERN.match(str(tag))
+            if match and int(match.group(1)) < page_count:
+                page_ids.append(int(match.group(1)))
+
+        if len(page_ids) != 1:
+            continue
+        block = dict(block)
+        block['tags'] = [tag for tag in tags if not PAGE_TAG_PATTERN.match(str(tag))]
+        blocks_by_page[page_ids[0]].append(block)
+    return blocks_by_page
+
+
+class ExtractionStage:
+    """LLM extraction as its own pipeline stage.
+
+    Pages wait in a queue and are extracted by `concurrency` consumers,
+    independently of how many pages are being fetched. An optional
+    requests-per-minute limit keeps us under the provider's rate limits.
+    With a `batch_tokens` budget, small single-chunk pages that are waiting
+    together are packed into one LLM request; any page the LLM fails to
+    tag is extracted again on its own.
+
+    `strategy_factory(instruction)` must return an object with the
+    `run(url, sections)` method of crawl4ai's LLMExtractionStrategy. Each
+    page can bring its own factory, so crawls with different LLM settings
+    can share one stage and its limits.
+    """
+
+    def __init__(self, strategy_factory, instruction, concurrency=DEFAULT_LLM_CONCURRENCY,
+                 requests_per_minute=None, batch_tokens=0):
+        self.strategy_factory = strategy_factory
+        self.instruction = instruction
+        self.concurrency = max(1, concurrency)
+        self.requests_per_minute = requests_per_minute
+        self.batch_tokens = batch_tokens
+        self.stats = {'requests': 0, 'pages': 0, 'batched_pages': 0}
+        self.jobs = None
+        self.condition = None
+        self.consumers = []
+        self.rate_limiter = None
+
+    def start(self):
+        self.jobs = deque()
+        self.condition = asyncio.Condition()
+        if self.requests_per_minute:
+            self.rate_limiter = TokenBucket(self.requests_per_minute / 60)
+        self.consumers = []
+        for _ in range(self.concurrency):
+            self.consumers.append(asyncio.ensure_future(self.consume()))
+
+    async def stop(self):
+        for consumer in self.consumers:
+            consumer.cancel()
+        await asyncio.gather(*self.consumers, return_exceptions=True)
+        self.consumers = []
+
+        # Anyone still waiting on a job would otherwise wait forever
+        while self.jobs:
+            job = self.jobs.popleft()
+            if not job.future.done():
+                job.future.cancel()
+
+    async def extract(self, url, chunks, tokens, strategy_factory=None):
+        """Queue a page and wait for its extracted blocks."""
+        future = asyncio.get_event_loop().create_future()
+        async with self.condition:
+            self.jobs.append(ExtractionJob(url, chunks, tokens, future, strategy_factory))
+            self.condition.notify()
+        return await future
+
+    def create_strategy(self, job, instruction):
+        return (job.strategy_factory or self.strategy_factory)(instruction)
+
+    def can_pack(self, job, first=None):
+        """True if `job` can go in a packed request, with `first` if given, which needs the same strategy."""
+        if first is not None and job.strategy_factory != first.strategy_factory:
+            return False
+        return len(job.chunks) == 1 and job.tokens <= self.batch_tokens
+
+    def take_batch(self):
+        """Take the next job, plus as many small waiting jobs as fit in the batch budget."""
+        batch = [self.jobs.popleft()]
+        if not self.batch_tokens or not self.can_pack(batch[0]):
+            return batch
+
+        batch_tokens = batch[0].tokens
+        while self.jobs and self.can_pack(self.jobs[0], batch[0]) and batch_tokens + self.jobs[0].tokens <= self.batch_tokens:
+            job = self.jobs.popleft()
+            batch.append(job)
+            batch_tokens += job.tokens
+        return batch
+
+    async def wait_for_rate_limit(self):
+        if self.rate_limiter is None:
+            return
+        while True:
+            now = time.monotonic()
+            wait = self.rate_limiter.wait_time(now)
+            if wait <= 0:
+                self.rate_limiter.consume(now)
+                return
+            await asyncio.sleep(wait)
+
+    async def consume(self):
+        while True:
+            async with self.condition:
+                await self.condition.wait_for(lambda: len(self.jobs) > 0)
+                batch = self.take_batch()
+
+            # Skip jobs whose page has given up waiting
+            batch = [job for job in batch if not job.future.done()]
+            if not batch:
+                continue
+
+            try:
+                if len(batch) == 1:
+                    blocks = await self.run_single(batch[0])
+                    if not batch[0].future.done():
+                        batch[0].future.set_result(blocks)
+                else:
+                    await self.run_packed(batch)
+            except Exception as e:
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+
+    async def run_single(self, job):
+        await self.wait_for_rate_limit()
+        self.stats['requests'] += 1
+        self.stats['pages'] += 1
+        strategy = self.create_strategy(job, self.instruction)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, strategy.run, job.url, job.chunks)
+
+    async def run_packed(self, batch):
+        await self.wait_for_rate_limit()
+        self.stats['requests'] += 1
+        self.stats['pages'] += len(batch)
+        self.stats['batched_pages'] += len(batch)
+        strategy = self.create_strategy(batch[0], self.instruction + BATCH_INSTRUCTION)
+        loop = asyncio.get_event_loop()
+        blocks = await loop.run_in_executor(None, strategy.run, batch[0].url, [pack_pages(batch)])
+
+        if has_error(blocks):
+            for job in batch:
+                if not job.future.done():
+                    job.future.set_result(blocks)
+            return
+
+        blocks_by_page = split_packed_blocks(blocks, len(batch))
+        for job, page_blocks in zip(batch, blocks_by_page):
+            if job.future.done():
+                continue
+            if not page_blocks:
+                # The LLM didn't attribute anything to this page; ask again for it alone
+                self.stats['batched_pages'] -= 1
+                self.stats['pages'] -= 1
+                page_blocks = await self.run_single(job)
+            job.future.set_result(page_blocks)
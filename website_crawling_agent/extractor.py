@@ -0,0 +1,189 @@
+import re
+
+from .content import SKIPPED_TAGS, element_to_markdown
+
+EXTRACTORS = ('llm', 'heuristic', 'auto')
+
+# In auto mode, pages the heuristic is less sure about than this go to the LLM
+DEFAULT_CONFIDENCE_THRESHOLD = 0.6
+
+# Tags that are page chrome wherever they appear
+BOILERPLATE_TAGS = ('nav', 'footer', 'aside', 'form', 'button', 'select')
+
+# id/class names that usually mark page chrome
+BOILERPLATE_NAMES = re.compile(
+    r'nav|menu|footer|sidebar|breadcrumb|cookie|banner|share|social|comment|related|'
+    r'advert|promo|subscribe|newsletter|popup|modal|masthead|pagination',
+    re.IGNORECASE
+)
+
+# Elements whose text counts towards the score of the containers around them
+PARAGRAPH_TAGS = ('p', 'pre', 'blockquote', 'td', 'li', 'h2', 'h3', 'h4')
+
+# Elements that can be chosen as the main content container
+CANDIDATE_TAGS = ('article', 'main', 'section', 'div', 'td', 'body')
+
+
+class ElementStats:
+    def __init__(self):
+        # Lengths over all text, used to spot boilerplate
+        self.text_length = 0
+        self.link_length = 0
+        # Lengths over text that is not inside boilerplate
+        self.content_length = 0
+        self.content_link_length = 0
+        self.boilerplate = False
+        self.score = 0.0
+
+    def link_density(self):
+        if not self.text_length:
+            return 0.0
+        return self.link_length / self.text_length
+
+    def content_link_density(self):
+        if not self.content_length:
+            return 0.0
+        return self.content_link_length / self.content_length
+
+
+def element_names(element):
+    names = element.get('class') or []
+    if element.get('id'):
+        names = names + [element.get('id')]
+    return ' '.join(names)
+
+
+def is_boilerplate(element, stats):
+    """Decide from its tag, names and link density whether an element is page chrome."""
+    if element.name in BOILERPLATE_TAGS:
+        return True
+    if element.name in ('body', 'main', 'article'):
+        return False
+
+    if BOILERPLATE_NAMES.search(element_names(element)):
+        # A wrapper around the whole article may have a name like
+        # "content-with-sidebar"; only drop short or link-heavy elements
+        if stats.text_length < 300 or stats.link_density() > 0.25:
+            return True
+
+    # Lists of links (menus, tag clouds, "read more" blocks)
+    return stats.text_length > 0 and stats.link_density() > 0.6
+
+
+def measure(soup):
+    """Collect text, link and boilerplate statistics for every element in one bottom-up pass."""
+    from bs4 import NavigableString
+    from bs4.element import PreformattedString
+
+    stats_by_id = {}
+    # find_all returns parents before children, so reversed gives children first
+    for element in reversed(soup.find_all(True)):
+        stats = ElementStats()
+        if element.name not in SKIPPED_TAGS:
+            for child in element.children:
+                if isinstance(child, PreformattedString):
+                    continue
+                if isinstance(child, NavigableString):
+                    length = len(child.strip())
+                    stats.text_length += length
+                    stats.content_length += length
+                    continue
+                child_stats = stats_by_id[id(child)]
+                stats.text_length += child_stats.text_length
+                stats.link_length += child_stats.link_length
+                if not child_stats.boilerplate:
+                    stats.content_length += child_stats.content_length
+                    stats.content_link_length += child_stats.content_link_length
+
+            if element.name == 'a':
+                stats.link_length = stats.text_length
+                stats.content_link_length = stats.content_length
+            stats.boilerplate = is_boilerplate(element, stats)
+        stats_by_id[id(element)] = stats
+    return stats_by_id
+
+
+def inside_boilerplate(element, stats_by_id):
+    for parent in element.parents:
+        parent_stats = stats_by_id.get(id(parent))
+        if parent_stats is not None and parent_stats.boilerplate:
+            return True
+    return False
+
+
+def score_candidates(soup, stats_by_id):
+    """Readability-style scoring: every paragraph adds to its parent and, at half weight, its grandparent."""
+    candidates = []
+    for paragraph in soup.find_all(PARAGRAPH_TAGS):
+        paragraph_stats = stats_by_id[id(paragraph)]
+        if paragraph_stats.boilerplate or paragraph_stats.content_length < 25:
+            continue
+        if inside_boilerplate(paragraph, stats_by_id):
+            continue
+
+        text = paragraph.get_text()
+        paragraph_score = 1 + text.count(',') + min(3, paragraph_stats.content_length / 100)
+
+        weight = 1.0
+        for ancestor in list(paragraph.parents)[:2]:
+            if ancestor.name not in CANDIDATE_TAGS:
+                continue
+            ancestor_stats = stats_by_id[id(ancestor)]
+            if ancestor_stats.score == 0:
+                candidates.append(ancestor)
+            ancestor_stats.score += paragraph_score * weight
+            weight = 0.5
+
+    best_element = None
+    best_score = 0
+    for candidate in candidates:
+        candidate_stats = stats_by_id[id(candidate)]
+        score = candidate_stats.score * (1 - candidate_stats.content_link_density())
+        if candidate.name in ('article', 'main'):
+            score *= 1.5
+        if score > best_score:
+            best_element = candidate
+            best_score = score
+    return best_element
+
+
+def confidence_for(element, stats, page_stats):
+    """How sure we are that `element` is the main content, from 0 to 1."""
+    length_score = min(1.0, stats.content_length / 1000)
+    link_score = 1 - min(1.0, stats.content_link_density() * 3)
+    coverage = stats.content_length / page_stats.content_length if page_stats.content_length else 0
+    coverage_score = min(1.0, coverage * 1.5)
+
+    confidence = 0.5 * length_score + 0.3 * link_score + 0.2 * coverage_score
+    if element.name in ('article', 'main'):
+        confidence += 0.1
+    if stats.content_length < 200:
+        confidence *= 0.5
+    return min(1.0, confidence)
+
+
+def extract_main_content(html):
+    """Find the main content of a page without an LLM.
+
+    Navigation, footers, sidebars and link-heavy blocks are dropped, and
+    the container holding most of the remaining paragraph text is
+    returned as markdown along with a confidence score between 0 and 1.
+    CPU-bound; run it in an executor.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html or '', 'html.parser')
+    body = soup.body or soup
+    stats_by_id = measure(soup)
+
+    best_element = score_candidates(soup, stats_by_id)
+    if best_element is None:
+        return '', 0.0
+
+    def skip(element):
+        element_stats = stats_by_id.get(id(element))
+        return element_stats is not None and element_stats.boilerplate
+
+    text = element_to_markdown(best_element, skip=skip)
+    page_stats = stats_by_id.get(id(body)) or stats_by_id[id(best_element)]
+    return text, confidence_for(best_element, stats_by_id[id(best_element)], page_stats)
@@ -0,0 +1,203 @@
+import asyncio
+import re
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+from .content import html_to_markdown
+from .lazy import lazy_import
+
+requests = lazy_import('requests')
+
+FETCH_MODES = ('browser', 'http', 'auto')
+
+HTTP_TIMEOUT = 20
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/116.0.0.0 Safari/537.36"
+)
+
+# A server-rendered page with less visible text than this is probably
+# filled in by JavaScript
+MIN_VISIBLE_TEXT_LENGTH = 200
+
+# Markers of single-page apps that render everything in the browser
+SPA_MARKERS = (
+    re.compile(r'<div[^>]+id=["\'](root|app|__next|__nuxt|svelte)["\'][^>]*>\s*</div>', re.IGNORECASE),
+    re.compile(r'<[a-z-]+[^>]*\bng-app\b', re.IGNORECASE),
+    re.compile(r'<noscript[^>]*>[^<]*(enable|requires?)\s+javascript', re.IGNORECASE),
+)
+
+# Status codes that are final answers; anything else may be bot protection
+# or a flaky edge and is worth another try in a real browser
+FINAL_STATUS_CODES = (404, 410, 429, 503)
+
+# After this many escalations with (almost) no plain HTTP successes, pages
+# on the host go straight to the browser
+LEARN_MIN_ESCALATIONS = 3
+LEARN_ESCALATION_RATIO = 4
+
+
+class HttpPageResult:
+    """A page fetched over plain HTTP, with the attributes of a crawl4ai result that the agent uses."""
+
+    def __init__(self, url, status_code, html='', response_headers=None, error_message=None):
+        self.url = url
+        self.status_code = status_code
+        self.html = html
+        self.response_headers = response_headers or {}
+        self.error_message = error_message
+        self.success = error_message is None and status_code is not None and status_code < 400
+        self.markdown = html_to_markdown(html) if self.success else ''
+
+
+def create_http_session(pool_size):
+    """A requests session with a keep-alive connection pool large enough for every worker."""
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def http_fetch(session, url):
+    """Fetch a page with a plain GET. Blocking; run it in an executor."""
+    try:
+        response = session.get(url, timeout=HTTP_TIMEOUT)
+    except requests.RequestException as e:
+        return HttpPageResult(url, None, error_message=str(e))
+
+    content_type = response.headers.get('Content-Type', '')
+    if response.ok and 'html' not in content_type:
+        return HttpPageResult(url, response.status_code, response_headers=dict(response.headers),
+                              error_message=f"Not an HTML page: {content_type}")
+    return HttpPageResult(url, response.status_code, response.text, dict(response.headers))
+
+
+def needs_browser(result):
+    """Why a plain HTTP result can't be used as it is, or None if it can."""
+    if result.status_code in FINAL_STATUS_CODES:
+        return None
+    if not result.success:
+        return result.error_message or f"HTTP {result.status_code}"
+    for marker in SPA_MARKERS:
+        if marker.search(result.html):
+            return "single-page app markers"
+    if len(''.join(result.markdown.split())) < MIN_VISIBLE_TEXT_LENGTH:
+        return "almost no text without JavaScript"
+    return None
+
+
+class TieredFetcher:
+    """Fetches pages over plain HTTP first and only uses the browser when needed.
+
+    In `auto` mode every page is first fetched with a pooled keep-alive
+    HTTP session. If the result looks like it needs JavaScript (very
+    little text, single-page app markers, or an error the browser might
+    get past), the page is fetched again with the browser. Hosts where
+    this keeps happening are remembered and sent straight to the browser.
+    `browser` and `http` modes use only one tier. With a `session_pool`,
+    browser fetches reuse the pool's browser pages.
+
+    With a `slot_scheduler`, such as the FairScheduler of a batch crawl,
+    every request also holds one of its slots, keyed by host. The slot is
+    only taken once the host scheduler lets the request go, so a host
+    that is paused or slowed down doesn't keep a slot while it waits.
+    """
+
+    def __init__(self, host_scheduler, session, mode='browser', session_pool=None, slot_scheduler=None):
+        if mode not in FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode: {mode}")
+        self.host_scheduler = host_scheduler
+        self.session = session
+        self.mode = mode
+        self.session_pool = session_pool
+        self.slot_scheduler = slot_scheduler
+        self.tier_counts = {'http': 0, 'browser': 0, 'escalated': 0}
+        self.render_stats = {'pages': 0, 'seconds': 0.0, 'max_seconds': 0.0}
+        self.host_stats = {}
+
+    def get_host_stats(self, url):
+        host = urlparse(url).netloc
+        if host not in self.host_stats:
+            self.host_stats[host] = {'http': 0, 'escalated': 0}
+        return self.host_stats[host]
+
+    def host_prefers_browser(self, url):
+        stats = self.get_host_stats(url)
+        return (stats['escalated'] >= LEARN_MIN_ESCALATIONS
+                and stats['escalated'] >= LEARN_ESCALATION_RATIO * stats['http'])
+
+    async def fetch(self, crawler, url, **arun_kwargs):
+        if self.mode == 'browser' or (self.mode == 'auto' and self.host_prefers_browser(url)):
+            self.tier_counts['browser'] += 1
+            return await self.browser_fetch(crawler, url, **arun_kwargs)
+
+        result = await self.plain_fetch(url)
+        if self.mode == 'http':
+            self.tier_counts['http'] += 1
+            return result
+
+        reason = needs_browser(result)
+        stats = self.get_host_stats(url)
+        if reason is None:
+            stats['http'] += 1
+            self.tier_counts['http'] += 1
+            return result
+
+        stats['escalated'] += 1
+        self.tier_counts['escalated'] += 1
+        self.tier_counts['browser'] += 1
+        print(f"\nUsing the browser for {url}: {reason}")
+        return await self.browser_fetch(crawler, url, **arun_kwargs)
+
+    @asynccontextmanager
+    async def request_slot(self, url):
+        """Hold a slot of the slot scheduler, if there is one, for a request to `url`."""
+        if self.slot_scheduler is None:
+            yield
+            return
+        async with self.slot_scheduler.slot(urlparse(url).netloc):
+            yield
+
+    async def run_request(self, url, func, *args):
+        """Run the blocking request `func(*args)` to `url` in the executor, once the host scheduler
+        lets it go, holding a slot of the slot scheduler meanwhile."""
+        await self.host_scheduler.acquire(url)
+        loop = asyncio.get_event_loop()
+        async with self.request_slot(url):
+            return await loop.run_in_executor(None, func, *args)
+
+    async def plain_fetch(self, url):
+        result = await self.run_request(url, http_fetch, self.session, url)
+        self.host_scheduler.record_response(url, result.status_code, result.response_headers)
+        return result
+
+    async def browser_fetch(self, crawler, url, **arun_kwargs):
+        await self.host_scheduler.acquire(url)
+        async with self.request_slot(url):
+            browser_session = None
+            if self.session_pool is not None and self.session_pool.enabled:
+                browser_session = await self.session_pool.acquire()
+                arun_kwargs['session_id'] = browser_session.id
+
+            started = time.monotonic()
+            broken = True
+            try:
+                result = await crawler.arun(url=url, **arun_kwargs)
+                broken = not result.success
+            finally:
+                self.record_render_time(time.monotonic() - started)
+                if browser_session is not None:
+                    await self.session_pool.release(crawler, browser_session, broken=broken)
+
+        self.host_scheduler.record_response(url, result.status_code, getattr(result, 'response_headers', None))
+        return result
+
+    def record_render_time(self, seconds):
+        self.render_stats['pages'] += 1
+        self.render_stats['seconds'] += seconds
+        self.render_stats['max_seconds'] = max(self.render_stats['max_seconds'], seconds)
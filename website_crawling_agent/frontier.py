@@ -0,0 +1,181 @@
+import asyncio
+import heapq
+import itertools
+import math
+import re
+import time
+
+# URL patterns that are worth less of the page budget by default:
+# paginated listings, and tag, category, author and date archives
+DEFAULT_PATTERN_WEIGHTS = (
+    (r'[?&](page|p|paged|offset|start)=\d+', -2.0),
+    (r'/page/\d+', -2.0),
+    (r'/(tag|tags|category|categories|author|authors|archive|archives)/', -1.5),
+    (r'/\d{4}/\d{2}(/\d{2})?/?$', -1.0),
+)
+
+
+class UrlScorer:
+    """Scores URLs for a best-first crawl; higher scores are crawled first.
+
+    Every level of link depth costs `depth_weight`, every page linking to
+    a URL adds `inlink_weight` on a log scale, and each pattern in
+    `pattern_weights` that matches the URL adds its weight.
+    """
+
+    def __init__(self, pattern_weights=DEFAULT_PATTERN_WEIGHTS, depth_weight=1.0, inlink_weight=0.5):
+        self.pattern_weights = [(re.compile(pattern), weight) for pattern, weight in pattern_weights]
+        self.depth_weight = depth_weight
+        self.inlink_weight = inlink_weight
+
+    def __call__(self, url, depth, inlinks):
+        score = -self.depth_weight * depth + self.inlink_weight * math.log1p(inlinks)
+        for pattern, weight in self.pattern_weights:
+            if pattern.search(url):
+                score += weight
+        return score
+
+
+def parse_pattern_weight(value):
+    """Parse a "REGEX=WEIGHT" command-line value."""
+    pattern, separator, weight = value.rpartition('=')
+    if not separator or not pattern:
+        raise ValueError(f"Expected REGEX=WEIGHT, got {value}")
+    try:
+        re.compile(pattern)
+    except re.error as e:
+        raise ValueError(f"Invalid regular expression {pattern}: {e}")
+    return pattern, float(weight)
+
+
+class UrlFilter:
+    """Include and exclude regular expressions, checked before a URL is queued."""
+
+    def __init__(self, include=(), exclude=()):
+        self.include = [re.compile(pattern) for pattern in include]
+        self.exclude = [re.compile(pattern) for pattern in exclude]
+
+    def allows(self, url):
+        if self.include and not any(pattern.search(url) for pattern in self.include):
+            return False
+        return not any(pattern.search(url) for pattern in self.exclude)
+
+
+class Frontier:
+    """Queue of URLs waiting to be crawled.
+
+    URLs are de-duplicated on the way in, so each URL is queued at most once
+    per crawl. Workers take URLs with `get()` and must call `task_done()`
+    once they have finished with each one, so that `join()` can tell when
+    the crawl has run out of work. `seen_urls` can be any set-like object
+    with `add` and `in`, such as a compact visited index.
+
+    Without a `scorer` URLs come out first in, first out. With one, the
+    URL with the highest `scorer(url, depth, inlinks)` comes out first,
+    where `inlinks` counts how many times the URL was added while it was
+    waiting; a queued URL moves up as more pages link to it.
+
+    `retry()` queues a URL again, even one that was queued before, once a
+    delay has passed. Until then it counts as queued for `join()`, but
+    workers are handed other URLs.
+
+    With a `key` function, URLs with the same `key(url)` count as the same
+    URL, and the first spelling queued is the one handed out.
+    """
+
+    def __init__(self, seen_urls=None, scorer=None, key=None):
+        self.seen_urls = seen_urls if seen_urls is not None else set()
+        self.scorer = scorer
+        self.key = key
+        # One token per queued URL; it does the waiting and the join() bookkeeping
+        self.queue = asyncio.Queue()
+        self.heap = []
+        self.sequence = itertools.count()
+        # Keys of the URLs still waiting, with their current heap entry: [-score, sequence, url, depth, inlinks]
+        self.waiting = {}
+        # URLs to queue again later: [due, sequence, url, depth]
+        self.delayed = []
+        # Set whenever a URL is queued, to wake a worker waiting for a delayed one
+        self.added = asyncio.Event()
+
+    def score(self, url, depth, inlinks):
+        if self.scorer is None:
+            return 0
+        return self.scorer(url, depth, inlinks)
+
+    def url_key(self, url):
+        if self.key is None:
+            return url
+        return self.key(url)
+
+    def push(self, url, depth, inlinks):
+        entry = [-self.score(url, depth, inlinks), next(self.sequence), url, depth, inlinks]
+        self.waiting[self.url_key(url)] = entry
+        heapq.heappush(self.heap, entry)
+
+    def add(self, url, depth=0):
+        """Queue `url` unless it has been queued before. Returns True if it was queued."""
+        key = self.url_key(url)
+        if key in self.seen_urls:
+            entry = self.waiting.get(key)
+            if entry is not None and self.scorer is not None:
+                # Another page links here; re-queue with the higher score, the old entry goes stale
+                self.push(entry[2], min(entry[3], depth), entry[4] + 1)
+            return False
+        self.seen_urls.add(key)
+        self.push(url, depth, 1)
+        self.queue.put_nowait(None)
+        self.added.set()
+        return True
+
+    def retry(self, url, depth=0, delay=0):
+        """Queue `url` again in `delay` seconds, whether or not it was queued before."""
+        heapq.heappush(self.delayed, [time.monotonic() + delay, next(self.sequence), url, depth])
+        self.queue.put_nowait(None)
+        self.added.set()
+
+    def release_delayed(self):
+        """Make every delayed URL due now, e.g. so a stopping crawl doesn't wait for them."""
+        for entry in self.delayed:
+            entry[0] = 0
+        self.added.set()
+
+    def promote_due(self):
+        now = time.monotonic()
+        while self.delayed and self.delayed[0][0] <= now:
+            due, sequence, url, depth = heapq.heappop(self.delayed)
+            self.push(url, depth, 1)
+
+    async def get(self):
+        url, depth = await self.get_with_depth()
+        return url
+
+    async def get_with_depth(self):
+        """Take the best waiting URL. Returns (url, depth)."""
+        await self.queue.get()
+        while True:
+            self.promote_due()
+            while self.heap:
+                entry = heapq.heappop(self.heap)
+                url = entry[2]
+                key = self.url_key(url)
+                if self.waiting.get(key) is entry:
+                    del self.waiting[key]
+                    return url, entry[3]
+
+            # Only delayed URLs are left; wait for the first to be due, or for a new URL
+            self.added.clear()
+            timeout = max(0, self.delayed[0][0] - time.monotonic()) if self.delayed else None
+            try:
+                await asyncio.wait_for(self.added.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def task_done(self):
+        self.queue.task_done()
+
+    async def join(self):
+        await self.queue.join()
+
+    def __len__(self):
+        return self.queue.qsize()
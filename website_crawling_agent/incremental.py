@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import re
+import time
+
+from .lazy import lazy_import
+
+requests = lazy_import('requests')
+
+METADATA_SUFFIX = ".meta.json"
+
+CONDITIONAL_REQUEST_TIMEOUT = 15
+
+# Parts of a page that change on every request without the content changing
+SCRIPT_OR_STYLE_PATTERN = re.compile(r"<(script|style|noscript)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+COMMENT_PATTERN = re.compile(r"<!--.*?-->", re.DOTALL)
+BETWEEN_TAGS_PATTERN = re.compile(r">\s+<")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_content(html):
+    """Strip scripts, styles, comments and whitespace differences from a page."""
+    html = SCRIPT_OR_STYLE_PATTERN.sub("", html or "")
+    html = COMMENT_PATTERN.sub("", html)
+    html = BETWEEN_TAGS_PATTERN.sub("><", html)
+    return WHITESPACE_PATTERN.sub(" ", html).strip()
+
+
+def content_hash(html):
+    return hashlib.sha256(normalize_content(html).encode("utf-8")).hexdigest()
+
+
+def metadata_path(output_filename):
+    """The metadata sidecar lives next to the saved page."""
+    return output_filename + METADATA_SUFFIX
+
+
+def build_metadata(url, headers, page_hash, links):
+    headers = {key.lower(): value for key, value in (headers or {}).items()}
+    return {
+        "url": url,
+        "etag": headers.get("etag"),
+        "last_modified": headers.get("last-modified"),
+        "content_hash": page_hash,
+        "links": links,
+        "crawled_at": time.time(),
+    }
+
+
+def load_metadata(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_metadata(path, metadata):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+
+def conditional_headers(metadata):
+    headers = {}
+    if metadata.get("etag"):
+        headers["If-None-Match"] = metadata["etag"]
+    if metadata.get("last_modified"):
+        headers["If-Modified-Since"] = metadata["last_modified"]
+    return headers
+
+
+def is_not_modified(session, url, metadata):
+    """Ask the server whether `url` changed since it was saved.
+
+    Returns True only on a 304 answer to a conditional GET. Pages saved
+    without an ETag or Last-Modified can't be checked this way.
+    """
+    headers = conditional_headers(metadata)
+    if not headers:
+        return False
+    try:
+        # Streamed, so a changed page's body is never downloaded here
+        response = session.get(url, headers=headers, timeout=CONDITIONAL_REQUEST_TIMEOUT,
+                               allow_redirects=False, stream=True)
+        response.close()
+        return response.status_code == 304
+    except requests.RequestException:
+        return False
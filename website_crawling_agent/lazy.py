@@ -0,0 +1,43 @@
+import importlib
+import threading
+
+
+class LazyObject:
+    """Stands in for the result of `factory()`, which is only called the first time it is used.
+
+    Attribute access and calls are passed on to the real object. Special
+    `__dunder__` names are not: tools such as `mock.patch` probe for them,
+    and that must not import the dependency. Safe to first use from
+    several threads at once.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._target = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    self._target = self._factory()
+        return self._target
+
+    def __getattr__(self, attribute):
+        if attribute.startswith('__') and attribute.endswith('__'):
+            raise AttributeError(attribute)
+        return getattr(self._load(), attribute)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+
+def lazy_import(module, name=None):
+    """`import module` (or `from module import name`), done the first time the result is used.
+
+    For dependencies that are slow to import and not needed by every crawl.
+    """
+    def load():
+        target = importlib.import_module(module)
+        return getattr(target, name) if name else target
+    return LazyObject(load)
@@ -0,0 +1,298 @@
+import asyncio
+import bisect
+import io
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from .shards import iso_timestamp
+
+# Pipeline stages that are timed, in the order pages go through them
+STAGES = ('fetch', 'parse', 'extract', 'llm', 'write')
+
+# Upper bounds, in seconds, of the buckets of the stage timing histograms
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+DEFAULT_METRICS_INTERVAL = 10.0
+
+PROFILE_FILENAME = "profile.pstats"
+
+# Functions listed in the profile summary printed at the end of the crawl
+PROFILE_TOP_FUNCTIONS = 15
+
+
+class Histogram:
+    """Counts of observed values in fixed buckets, like a Prometheus histogram.
+
+    Memory is constant however many values are observed; quantiles are
+    estimated by interpolating within the bucket they fall in.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket, plus one for values above the last bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / count)
+            seen += count
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total_seconds': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else 0.0,
+            'p50': round(self.quantile(0.5), 6),
+            'p90': round(self.quantile(0.9), 6),
+            'p99': round(self.quantile(0.99), 6),
+            'max': round(self.max, 6),
+        }
+
+
+class CrawlMetrics:
+    """Per-stage timings, counters and gauges of a crawl.
+
+    Stages are timed with `with metrics.timer('fetch'):`, which also keeps
+    a `fetch_in_flight` gauge. Counters only go up (pages, errors, cache
+    hits, bytes, tokens). Gauges can also be functions, read whenever a
+    snapshot is taken. Safe to update from writer and executor threads.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.started_at = time.time()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.gauge_functions = {}
+        self.lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def inc(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_gauge(self, name, delta):
+        with self.lock:
+            self.gauges[name] = self.gauges.get(name, 0) + delta
+
+    def gauge_function(self, name, function):
+        self.gauge_functions[name] = function
+
+    @contextmanager
+    def timer(self, stage):
+        self.add_gauge(f'{stage}_in_flight', 1)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+            self.add_gauge(f'{stage}_in_flight', -1)
+
+    def snapshot(self):
+        """All metrics as a JSON-serializable dict."""
+        now = time.time()
+        with self.lock:
+            stages = {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        for name, function in self.gauge_functions.items():
+            gauges[name] = function()
+        return {
+            'time': iso_timestamp(now),
+            'elapsed_seconds': round(now - self.started_at, 3),
+            'stages': stages,
+            'counters': counters,
+            'gauges': gauges,
+        }
+
+    def prometheus_text(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = [
+            '# HELP crawler_stage_seconds Time spent per page in each crawl stage',
+            '# TYPE crawler_stage_seconds histogram',
+        ]
+        with self.lock:
+            histograms = {stage: (list(histogram.counts), histogram.sum, histogram.count)
+                          for stage, histogram in self.histograms.items()}
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        for name, function in self.gauge_functions.items():
+            gauges[name] = function()
+
+        for stage, (counts, total, count) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'crawler_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'crawler_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'crawler_stage_seconds_sum{{stage="{stage}"}} {total}')
+            lines.append(f'crawler_stage_seconds_count{{stage="{stage}"}} {count}')
+        for name, value in sorted(counters.items()):
+            lines.append(f'# TYPE crawler_{name}_total counter')
+            lines.append(f'crawler_{name}_total {value}')
+        for name, value in sorted(gauges.items()):
+            lines.append(f'# TYPE crawler_{name} gauge')
+            lines.append(f'crawler_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def report(self):
+        """Lines of the end-of-crawl report, one per timed stage."""
+        with self.lock:
+            summaries = [(stage, self.histograms[stage].summary()) for stage in STAGES if stage in self.histograms]
+        return [
+            f"{stage}: {summary['count']} pages, {summary['mean']:.3f}s on average "
+            f"(p50 {summary['p50']:.3f}s, p99 {summary['p99']:.3f}s, max {summary['max']:.3f}s), "
+            f"{summary['total_seconds']:.1f}s in total"
+            for stage, summary in summaries
+        ]
+
+
+class MetricsReporter:
+    """Appends a JSON snapshot of the metrics to a file every `interval` seconds, and one more when stopped."""
+
+    def __init__(self, metrics, path, interval=DEFAULT_METRICS_INTERVAL):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.ensure_future(self.run())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.write()
+
+    def write(self):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.metrics.snapshot()) + '\n')
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+            self.write()
+
+
+class MetricsServer:
+    """Serves the metrics for Prometheus at http://127.0.0.1:PORT/metrics from a background thread."""
+
+    def __init__(self, metrics, port, host='127.0.0.1'):
+        self.metrics = metrics
+        self.port = port
+        self.host = host
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        # With port 0 the system picks a free port
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class PageProfiler:
+    """Profiles the CPU-bound work (parsing, extraction, writing) of the first `pages` pages.
+
+    Each profiled call runs under its own cProfile profiler in whatever
+    thread it runs in, and the results are merged into one set of stats.
+    Only one profiler can be active at a time (Python 3.12 and later raise
+    an error otherwise), so profiled calls run one after another; calls
+    for pages that aren't sampled are not held up.
+    """
+
+    def __init__(self, pages, path):
+        self.pages = pages
+        self.path = path
+        self.sampled_urls = set()
+        self.stats = None
+        self.lock = threading.Lock()
+        # Held for the whole of a profiled call
+        self.run_lock = threading.Lock()
+
+    def sample(self, url):
+        """Profile `url` if fewer than `pages` pages were sampled so far."""
+        if len(self.sampled_urls) < self.pages:
+            self.sampled_urls.add(url)
+
+    def call(self, url, func, *args):
+        if url not in self.sampled_urls:
+            return func(*args)
+        import cProfile
+        import pstats
+
+        with self.run_lock:
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(func, *args)
+            finally:
+                with self.lock:
+                    if self.stats is None:
+                        self.stats = pstats.Stats(profile)
+                    else:
+                        self.stats.add(profile)
+
+    def save(self):
+        """Write the stats to `path`. Returns a summary of the most expensive functions, or None."""
+        with self.lock:
+            if self.stats is None:
+                return None
+            self.stats.dump_stats(self.path)
+            output = io.StringIO()
+            self.stats.stream = output
+            self.stats.sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+            return output.getvalue()
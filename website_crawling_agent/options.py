@@ -0,0 +1,85 @@
+"""Groups of related WebsiteCrawlingAgent options.
+
+Each group is passed to the agent as one argument, such as
+`politeness=PolitenessOptions(respect_robots=True)`. Leaving a group out
+gives its defaults.
+"""
+from .extraction_cache import DEFAULT_MAX_CACHE_BYTES
+from .metrics import DEFAULT_METRICS_INTERVAL
+from .retry import (
+    DEFAULT_BREAKER_COOLDOWN, DEFAULT_BREAKER_ERROR_RATE, DEFAULT_MAX_RETRIES, DEFAULT_RETRY_BASE_DELAY,
+    DEFAULT_RETRY_MAX_DELAY
+)
+from .shards import DEFAULT_SHARD_BYTES
+from .writer import DEFAULT_PDF_WORKERS, DEFAULT_WRITE_QUEUE_SIZE
+
+
+class PolitenessOptions:
+    """How hard a crawl may push a site.
+
+    robots.txt rules, the highest request rate per host, how often and how
+    long after failed pages are retried, and when a host's circuit breaker
+    pauses it.
+    """
+
+    def __init__(self, respect_robots=False, max_host_rate=None, max_retries=DEFAULT_MAX_RETRIES,
+                 retry_base_delay=DEFAULT_RETRY_BASE_DELAY, retry_max_delay=DEFAULT_RETRY_MAX_DELAY,
+                 breaker_error_rate=DEFAULT_BREAKER_ERROR_RATE, breaker_cooldown=DEFAULT_BREAKER_COOLDOWN):
+        self.respect_robots = respect_robots
+        self.max_host_rate = max_host_rate
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.breaker_error_rate = breaker_error_rate
+        self.breaker_cooldown = breaker_cooldown
+
+
+class IncrementalOptions:
+    """Crawling a site again.
+
+    `resume` continues an interrupted crawl from its saved state,
+    `enabled` only extracts and saves pages that changed since the last
+    crawl, and `use_sitemaps` seeds the crawl from the site's sitemaps,
+    optionally only with pages modified `sitemap_since` a timestamp.
+    """
+
+    def __init__(self, enabled=False, resume=False, use_sitemaps=False, sitemap_since=None):
+        self.enabled = enabled
+        self.resume = resume
+        self.use_sitemaps = use_sitemaps
+        self.sitemap_since = sitemap_since
+
+
+class CacheOptions:
+    """Where the extraction cache is kept, by default in the output folder, and how large it may grow."""
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+
+class OutputOptions:
+    """How pages are saved: at all (`save`), jsonl shard compression and size, and the writer's workers and queue."""
+
+    def __init__(self, save=True, compression='none', max_shard_bytes=DEFAULT_SHARD_BYTES,
+                 pdf_workers=DEFAULT_PDF_WORKERS, write_queue_size=DEFAULT_WRITE_QUEUE_SIZE):
+        self.save = save
+        self.compression = compression
+        self.max_shard_bytes = max_shard_bytes
+        self.pdf_workers = pdf_workers
+        self.write_queue_size = write_queue_size
+
+
+class MetricsOptions:
+    """Metrics and profiling.
+
+    A JSON lines file of metrics written every `interval` seconds, a
+    Prometheus endpoint on `port`, and cProfile profiling of the first
+    `profile_pages` pages.
+    """
+
+    def __init__(self, path=None, interval=DEFAULT_METRICS_INTERVAL, port=None, profile_pages=0):
+        self.path = path
+        self.interval = interval
+        self.port = port
+        self.profile_pages = profile_pages
@@ -0,0 +1,74 @@
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+
+class ParsedPage:
+    def __init__(self, title='', hrefs=None, base_href=None, canonical=None):
+        self.title = title
+        self.hrefs = hrefs or []
+        self.base_href = base_href
+        self.canonical = canonical
+
+    def is_custom_404(self):
+        title = self.title.lower()
+        return "404" in title or "not found" in title
+
+    def links(self, url):
+        """Absolute URLs of the page's links, resolved against <base href> when there is one."""
+        base_url = urljoin(url, self.base_href) if self.base_href else url
+        return [urljoin(base_url, href) for href in self.hrefs]
+
+
+class PageParser(HTMLParser):
+    """Collects the title, link targets, <base href> and rel=canonical without building a tree."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.page = ParsedPage()
+        self.title_parts = None
+        self.title_done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            for name, value in attrs:
+                if name == 'href' and value is not None:
+                    self.page.hrefs.append(value)
+                    break
+        elif tag == 'title' and not self.title_done:
+            self.title_parts = []
+        elif tag == 'base' and self.page.base_href is None:
+            self.page.base_href = dict(attrs).get('href')
+        elif tag == 'link' and self.page.canonical is None:
+            attrs = dict(attrs)
+            if 'canonical' in (attrs.get('rel') or '').lower().split() and attrs.get('href'):
+                self.page.canonical = attrs['href']
+
+    def handle_startendtag(self, tag, attrs):
+        # <title/> would otherwise swallow the rest of the page as its text
+        if tag != 'title':
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == 'title' and self.title_parts is not None:
+            self.page.title = ''.join(self.title_parts).strip()
+            self.title_parts = None
+            self.title_done = True
+
+    def handle_data(self, data):
+        if self.title_parts is not None:
+            self.title_parts.append(data)
+
+
+def parse_page(html):
+    """Read a page's title, hrefs, base href and canonical URL in a single pass.
+
+    Much cheaper than a BeautifulSoup tree for the few things the crawler
+    needs from every page. CPU-bound; run it in an executor.
+    """
+    parser = PageParser()
+    parser.feed(html or '')
+    parser.close()
+    if parser.title_parts is not None:
+        # Unclosed <title>
+        parser.page.title = ''.join(parser.title_parts).strip()
+    return parser.page
@@ -0,0 +1,57 @@
+import asyncio
+from collections import deque
+
+# Extracted pages held for a consumer that is behind, before extraction waits
+DEFAULT_PAGE_BUFFER = 16
+
+
+class PageStream:
+    """A bounded buffer of page records between the crawl and an `async for` loop.
+
+    `put` waits while `max_size` records are waiting, so a slow consumer
+    holds up extraction, and through it fetching, rather than letting
+    records pile up in memory. `finish` ends the stream once the records
+    left have been taken; `close` is for a consumer that stops early, and
+    drops the waiting records and every record put after it.
+    """
+
+    def __init__(self, max_size=DEFAULT_PAGE_BUFFER):
+        self.max_size = max(1, max_size)
+        self.records = deque()
+        self.condition = asyncio.Condition()
+        self.finished = False
+        self.closed = False
+
+    def __len__(self):
+        return len(self.records)
+
+    async def put(self, record):
+        """Add a record, waiting for room. Returns False if the consumer is gone."""
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.closed or len(self.records) < self.max_size)
+            if self.closed:
+                return False
+            self.records.append(record)
+            self.condition.notify_all()
+            return True
+
+    async def get(self):
+        """The next record, waiting for one; None once the stream is finished."""
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.records or self.finished or self.closed)
+            if not self.records:
+                return None
+            record = self.records.popleft()
+            self.condition.notify_all()
+            return record
+
+    async def finish(self):
+        async with self.condition:
+            self.finished = True
+            self.condition.notify_all()
+
+    async def close(self):
+        async with self.condition:
+            self.closed = True
+            self.records.clear()
+            self.condition.notify_all()
@@ -0,0 +1,235 @@
+import asyncio
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from .lazy import lazy_import
+
+requests = lazy_import('requests')
+
+# Status codes a server uses to tell us to slow down
+THROTTLE_STATUS_CODES = (429, 503)
+
+# Slowest rate (requests per second) the scheduler will back off to
+MIN_HOST_RATE = 0.1
+
+# How much the rate grows after each successful request once a host has
+# pushed back, and how much it shrinks when the host pushes back again
+RATE_INCREASE_STEP = 0.1
+RATE_BACKOFF_FACTOR = 0.5
+
+# Number of recent requests used to measure how fast a host is being crawled
+RATE_WINDOW_SIZE = 20
+
+ROBOTS_TIMEOUT = 10
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens are added per second, up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, now):
+        """Seconds until a token is available (0 if one is available now)."""
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now):
+        self.refill(now)
+        self.tokens -= 1
+
+
+class HostState:
+    """Rate limiting state for a single host."""
+
+    def __init__(self, max_rate=None):
+        # With no max_rate a host is not throttled until it pushes back
+        self.max_rate = max_rate
+        self.bucket = TokenBucket(max_rate) if max_rate else None
+        self.paused_until = 0
+        self.recent_requests = deque(maxlen=RATE_WINDOW_SIZE)
+
+    def measured_rate(self, now):
+        """Requests per second over the recent window, or None if there is too little data."""
+        if len(self.recent_requests) < 2:
+            return None
+        elapsed = now - self.recent_requests[0]
+        if elapsed <= 0:
+            return None
+        return len(self.recent_requests) / elapsed
+
+    def set_rate(self, rate, now):
+        if self.max_rate:
+            rate = min(rate, self.max_rate)
+        rate = max(rate, MIN_HOST_RATE)
+        if self.bucket is None:
+            self.bucket = TokenBucket(rate)
+            self.bucket.updated_at = now
+        else:
+            self.bucket.refill(now)
+            self.bucket.rate = rate
+
+
+class HostScheduler:
+    """Decides when each host may receive its next request.
+
+    Every host gets its own token bucket. The rate adapts to the host: it
+    is cut back when the host answers 429 or 503, dispatch is paused for
+    as long as a Retry-After header asks, and the rate then creeps back up
+    with every successful request. A Crawl-delay from robots.txt caps the
+    rate for that host.
+    """
+
+    def __init__(self, max_rate=None):
+        self.max_rate = max_rate
+        self.hosts = {}
+
+    def get_host(self, url):
+        host = urlparse(url).netloc
+        if host not in self.hosts:
+            self.hosts[host] = HostState(self.max_rate)
+        return self.hosts[host]
+
+    async def acquire(self, url):
+        """Wait until a request to the host of `url` is allowed, then claim the slot."""
+        state = self.get_host(url)
+        while True:
+            now = time.monotonic()
+            wait = state.paused_until - now
+            if state.bucket is not None:
+                wait = max(wait, state.bucket.wait_time(now))
+
+            if wait <= 0:
+                if state.bucket is not None:
+                    state.bucket.consume(now)
+                state.recent_requests.append(now)
+                return
+
+            await asyncio.sleep(wait)
+
+    def record_response(self, url, status_code, headers=None):
+        """Adapt the host's rate to how it answered a request."""
+        state = self.get_host(url)
+        now = time.monotonic()
+
+        if status_code in THROTTLE_STATUS_CODES:
+            current_rate = state.bucket.rate if state.bucket is not None else state.measured_rate(now)
+            state.set_rate((current_rate or 1) * RATE_BACKOFF_FACTOR, now)
+
+            retry_after = parse_retry_after(get_header(headers, 'retry-after'))
+            if retry_after:
+                state.paused_until = max(state.paused_until, now + retry_after)
+        elif state.bucket is not None and status_code and status_code < 400:
+            state.set_rate(state.bucket.rate + RATE_INCREASE_STEP, now)
+
+    def set_crawl_delay(self, url, delay):
+        """Never send more than one request every `delay` seconds to the host of `url`."""
+        if not delay:
+            return
+        state = self.get_host(url)
+        delay_rate = 1 / float(delay)
+        if not state.max_rate or delay_rate < state.max_rate:
+            state.max_rate = delay_rate
+        now = time.monotonic()
+        state.set_rate(state.bucket.rate if state.bucket is not None else delay_rate, now)
+
+
+def get_header(headers, name):
+    """Case-insensitive header lookup on a plain dict."""
+    if not headers:
+        return None
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def parse_retry_after(value):
+    """Turn a Retry-After header (seconds or HTTP date) into seconds to wait."""
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return int(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0, retry_at.timestamp() - time.time())
+
+
+def fetch_robots_txt(robots_url):
+    """Download robots.txt. Returns (status_code, text), with status_code None on network errors."""
+    try:
+        response = requests.get(robots_url, timeout=ROBOTS_TIMEOUT)
+        return response.status_code, response.text
+    except requests.RequestException:
+        return None, ""
+
+
+class RobotsCache:
+    """Fetches robots.txt once per host and answers allow/deny and Crawl-delay questions.
+
+    Missing robots.txt files (4xx) allow everything; unreachable ones (5xx
+    or network errors) disallow everything, as RFC 9309 recommends.
+    """
+
+    def __init__(self, user_agent='*', fetcher=fetch_robots_txt):
+        self.user_agent = user_agent
+        self.fetcher = fetcher
+        self.parsers = {}
+        self.locks = {}
+
+    def robots_url(self, url):
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+
+    async def get_parser(self, url):
+        robots_url = self.robots_url(url)
+        if robots_url in self.parsers:
+            return self.parsers[robots_url]
+
+        # Only one worker fetches a given robots.txt; the others wait for it
+        if robots_url not in self.locks:
+            self.locks[robots_url] = asyncio.Lock()
+        async with self.locks[robots_url]:
+            if robots_url not in self.parsers:
+                loop = asyncio.get_event_loop()
+                status_code, text = await loop.run_in_executor(None, self.fetcher, robots_url)
+                self.parsers[robots_url] = self.build_parser(robots_url, status_code, text)
+        return self.parsers[robots_url]
+
+    def build_parser(self, robots_url, status_code, text):
+        # Pulls in urllib.request; only crawls that respect robots.txt need it
+        from urllib.robotparser import RobotFileParser
+
+        parser = RobotFileParser(robots_url)
+        if status_code is None or status_code >= 500:
+            parser.disallow_all = True
+        elif status_code >= 400:
+            parser.allow_all = True
+        else:
+            parser.parse(text.splitlines())
+        return parser
+
+    async def can_fetch(self, url):
+        parser = await self.get_parser(url)
+        return parser.can_fetch(self.user_agent, url)
+
+    async def crawl_delay(self, url):
+        parser = await self.get_parser(url)
+        return parser.crawl_delay(self.user_agent)
@@ -0,0 +1,114 @@
+from .content import element_to_markdown
+from .extractor import measure
+
+# Rough size of a token for the OpenAI-style tokenizers LLM extraction uses
+CHARS_PER_TOKEN = 4
+
+# Most tokens of page text sent to the LLM for one page, and the size of
+# each chunk it is split into
+DEFAULT_TOKEN_BUDGET = 8000
+DEFAULT_CHUNK_TOKENS = 2000
+
+# Don't bother sending a truncated last chunk smaller than this
+MIN_TRUNCATED_CHUNK_TOKENS = 100
+
+
+def estimate_tokens(text):
+    return (len(text or '') + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def drop_repeated_blocks(text):
+    """Keep only the first copy of blocks repeated on the page ("Read more", repeated teasers)."""
+    seen_blocks = set()
+    kept_blocks = []
+    for block in text.split('\n\n'):
+        if block in seen_blocks:
+            continue
+        seen_blocks.add(block)
+        kept_blocks.append(block)
+    return '\n\n'.join(kept_blocks)
+
+
+def prune_html(html):
+    """Reduce a page to compact markdown without scripts, styles, SVG, navigation or other chrome."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html or '', 'html.parser')
+    stats_by_id = measure(soup)
+
+    def skip(element):
+        element_stats = stats_by_id.get(id(element))
+        return element_stats is not None and element_stats.boilerplate
+
+    text = element_to_markdown(soup.body or soup, skip=skip)
+    return drop_repeated_blocks(text)
+
+
+def split_oversized_block(block, chunk_tokens):
+    """Split a block that is larger than a chunk on whitespace."""
+    max_chars = chunk_tokens * CHARS_PER_TOKEN
+    pieces = []
+    while len(block) > max_chars:
+        split_at = block.rfind(' ', 0, max_chars)
+        if split_at <= 0:
+            split_at = max_chars
+        pieces.append(block[:split_at].strip())
+        block = block[split_at:].strip()
+    if block:
+        pieces.append(block)
+    return pieces
+
+
+def chunk_text(text, chunk_tokens):
+    """Split text into chunks of at most `chunk_tokens`, preferring to break before headings."""
+    chunks = []
+    current_blocks = []
+    current_tokens = 0
+
+    for block in text.split('\n\n'):
+        for piece in split_oversized_block(block, chunk_tokens):
+            piece_tokens = estimate_tokens(piece)
+            full = current_tokens + piece_tokens > chunk_tokens
+            # A new section is a good place to start a chunk once the current one is half full
+            new_section = piece.startswith('#') and current_tokens >= chunk_tokens // 2
+            if current_blocks and (full or new_section):
+                chunks.append('\n\n'.join(current_blocks))
+                current_blocks = []
+                current_tokens = 0
+            current_blocks.append(piece)
+            current_tokens += piece_tokens
+
+    if current_blocks:
+        chunks.append('\n\n'.join(current_blocks))
+    return chunks
+
+
+def fit_to_budget(chunks, token_budget):
+    """Keep chunks until the budget is spent. Returns (chunks, truncated)."""
+    kept_chunks = []
+    used_tokens = 0
+    for chunk in chunks:
+        chunk_tokens = estimate_tokens(chunk)
+        if used_tokens + chunk_tokens <= token_budget:
+            kept_chunks.append(chunk)
+            used_tokens += chunk_tokens
+            continue
+
+        remaining_tokens = token_budget - used_tokens
+        if remaining_tokens >= MIN_TRUNCATED_CHUNK_TOKENS:
+            kept_chunks.append(split_oversized_block(chunk, remaining_tokens)[0])
+        return kept_chunks, True
+    return kept_chunks, False
+
+
+def prepare_llm_input(html, fallback_text='', token_budget=DEFAULT_TOKEN_BUDGET, chunk_tokens=DEFAULT_CHUNK_TOKENS):
+    """Prune a page and cut it into chunks that fit the token budget.
+
+    If pruning leaves nothing, `fallback_text` (crawl4ai's markdown) is
+    chunked instead. Returns (chunks, tokens, truncated). CPU-bound; run
+    it in an executor.
+    """
+    text = prune_html(html) or fallback_text or ''
+    chunks, truncated = fit_to_budget(chunk_text(text, chunk_tokens), token_budget)
+    tokens = sum(estimate_tokens(chunk) for chunk in chunks)
+    return chunks, tokens, truncated
@@ -0,0 +1,223 @@
+import asyncio
+import random
+import re
+import socket
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+# Kinds of failure worth another try
+TIMEOUT = 'timeout'
+SERVER_ERROR = 'server_error'
+THROTTLED = 'throttled'
+DNS = 'dns'
+NETWORK = 'network'
+EXTRACTION = 'extraction'
+
+FAILURE_CLASSES = (TIMEOUT, SERVER_ERROR, THROTTLED, DNS, NETWORK, EXTRACTION)
+
+# Failures that say something about the host, and count towards its circuit breaker
+HOST_FAILURES = (TIMEOUT, SERVER_ERROR, THROTTLED, DNS, NETWORK)
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_BASE_DELAY = 1.0
+DEFAULT_RETRY_MAX_DELAY = 60.0
+
+# A failed DNS lookup rarely fixes itself within a crawl; try once more at most
+RETRY_LIMITS = {DNS: 1}
+
+# The circuit of a host opens when at least this share of its last
+# requests failed, and at least BREAKER_MIN_REQUESTS of them were made
+DEFAULT_BREAKER_ERROR_RATE = 0.5
+BREAKER_WINDOW_SIZE = 20
+BREAKER_MIN_REQUESTS = 5
+
+# Seconds an open circuit stays open; doubled every time a probe fails
+DEFAULT_BREAKER_COOLDOWN = 30.0
+BREAKER_MAX_COOLDOWN = 600.0
+
+# While a probe is in flight, other pages of the host check back this often
+BREAKER_PROBE_INTERVAL = 1.0
+
+# Error messages of requests, Playwright and Chromium, by kind of failure.
+# DNS comes first, since a lookup that timed out is still a DNS failure.
+ERROR_PATTERNS = (
+    (DNS, re.compile(
+        r'ERR_NAME_NOT_RESOLVED|NameResolutionError|Failed to resolve|Name or service not known|'
+        r'nodename nor servname|getaddrinfo|name resolution|No address associated', re.IGNORECASE)),
+    (TIMEOUT, re.compile(r'timed? ?out|timeout|ERR_TIMED_OUT', re.IGNORECASE)),
+    (NETWORK, re.compile(
+        r'ERR_CONNECTION|ERR_NETWORK|ERR_EMPTY_RESPONSE|ERR_INTERNET_DISCONNECTED|'
+        r'Connection (refused|reset|aborted)|RemoteDisconnected|ConnectionError|Max retries exceeded',
+        re.IGNORECASE)),
+)
+
+
+class ExtractionError(Exception):
+    """Extraction of a fetched page failed, e.g. the LLM returned errors."""
+
+
+def classify_failure(status_code=None, error_message=None):
+    """The kind of a failed fetch, or None if trying again would not help."""
+    if status_code == 429:
+        return THROTTLED
+    if status_code == 408:
+        return TIMEOUT
+    if status_code is not None and 500 <= status_code < 600:
+        return SERVER_ERROR
+    if status_code is not None and 400 <= status_code < 500:
+        return None
+    if error_message:
+        for failure, pattern in ERROR_PATTERNS:
+            if pattern.search(str(error_message)):
+                return failure
+    return None
+
+
+def classify_exception(error):
+    """The kind of failure an exception raised while crawling a page stands for, or None."""
+    if isinstance(error, ExtractionError):
+        return EXTRACTION
+    if isinstance(error, socket.gaierror):
+        return DNS
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+        return TIMEOUT
+    if isinstance(error, ConnectionError):
+        return NETWORK
+    return classify_failure(error_message=f"{type(error).__name__}: {error}")
+
+
+class RetryPolicy:
+    """How often and after how long a failed page is tried again.
+
+    The delay doubles with every attempt, up to `max_delay`, and is
+    jittered: half of it is fixed and the other half random, so pages that
+    failed together don't all come back at the same moment. A Retry-After
+    from the server is a lower bound.
+    """
+
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, base_delay=DEFAULT_RETRY_BASE_DELAY,
+                 max_delay=DEFAULT_RETRY_MAX_DELAY, rng=None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+
+    def retries_for(self, failure):
+        if failure is None:
+            return 0
+        return min(self.max_retries, RETRY_LIMITS.get(failure, self.max_retries))
+
+    def should_retry(self, failure, attempts):
+        """True if a page that failed with `failure` after `attempts` earlier retries gets another one."""
+        return attempts < self.retries_for(failure)
+
+    def delay(self, attempts, retry_after=None):
+        """Seconds to wait before retry number `attempts + 1`."""
+        delay = min(self.max_delay, self.base_delay * 2 ** attempts)
+        delay = delay / 2 + self.rng.uniform(0, delay / 2)
+        if retry_after:
+            delay = max(delay, min(float(retry_after), self.max_delay))
+        return delay
+
+
+class BreakerState:
+    """Circuit breaker state of a single host."""
+
+    def __init__(self, cooldown):
+        self.outcomes = deque(maxlen=BREAKER_WINDOW_SIZE)
+        self.cooldown = cooldown
+        # Zero while the circuit is closed; while it is open, when it may let a probe through
+        self.open_until = 0
+        self.probe_started_at = None
+
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return sum(self.outcomes) / len(self.outcomes)
+
+
+class CircuitBreaker:
+    """Stops sending pages to a host that keeps failing, and tries again later.
+
+    Each host's last requests are remembered. When at least `error_rate`
+    of them failed with a timeout, server error, 429, DNS or network
+    error, the host's circuit opens: none of its pages are dispatched for
+    `cooldown` seconds. Then a single probe page goes through. If it
+    succeeds the circuit closes, otherwise it stays open for twice as long.
+    An `error_rate` of 0 turns the breaker off.
+    """
+
+    def __init__(self, error_rate=DEFAULT_BREAKER_ERROR_RATE, cooldown=DEFAULT_BREAKER_COOLDOWN):
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self.hosts = {}
+        self.trips = 0
+        # Hosts whose circuit is open; while there are none, checks are cheap
+        self.open_hosts = 0
+
+    def get_host(self, url):
+        host = urlparse(url).netloc
+        if host not in self.hosts:
+            self.hosts[host] = BreakerState(self.cooldown)
+        return self.hosts[host]
+
+    def wait_time(self, url):
+        """Seconds until a page of the host of `url` may be dispatched; 0 means now.
+
+        Once the circuit's cooldown is over, the first caller gets 0 and is
+        the probe; its outcome must be passed to `record`.
+        """
+        if not self.error_rate or not self.open_hosts:
+            return 0
+        state = self.get_host(url)
+        if not state.open_until:
+            return 0
+
+        now = time.monotonic()
+        if now < state.open_until:
+            return state.open_until - now
+        # A probe that never reported back doesn't keep the host closed forever
+        if state.probe_started_at is not None and now - state.probe_started_at < state.cooldown:
+            return BREAKER_PROBE_INTERVAL
+        state.probe_started_at = now
+        return 0
+
+    def record(self, url, failure=None):
+        """Count the outcome of a request to the host of `url`. `failure` is None for a success."""
+        if not self.error_rate:
+            return
+        state = self.get_host(url)
+        failed = failure in HOST_FAILURES
+        now = time.monotonic()
+
+        if state.open_until:
+            if now < state.open_until:
+                # Requests that were already in flight when the circuit opened
+                return
+            if failed:
+                state.cooldown = min(state.cooldown * 2, BREAKER_MAX_COOLDOWN)
+                self.open(url, state, now)
+            else:
+                print(f"\nCircuit closed for {urlparse(url).netloc}: the host is answering again")
+                state.open_until = 0
+                self.open_hosts -= 1
+                state.cooldown = self.cooldown
+                state.outcomes.clear()
+            state.probe_started_at = None
+            return
+
+        state.outcomes.append(failed)
+        if len(state.outcomes) >= BREAKER_MIN_REQUESTS and state.error_rate() >= self.error_rate:
+            self.trips += 1
+            self.open_hosts += 1
+            print(f"\nCircuit opened for {urlparse(url).netloc}: "
+                  f"{state.error_rate():.0%} of the last {len(state.outcomes)} requests failed")
+            self.open(url, state, now)
+
+    def open(self, url, state, now):
+        state.open_until = now + state.cooldown
+        print(f"\nPausing {urlparse(url).netloc} for {state.cooldown:.0f}s")
+
+    def is_open(self, url):
+        return bool(self.get_host(url).open_until)
@@ -0,0 +1,104 @@
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+COMPRESSION_SUFFIXES = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+DEFAULT_SHARD_BYTES = 100 * 1024 * 1024
+
+# Buffered records are appended to the open shard once this many have piled
+# up, or once this many seconds have passed since the last flush
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+
+def get_compressor(compression):
+    """A function compressing one batch of bytes into a self-contained frame."""
+    if compression == 'none':
+        return lambda data: data
+    if compression == 'gzip':
+        return gzip.compress
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd compression needs the zstandard package: pip install zstandard")
+        return zstandard.ZstdCompressor().compress
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+class JsonlShardWriter:
+    """Appends one JSON record per page to size-capped, rotating shard files.
+
+    Records are buffered and appended in batches. Every batch is written as
+    its own gzip member or zstd frame, which concatenated make a valid
+    file, so a crash loses at most the batch that was still in memory.
+    Shards are named pages-00000.jsonl[.gz|.zst], or after another `prefix`;
+    a new crawl into the same folder continues after the highest existing
+    number. Safe to use from several writer threads.
+    """
+
+    def __init__(self, folder, compression='none', max_shard_bytes=DEFAULT_SHARD_BYTES,
+                 batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL, prefix='pages'):
+        self.folder = folder
+        self.prefix = prefix
+        self.shard_pattern = re.compile(rf"^{re.escape(prefix)}-(\d+)\.jsonl")
+        self.compression = compression
+        self.compress = get_compressor(compression)
+        self.max_shard_bytes = max_shard_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        self.records_written = 0
+
+        os.makedirs(folder, exist_ok=True)
+        self.shard_number = self.next_shard_number()
+        self.shard_bytes = 0
+
+    def next_shard_number(self):
+        numbers = [int(match.group(1)) for match in map(self.shard_pattern.match, os.listdir(self.folder)) if match]
+        return max(numbers) + 1 if numbers else 0
+
+    def shard_path(self):
+        suffix = COMPRESSION_SUFFIXES[self.compression]
+        return os.path.join(self.folder, f"{self.prefix}-{self.shard_number:05d}.jsonl{suffix}")
+
+    def write(self, record):
+        with self.lock:
+            self.pending.append(json.dumps(record, ensure_ascii=False, default=str))
+            if len(self.pending) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+                self.flush_pending()
+
+    def flush(self):
+        with self.lock:
+            self.flush_pending()
+
+    def flush_pending(self):
+        if self.pending:
+            if self.shard_bytes >= self.max_shard_bytes:
+                self.shard_number += 1
+                self.shard_bytes = 0
+
+            data = self.compress(("\n".join(self.pending) + "\n").encode('utf-8'))
+            with open(self.shard_path(), 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.shard_bytes += len(data)
+            self.records_written += len(self.pending)
+            self.pending = []
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+
+def iso_timestamp(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
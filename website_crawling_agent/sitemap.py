@@ -0,0 +1,172 @@
+import gzip
+import heapq
+import io
+import re
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime, timezone
+from urllib.parse import urljoin
+
+from .lazy import lazy_import
+
+requests = lazy_import('requests')
+
+SITEMAP_TIMEOUT = 30
+
+# Sitemap indexes may point at further indexes; don't follow them deeper than this
+MAX_SITEMAP_DEPTH = 3
+MAX_SITEMAPS = 10000
+
+# Entries handed over to the crawl at a time while the sitemaps are read
+SITEMAP_BATCH_SIZE = 1000
+
+SITEMAP_LINE_PATTERN = re.compile(r"^\s*sitemap\s*:\s*(\S+)", re.IGNORECASE | re.MULTILINE)
+
+
+class SitemapEntry:
+    def __init__(self, url, lastmod=None):
+        self.url = url
+        # Seconds since the epoch, or None when the sitemap doesn't say
+        self.lastmod = lastmod
+
+    def __repr__(self):
+        return f"SitemapEntry({self.url!r}, {self.lastmod!r})"
+
+
+def parse_lastmod(value):
+    """Parse a W3C datetime ("2024-05-01", "2024-05-01T10:00:00Z", ...) into a timestamp."""
+    value = (value or '').strip()
+    if not value:
+        return None
+    if value.endswith(('Z', 'z')):
+        value = value[:-1] + '+00:00'
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def sitemaps_from_robots(robots_url, robots_text):
+    """The sitemap URLs listed in a robots.txt file."""
+    return [urljoin(robots_url, match) for match in SITEMAP_LINE_PATTERN.findall(robots_text or '')]
+
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def iter_sitemap(stream):
+    """Stream (kind, loc, lastmod) from a sitemap or sitemap index, where kind is 'url' or 'sitemap'.
+
+    Elements are discarded as soon as they are read, so memory use doesn't
+    depend on the size of the file. Gzipped sitemaps are detected and
+    decompressed on the fly.
+    """
+    stream = io.BufferedReader(stream) if not hasattr(stream, 'peek') else stream
+    if stream.peek(2)[:2] == b'\x1f\x8b':
+        stream = gzip.GzipFile(fileobj=stream)
+
+    root = None
+    loc = None
+    lastmod = None
+    for event, element in ElementTree.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            continue
+
+        name = local_name(element.tag)
+        if name == 'loc':
+            loc = (element.text or '').strip()
+        elif name == 'lastmod':
+            lastmod = parse_lastmod(element.text)
+        elif name in ('url', 'sitemap'):
+            if loc:
+                yield name, loc, lastmod
+            loc = None
+            lastmod = None
+            root.clear()
+
+
+def fetch_sitemap_entries(session, sitemap_url, since=None, depth=0, seen_sitemaps=None):
+    """Stream the page entries of a sitemap, following sitemap indexes. Blocking; run it in an executor.
+
+    With `since`, pages and child sitemaps whose lastmod is older are
+    skipped. Sitemaps that can't be fetched or parsed are skipped with a
+    message.
+    """
+    if seen_sitemaps is None:
+        seen_sitemaps = set()
+    if sitemap_url in seen_sitemaps or len(seen_sitemaps) >= MAX_SITEMAPS:
+        return
+    seen_sitemaps.add(sitemap_url)
+
+    child_sitemaps = []
+    try:
+        with session.get(sitemap_url, timeout=SITEMAP_TIMEOUT, stream=True) as response:
+            if response.status_code != 200:
+                print(f"\nSkipping sitemap {sitemap_url}: HTTP {response.status_code}")
+                return
+            response.raw.decode_content = True
+            for kind, loc, lastmod in iter_sitemap(response.raw):
+                if since is not None and lastmod is not None and lastmod < since:
+                    continue
+                if kind == 'url':
+                    yield SitemapEntry(loc, lastmod)
+                elif depth < MAX_SITEMAP_DEPTH:
+                    child_sitemaps.append(loc)
+    except (requests.RequestException, ElementTree.ParseError, OSError, EOFError) as e:
+        print(f"\nSkipping sitemap {sitemap_url}: {str(e)}")
+        return
+
+    for child_sitemap in child_sitemaps:
+        yield from fetch_sitemap_entries(session, child_sitemap, since, depth + 1, seen_sitemaps)
+
+
+def newest_first(entries, limit=None):
+    """The newest `limit` entries by lastmod, newest first, with entries without a lastmod last.
+
+    Only those `limit` entries are ever held in memory. Without a limit the
+    entries are passed on lazily, in the order they were read: ordering
+    them would mean holding every entry of every sitemap at once.
+    """
+    if limit is None:
+        return iter(entries)
+
+    def sort_key(entry):
+        return entry.lastmod if entry.lastmod is not None else float('-inf')
+
+    return heapq.nlargest(limit, entries, key=sort_key)
+
+
+def discover_sitemap_entries(session, start_url, since=None, limit=None, accept=None):
+    """Find a site's sitemaps through robots.txt (or /sitemap.xml) and list their pages.
+
+    With a `limit`, returns the newest `limit` pages, newest first;
+    otherwise an iterator over every page in sitemap order. With `accept`,
+    only pages whose URL it accepts are listed, so pages the crawl would
+    skip don't take any of the `limit` places. Blocking, and so is
+    iterating the result; run both in an executor.
+    """
+    robots_url = urljoin(start_url, '/robots.txt')
+    sitemap_urls = []
+    try:
+        response = session.get(robots_url, timeout=SITEMAP_TIMEOUT)
+        if response.status_code == 200:
+            sitemap_urls = sitemaps_from_robots(robots_url, response.text)
+    except requests.RequestException:
+        pass
+    if not sitemap_urls:
+        sitemap_urls = [urljoin(start_url, '/sitemap.xml')]
+
+    seen_sitemaps = set()
+
+    def all_entries():
+        for sitemap_url in sitemap_urls:
+            for entry in fetch_sitemap_entries(session, sitemap_url, since, seen_sitemaps=seen_sitemaps):
+                if accept is None or accept(entry.url):
+                    yield entry
+
+    return newest_first(all_entries(), limit)
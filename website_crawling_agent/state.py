@@ -0,0 +1,113 @@
+import os
+import sqlite3
+import time
+
+STATE_FILENAME = ".crawl_state.sqlite"
+# Each worker of a distributed crawl keeps its own state file
+WORKER_STATE_FILENAME = ".crawl_state.worker-{}.sqlite"
+
+# Flush pending status updates once this many have piled up, or once this
+# many seconds have passed since the last flush, whichever comes first
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+# URL statuses
+QUEUED = "queued"
+CLAIMED = "claimed"
+DONE = "done"
+FAILED = "failed"
+NOT_FOUND = "not_found"
+DISALLOWED = "disallowed"
+
+# Statuses of pages that were claimed and finished, and count towards max_pages
+FINISHED_STATUSES = (DONE, FAILED, NOT_FOUND)
+
+
+class CrawlStateStore:
+    """Keeps the frontier, the visited set and per-URL status on disk.
+
+    Status updates are buffered in memory and written to SQLite in batches,
+    so the cost per page is tiny. If the process dies, at most the last
+    unflushed batch is lost, and those pages are simply crawled again on
+    resume.
+    """
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = {}
+        self.last_flush = time.monotonic()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            "url TEXT PRIMARY KEY, status TEXT NOT NULL, updated_at REAL NOT NULL, depth INTEGER)"
+        )
+        # State files from before link depths were kept
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(urls)")]
+        if 'depth' not in columns:
+            self.connection.execute("ALTER TABLE urls ADD COLUMN depth INTEGER")
+        self.connection.commit()
+
+    def record(self, url, status, depth=None):
+        """Remember the latest status of `url`. It is written at the next flush.
+
+        The link depth is kept from an earlier record when none is given.
+        """
+        if depth is None and url in self.pending:
+            depth = self.pending[url][2]
+        self.pending[url] = (status, time.time(), depth)
+        if len(self.pending) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            rows = [(url, status, updated_at, depth) for url, (status, updated_at, depth) in self.pending.items()]
+            self.connection.executemany(
+                "INSERT INTO urls (url, status, updated_at, depth) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at, "
+                "depth = COALESCE(excluded.depth, urls.depth)",
+                rows
+            )
+            self.connection.commit()
+            self.pending = {}
+        self.last_flush = time.monotonic()
+
+    def reset(self):
+        """Forget any previous crawl."""
+        self.pending = {}
+        self.connection.execute("DELETE FROM urls")
+        self.connection.commit()
+
+    def load(self):
+        """Read back a previous crawl.
+
+        Returns (visited_urls, frontier_urls): pages that were finished, and
+        pages that were queued or in progress and still need crawling.
+        """
+        self.flush()
+        visited_urls = set()
+        frontier_urls = []
+        cursor = self.connection.execute("SELECT url, status FROM urls ORDER BY updated_at")
+        for url, status in cursor:
+            if status in FINISHED_STATUSES:
+                visited_urls.add(url)
+            elif status in (QUEUED, CLAIMED):
+                frontier_urls.append(url)
+        return visited_urls, frontier_urls
+
+    def load_depths(self):
+        """Link depths of the pages a previous crawl still had to crawl, by URL."""
+        self.flush()
+        cursor = self.connection.execute(
+            "SELECT url, depth FROM urls WHERE status IN (?, ?) AND depth IS NOT NULL", (QUEUED, CLAIMED)
+        )
+        return dict(cursor)
+
+    def close(self):
+        self.flush()
+        self.connection.close()
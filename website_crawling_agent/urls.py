@@ -0,0 +1,77 @@
+from urllib.parse import urlsplit, urlunsplit
+
+# Query parameters that only track where a visitor came from. Names ending
+# in '*' match any parameter starting with the rest of the name.
+DEFAULT_TRACKING_PARAMS = (
+    'utm_*', 'gclid', 'dclid', 'gbraid', 'wbraid', 'fbclid', 'msclkid', 'yclid', 'igshid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi', 'mkt_tok',
+)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def parse_param_list(value):
+    """Split a comma-separated list of parameter names, as given on the command line."""
+    return tuple(name.strip() for name in (value or '').split(',') if name.strip())
+
+
+def is_stripped_param(name, strip_params):
+    for pattern in strip_params:
+        if pattern.endswith('*'):
+            if name.startswith(pattern[:-1]):
+                return True
+        elif name == pattern:
+            return True
+    return False
+
+
+def canonicalize_url(url, strip_params=DEFAULT_TRACKING_PARAMS):
+    """Reduce the many spellings of a URL to one.
+
+    Lowercases the scheme and host, drops default ports and fragments,
+    removes `strip_params` from the query and sorts the rest.
+    Percent-encoding inside the path and query is left as it is. A
+    trailing slash is kept, since relative links on a directory page
+    resolve against it; `url_key` tells `/a` and `/a/` apart from other pages.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    netloc = (parts.hostname or '').rstrip('.')
+    if ':' in netloc:
+        # IPv6 address
+        netloc = f"[{netloc}]"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+    if parts.username is not None:
+        userinfo = parts.username if parts.password is None else f"{parts.username}:{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+
+    # An empty path and "/" are the same page
+    path = parts.path or '/'
+
+    params = []
+    for param in parts.query.split('&'):
+        if not param:
+            continue
+        name = param.split('=', 1)[0]
+        if not is_stripped_param(name, strip_params):
+            params.append(param)
+    query = '&'.join(sorted(params))
+
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def url_key(url):
+    """The key a canonical URL is de-duplicated by: `/a` and `/a/` are the same page.
+
+    Only the visited sets and frontiers use it; the URL itself, with its
+    trailing slash, is what gets fetched.
+    """
+    parts = urlsplit(url)
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme, parts.netloc, path, parts.query, parts.fragment))
@@ -0,0 +1,100 @@
+import hashlib
+import math
+
+VISITED_INDEX_MODES = ('exact', 'bloom')
+
+DEFAULT_BLOOM_CAPACITY = 1000000
+DEFAULT_BLOOM_ERROR_RATE = 0.001
+
+
+def fingerprint(url):
+    """A 64-bit hash of a URL. Collisions are negligible below billions of URLs."""
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class FingerprintSet:
+    """A set of URLs that keeps only a 64-bit fingerprint of each, not the URL itself."""
+
+    def __init__(self, urls=()):
+        self.fingerprints = set()
+        self.update(urls)
+
+    def add(self, url):
+        """Add `url`. Returns True if it wasn't in the set yet."""
+        url_fingerprint = fingerprint(url)
+        if url_fingerprint in self.fingerprints:
+            return False
+        self.fingerprints.add(url_fingerprint)
+        return True
+
+    def update(self, urls):
+        for url in urls:
+            self.add(url)
+
+    def __contains__(self, url):
+        return fingerprint(url) in self.fingerprints
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+
+class BloomFilter:
+    """A fixed-size set of URLs that may report a URL it has never seen as present.
+
+    Memory is set by `capacity` and `error_rate` up front and never grows:
+    about 1.8 MB per million URLs at the default error rate. Past
+    `capacity` URLs the error rate climbs, and a false positive means a
+    page is skipped.
+    """
+
+    def __init__(self, capacity=DEFAULT_BLOOM_CAPACITY, error_rate=DEFAULT_BLOOM_ERROR_RATE, urls=()):
+        self.capacity = max(1, capacity)
+        self.bit_count = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.bit_count / self.capacity * math.log(2)))
+        self.bits = bytearray((self.bit_count + 7) // 8)
+        self.count = 0
+        self.update(urls)
+
+    def positions(self, url):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.bit_count for i in range(self.hash_count)]
+
+    def add(self, url):
+        """Add `url`. Returns True if it wasn't (as far as the filter can tell) in the set yet."""
+        added = False
+        for position in self.positions(url):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        if added:
+            self.count += 1
+            if self.count == self.capacity + 1:
+                print(f"\nWarning: more than {self.capacity} URLs in a Bloom filter sized for {self.capacity}; "
+                      f"some new pages may be skipped")
+        return added
+
+    def update(self, urls):
+        for url in urls:
+            self.add(url)
+
+    def __contains__(self, url):
+        for position in self.positions(url):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+
+def create_visited_index(mode='exact', capacity=DEFAULT_BLOOM_CAPACITY):
+    if mode == 'exact':
+        return FingerprintSet()
+    if mode == 'bloom':
+        return BloomFilter(capacity)
+    raise ValueError(f"Unknown visited index mode: {mode}")
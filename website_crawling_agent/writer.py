@@ -0,0 +1,113 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .lazy import lazy_import
+
+# wkhtmltopdf, and the process pool it runs in, are only needed for PDF output
+pdfkit = lazy_import('pdfkit')
+ProcessPoolExecutor = lazy_import('concurrent.futures', 'ProcessPoolExecutor')
+
+# Writes that may wait in the queue before the crawl has to wait for the writer
+DEFAULT_WRITE_QUEUE_SIZE = 64
+DEFAULT_WRITE_WORKERS = 4
+DEFAULT_PDF_WORKERS = 2
+
+
+def render_pdf(html_content, filename):
+    """Render a PDF with wkhtmltopdf. Runs in a PDF worker process."""
+    pdfkit.from_string(html_content, filename)
+
+
+class WriteJob:
+    def __init__(self, func, args, on_done):
+        self.func = func
+        self.args = args
+        self.on_done = on_done
+
+
+class OutputWriter:
+    """Writes output files off the event loop.
+
+    Writes are queued with `submit` and run by `write_workers` threads.
+    The queue holds at most `queue_size` writes; when it is full, `submit`
+    waits, which slows the crawl down to the speed of the disk. PDFs are
+    rendered in a pool of `pdf_workers` processes, started the first time
+    a PDF is written.
+    """
+
+    def __init__(self, queue_size=DEFAULT_WRITE_QUEUE_SIZE, write_workers=DEFAULT_WRITE_WORKERS,
+                 pdf_workers=DEFAULT_PDF_WORKERS):
+        self.queue_size = queue_size
+        self.write_workers = max(1, write_workers)
+        self.pdf_workers = pdf_workers
+        self.stats = {'written': 0, 'failed': 0}
+        self.queue = None
+        self.consumers = []
+        self.thread_pool = None
+        self.pdf_pool = None
+        self.pdf_pool_lock = threading.Lock()
+
+    @property
+    def running(self):
+        return bool(self.consumers)
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.thread_pool = ThreadPoolExecutor(max_workers=self.write_workers, thread_name_prefix='writer')
+        self.consumers = []
+        for _ in range(self.write_workers):
+            self.consumers.append(asyncio.ensure_future(self.consume()))
+
+    async def submit(self, func, *args, on_done=None):
+        """Queue `func(*args)` to run in a writer thread.
+
+        `on_done(error)` is called on the event loop once it has run, with
+        the exception it raised or None.
+        """
+        await self.queue.put(WriteJob(func, args, on_done))
+
+    async def join(self):
+        """Wait until every queued write has finished."""
+        await self.queue.join()
+
+    async def stop(self):
+        for consumer in self.consumers:
+            consumer.cancel()
+        await asyncio.gather(*self.consumers, return_exceptions=True)
+        self.consumers = []
+        if self.thread_pool is not None:
+            self.thread_pool.shutdown(wait=False)
+            self.thread_pool = None
+        with self.pdf_pool_lock:
+            if self.pdf_pool is not None:
+                self.pdf_pool.shutdown(wait=False)
+                self.pdf_pool = None
+
+    async def consume(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                error = None
+                try:
+                    await loop.run_in_executor(self.thread_pool, job.func, *job.args)
+                    self.stats['written'] += 1
+                except Exception as e:
+                    error = e
+                    self.stats['failed'] += 1
+                if job.on_done is not None:
+                    job.on_done(error)
+            finally:
+                self.queue.task_done()
+
+    def render_pdf(self, html_content, filename):
+        """Render a PDF in the process pool and wait for it. Call from a writer thread."""
+        if self.pdf_workers <= 0:
+            render_pdf(html_content, filename)
+            return
+        with self.pdf_pool_lock:
+            if self.pdf_pool is None:
+                self.pdf_pool = ProcessPoolExecutor(max_workers=self.pdf_workers)
+            pdf_pool = self.pdf_pool
+        pdf_pool.submit(render_pdf, html_content, filename).result()